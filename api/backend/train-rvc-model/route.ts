@@ -5,6 +5,11 @@ import fs from "fs/promises"
 import { writeFile } from "fs/promises"
 
 export async function GET(request: NextRequest) {
+  const jobId = request.nextUrl.searchParams.get("job_id")
+  if (jobId) {
+    return await getTrainingJob(jobId)
+  }
+
   try {
     // Get list of available RVC models
     const modelsDir = path.join(process.cwd(), "rvc_models")
@@ -15,16 +20,33 @@ export async function GET(request: NextRequest) {
       await fs.mkdir(modelsDir, { recursive: true })
     }
 
-    const files = await fs.readdir(modelsDir)
-    const models = files
-      .filter((file) => file.endsWith(".pth"))
-      .map((file) => ({
-        id: file.replace(".pth", ""),
-        name: file.replace(".pth", "").replace(/_/g, " "),
-        path: path.join(modelsDir, file),
-        size_mb: 0, // Would calculate actual size
-        created: new Date().toISOString(),
+    // The registry (kept by backend/rvc_model_registry.py) is the source of truth
+    let models
+    try {
+      const registry = JSON.parse(await fs.readFile(path.join(modelsDir, "registry.json"), "utf-8"))
+      models = Object.values(registry.models as Record<string, any>).map((model) => ({
+        id: model.id,
+        name: model.name.replace(/_/g, " "),
+        path: model.path,
+        size_mb: model.size_mb,
+        sample_rate: model.sample_rate,
+        valid: model.validation?.valid ?? null,
+        test_audio_path: model.test_audio_path,
+        created: model.created,
       }))
+    } catch {
+      // No registry yet: fall back to listing checkpoints
+      const files = await fs.readdir(modelsDir)
+      models = files
+        .filter((file) => file.endsWith(".pth"))
+        .map((file) => ({
+          id: file.replace(".pth", ""),
+          name: file.replace(".pth", "").replace(/_/g, " "),
+          path: path.join(modelsDir, file),
+          size_mb: 0, // Would calculate actual size
+          created: new Date().toISOString(),
+        }))
+    }
 
     return NextResponse.json({ models })
   } catch (error) {
@@ -111,25 +133,66 @@ async function trainRVCModel(formData: FormData) {
     return NextResponse.json({ error: "Training directory not found" }, { status: 400 })
   }
 
-  // Start RVC training process
-  const pythonScript = path.join(process.cwd(), "backend", "rvc_voice_service.py")
+  // Queue the job; training runs in the background and the client polls GET ?job_id=
+  try {
+    const job = await runTrainingJobCommand({
+      command: "submit",
+      model_name: modelName,
+      training_dir: trainingDir,
+      epochs: epochs,
+      batch_size: batchSize,
+    })
 
-  const trainingParams = {
-    command: "train",
-    model_name: modelName,
-    training_dir: trainingDir,
-    output_dir: outputDir,
-    epochs: epochs,
-    batch_size: batchSize,
-    learning_rate: learningRate,
+    return NextResponse.json(
+      {
+        success: true,
+        job_id: job.id,
+        status: job.status,
+        progress: job.progress,
+      },
+      { status: 202 },
+    )
+  } catch (error) {
+    return NextResponse.json(
+      { error: "Failed to start training", details: error instanceof Error ? error.message : "Unknown error" },
+      { status: 500 },
+    )
+  }
+}
+
+async function getTrainingJob(jobId: string) {
+  if (!/^[0-9a-f]{32}$/.test(jobId)) {
+    return NextResponse.json({ error: "Invalid job id" }, { status: 400 })
   }
 
-  return new Promise((resolve) => {
+  try {
+    const job = await runTrainingJobCommand({ command: "status", job_id: jobId })
+    return NextResponse.json({
+      job_id: job.id,
+      model_name: job.model_name,
+      status: job.status,
+      progress: job.progress,
+      attempts: job.attempts,
+      result: job.result,
+      error: job.error,
+    })
+  } catch (error) {
+    return NextResponse.json(
+      { error: "Training job not found", details: error instanceof Error ? error.message : "Unknown error" },
+      { status: 404 },
+    )
+  }
+}
+
+function runTrainingJobCommand(params: Record<string, unknown>): Promise<any> {
+  const pythonScript = path.join(process.cwd(), "backend", "rvc_training_jobs.py")
+
+  return new Promise((resolve, reject) => {
     const pythonProcess = spawn("python3", [pythonScript], {
       stdio: ["pipe", "pipe", "pipe"],
     })
 
-    pythonProcess.stdin.write(JSON.stringify(trainingParams))
+    pythonProcess.stdin.write(JSON.stringify(params))
     pythonProcess.stdin.end()
 
     let output = ""
@@ -144,39 +207,15 @@ async function trainRVCModel(formData: FormData) {
     })
 
     pythonProcess.on("close", (code) => {
-      if (code === 0) {
-        try {
-          const result = JSON.parse(output)
-          resolve(
-            NextResponse.json({
-              success: true,
-              model_path: result.model_path,
-              training_time: result.training_time,
-              final_loss: result.final_loss,
-            }),
-          )
-        } catch (parseError) {
-          resolve(
-            NextResponse.json(
-              {
-                error: "Failed to parse training output",
-                details: output,
-              },
-              { status: 500 },
-            ),
-          )
+      try {
+        const result = JSON.parse(output)
+        if (code !== 0 || result.error) {
+          reject(new Error(result.error || error))
+        } else {
+          resolve(result)
         }
-      } else {
-        resolve(
-          NextResponse.json(
-            {
-              error: "Training failed",
-              details: error,
-              exit_code: code,
-            },
-            { status: 500 },
-          ),
-        )
+      } catch {
+        reject(new Error(error || "Failed to parse training job output"))
       }
     })
   })
@@ -0,0 +1,126 @@
+# backend/audio_io.py
+"""
+Shared audio decode/resample layer
+
+Decodes at the file's native rate (soundfile, falling back to librosa's
+audioread/ffmpeg path for formats libsndfile cannot read), resamples with
+soxr, and returns float32. Decoded PCM is kept in a small in-process LRU
+keyed by (path, mtime, size, sr, mono, resampler), so loading the same file
+again within a pipeline costs nothing.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+# Resampler presets: 'fast' for previews and analysis, 'hq' matches librosa's default (soxr_hq)
+RESAMPLERS = {'fast': 'LQ', 'hq': 'HQ', 'vhq': 'VHQ'}
+
+
+class DecodedAudioCache:
+    """LRU of decoded (audio, sr) pairs, bounded by the arrays' total bytes"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Tuple[np.ndarray, int]]:
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, audio: np.ndarray, sr: int):
+        if audio.nbytes > self.max_bytes:
+            return  # Never evict everything for one oversized file
+
+        with self._lock:
+            if key in self.entries:
+                self.total_bytes -= self.entries.pop(key)[0].nbytes
+            self.entries[key] = (audio, sr)
+            self.total_bytes += audio.nbytes
+
+            while self.total_bytes > self.max_bytes:
+                _, (evicted, _) = self.entries.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+# Process-wide cache shared by every service
+decoded_audio_cache = DecodedAudioCache()
+
+
+def _decode_native(path: str) -> Tuple[np.ndarray, int]:
+    """Decode to float32 (samples, channels) at the file's own sample rate"""
+    try:
+        audio, sr = sf.read(path, dtype='float32', always_2d=True)
+        return audio, sr
+    except RuntimeError:
+        # MP3/AAC/etc. on older libsndfile: librosa's audioread/ffmpeg fallback
+        import librosa
+        audio, sr = librosa.load(path, sr=None, mono=False, dtype=np.float32)
+        return np.atleast_2d(audio).T, sr
+
+
+def load_audio(path: str, sr: Optional[int] = None, mono: bool = True, resampler: str = 'hq',
+               cache: bool = True) -> Tuple[np.ndarray, int]:
+    """
+    Drop-in for librosa.load(path, sr=sr, mono=mono) returning float32
+
+    sr=None keeps the native rate. Mono audio is 1-D; multichannel audio is
+    (channels, samples) like librosa. Arrays may be shared through the cache,
+    so they are returned read-only: copy before modifying in place.
+    """
+    if resampler not in RESAMPLERS:
+        raise ValueError(f"Unknown resampler: {resampler}")
+
+    key = None
+    if cache:
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, sr, mono, resampler)
+        cached = decoded_audio_cache.get(key)
+        if cached is not None:
+            return cached
+
+    audio, native_sr = _decode_native(path)
+    if mono:
+        audio = audio.mean(axis=1) if audio.shape[1] > 1 else audio[:, 0]
+
+    target_sr = sr or native_sr
+    if target_sr != native_sr:
+        audio = soxr.resample(audio, native_sr, target_sr, quality=RESAMPLERS[resampler])
+
+    audio = np.ascontiguousarray(audio.T if audio.ndim > 1 else audio, dtype=np.float32)
+    audio.flags.writeable = False
+
+    if key is not None:
+        decoded_audio_cache.put(key, audio, target_sr)
+
+    return audio, target_sr
+
+
+def get_audio_info(path: str) -> Tuple[float, int]:
+    """(duration in seconds, sample rate) from the file header, decoding only when it is unreadable"""
+    try:
+        info = sf.info(path)
+        return float(info.duration), int(info.samplerate)
+    except RuntimeError:
+        audio, sr = load_audio(path, mono=True)
+        return len(audio) / sr, sr
@@ -2,7 +2,6 @@ import os
 import sys
 import json
 import numpy as np
-import librosa
 import soundfile as sf
 from typing import Dict, Any, Optional, List, Tuple
 import subprocess
@@ -10,6 +9,8 @@ import tempfile
 from datetime import datetime
 import logging
 from pathlib import Path
+from audio_io import load_audio, get_audio_info
+from scratch_store import default_scratch_store, unique_filename
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,14 +25,17 @@ class AudioMixer:
     def __init__(self):
         self.sample_rate = 44100
         self.bit_depth = 24
-        self.temp_dir = Path("temp_audio")
         self.soundfont_dir = Path("soundfonts")
         self.output_dir = Path("output")
         
         # Create directories
-        for directory in [self.temp_dir, self.soundfont_dir, self.output_dir]:
+        for directory in [self.soundfont_dir, self.output_dir]:
             directory.mkdir(exist_ok=True)
         
+        # Intermediates go to this mixer's own scratch job (deleted at exit unless kept)
+        self.scratch = default_scratch_store().job('mix')
+        self.temp_dir = self.scratch.dir
+        
         # Default SoundFont (GeneralUser GS)
         self.default_soundfont = self.soundfont_dir / "GeneralUser_GS.sf2"
         
@@ -69,7 +73,7 @@ class AudioMixer:
                 return self._fallback_midi_synthesis(midi_path)
             
             # Output path
-            output_path = self.temp_dir / f"midi_render_{int(datetime.now().timestamp())}.wav"
+            output_path = self.scratch.path('midi_render')
             
             # FluidSynth command
             cmd = [
@@ -115,7 +119,7 @@ class AudioMixer:
             audio = midi_data.synthesize(fs=self.sample_rate)
             
             # Save audio
-            output_path = self.temp_dir / f"midi_fallback_{int(datetime.now().timestamp())}.wav"
+            output_path = self.scratch.path('midi_fallback')
             sf.write(output_path, audio, self.sample_rate)
             
             logger.info("✅ Fallback synthesis completed")
@@ -134,8 +138,8 @@ class AudioMixer:
         
         try:
             # Load audio files
-            instrumental, sr1 = librosa.load(instrumental_path, sr=self.sample_rate)
-            vocal, sr2 = librosa.load(vocal_path, sr=self.sample_rate)
+            instrumental, sr1 = load_audio(instrumental_path, sr=self.sample_rate)
+            vocal, sr2 = load_audio(vocal_path, sr=self.sample_rate)
             
             # Ensure same length (pad shorter track)
             max_length = max(len(instrumental), len(vocal))
@@ -150,8 +154,8 @@ class AudioMixer:
             # In production, you'd use beat tracking and dynamic time warping
             
             # Save aligned tracks
-            aligned_instrumental = self.temp_dir / f"aligned_inst_{int(datetime.now().timestamp())}.wav"
-            aligned_vocal = self.temp_dir / f"aligned_vocal_{int(datetime.now().timestamp())}.wav"
+            aligned_instrumental = self.scratch.path('aligned_inst')
+            aligned_vocal = self.scratch.path('aligned_vocal')
             
             sf.write(aligned_instrumental, instrumental, self.sample_rate)
             sf.write(aligned_vocal, vocal, self.sample_rate)
@@ -172,7 +176,7 @@ class AudioMixer:
         
         try:
             # Load audio
-            audio, sr = librosa.load(audio_path, sr=self.sample_rate)
+            audio, sr = load_audio(audio_path, sr=self.sample_rate)
             
             # Apply effects based on track type
             if track_type == "vocal":
@@ -181,7 +185,7 @@ class AudioMixer:
                 processed_audio = self._process_instrumental_track(audio, sr)
             
             # Save processed audio
-            output_path = self.temp_dir / f"processed_{track_type}_{int(datetime.now().timestamp())}.wav"
+            output_path = self.scratch.path(f"processed_{track_type}")
             sf.write(output_path, processed_audio, sr)
             
             logger.info(f"✅ Audio effects applied to {track_type}")
@@ -259,14 +263,14 @@ class AudioMixer:
         
         try:
             # Load instrumental
-            instrumental, sr = librosa.load(instrumental_path, sr=self.sample_rate)
+            instrumental, sr = load_audio(instrumental_path, sr=self.sample_rate)
             
             # Initialize mix with instrumental
             mix = instrumental * instrumental_volume
             
             # Add vocals if provided
             if vocal_path and os.path.exists(vocal_path):
-                vocal, _ = librosa.load(vocal_path, sr=self.sample_rate)
+                vocal, _ = load_audio(vocal_path, sr=self.sample_rate)
                 
                 # Ensure same length
                 min_length = min(len(mix), len(vocal))
@@ -280,7 +284,7 @@ class AudioMixer:
             mix = self._apply_mix_processing(mix, sr)
             
             # Save mixed audio
-            output_path = self.temp_dir / f"mixed_{int(datetime.now().timestamp())}.wav"
+            output_path = self.scratch.path('mixed')
             sf.write(output_path, mix, sr)
             
             logger.info("✅ Audio mixing completed")
@@ -321,13 +325,13 @@ class AudioMixer:
         
         try:
             # Load mixed audio
-            audio, sr = librosa.load(mixed_path, sr=self.sample_rate)
+            audio, sr = load_audio(mixed_path, sr=self.sample_rate)
             
             # Apply mastering chain
             mastered = self._apply_mastering_chain(audio, sr, target_lufs)
             
-            # Save mastered audio
-            output_path = self.output_dir / f"mastered_{int(datetime.now().timestamp())}.wav"
+            # Save mastered audio (an intermediate: export_audio writes the deliverable)
+            output_path = self.scratch.path('mastered')
             sf.write(output_path, mastered, sr, subtype='PCM_24')
             
             logger.info("✅ Audio mastering completed")
@@ -380,16 +384,13 @@ class AudioMixer:
         
         try:
             # Load audio
-            audio, sr = librosa.load(audio_path, sr=self.sample_rate)
-            
-            # Generate output filename
-            timestamp = int(datetime.now().timestamp())
+            audio, sr = load_audio(audio_path, sr=self.sample_rate)
             
             if output_format.lower() == "mp3":
-                output_path = self.output_dir / f"song_{timestamp}.mp3"
+                output_path = self.output_dir / unique_filename("song", ".mp3")
                 
                 # Use FFmpeg for MP3 export
-                temp_wav = self.temp_dir / f"temp_export_{timestamp}.wav"
+                temp_wav = self.scratch.path('temp_export')
                 sf.write(temp_wav, audio, sr)
                 
                 # MP3 encoding settings
@@ -414,7 +415,7 @@ class AudioMixer:
                 if result.returncode != 0:
                     logger.error(f"❌ MP3 export failed: {result.stderr}")
                     # Fallback to WAV
-                    output_path = self.output_dir / f"song_{timestamp}.wav"
+                    output_path = self.output_dir / unique_filename("song")
                     sf.write(output_path, audio, sr)
                 else:
                     # Cleanup temp file
@@ -422,7 +423,7 @@ class AudioMixer:
                 
             else:
                 # WAV export
-                output_path = self.output_dir / f"song_{timestamp}.wav"
+                output_path = self.output_dir / unique_filename("song")
                 
                 if quality == "high":
                     subtype = 'PCM_24'
@@ -453,6 +454,7 @@ class AudioMixer:
             
             # Step 2: Process instrumental track
             processed_instrumental = self.apply_audio_effects(instrumental_path, "instrumental")
+            intermediates = [instrumental_path, processed_instrumental]
             
             # Step 3: Process vocal track (if provided)
             processed_vocal = None
@@ -463,6 +465,7 @@ class AudioMixer:
                 )
                 processed_vocal = self.apply_audio_effects(aligned_vocal, "vocal")
                 processed_instrumental = aligned_instrumental
+                intermediates += [aligned_instrumental, aligned_vocal, processed_vocal]
             
             # Step 4: Mix tracks
             mixed_path = self.mix_tracks(
@@ -476,9 +479,11 @@ class AudioMixer:
             # Step 6: Export final song
             final_path = self.export_audio(mastered_path, output_format)
             
+            # The export is in output/; every intermediate of this song can go now
+            self.scratch.discard(*intermediates, mixed_path, mastered_path)
+            
             # Get song info
-            audio, sr = librosa.load(final_path, sr=None)
-            duration = len(audio) / sr
+            duration, sr = get_audio_info(final_path)
             
             result = {
                 'success': True,
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Lyric Processor for Burnt Beats
+Splits lyrics into phrases, words and syllable counts ready for melody generation
+"""
+
+import re
+import sys
+import json
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, Optional
+
+VOWEL_GROUPS = re.compile(r'[aeiouy]+')
+EDGE_PUNCTUATION = '.,!?;:"()[]'
+PHRASE_ENDINGS = (',', '.', '!', '?')
+
+# Common lyric words the vowel-group rule miscounts
+SYLLABLE_DICTIONARY = {
+    'being': 2, 'going': 2, 'doing': 2, 'saying': 2, 'playing': 2, 'staying': 2,
+    'crying': 2, 'dying': 2, 'flying': 2, 'lying': 2, 'trying': 2, 'buying': 2,
+    'people': 2, 'little': 2, 'simple': 2, 'gentle': 2, 'trouble': 2, 'table': 2,
+    'maybe': 2, 'create': 2, 'poem': 2, 'quiet': 2, 'idea': 3, 'area': 3,
+    'every': 2, 'everything': 3, 'everybody': 4, 'something': 2, 'someone': 2,
+    'sometimes': 2, 'somebody': 3, 'somewhere': 2, 'anywhere': 3, 'everywhere': 3,
+    'lonely': 2, 'lovely': 2, 'lately': 2, 'surely': 2, 'nicely': 2, 'safely': 2,
+    'loved': 1, 'lived': 1, 'moved': 1, 'saved': 1, 'named': 1, 'changed': 1,
+    'fire': 1, 'desire': 2, 'hour': 1, 'our': 1, 'flower': 2, 'power': 2,
+    'heaven': 2, 'even': 2, 'evening': 2, 'different': 3, 'family': 3, 'beautiful': 3,
+    'yeah': 1, 'oh': 1, 'ooh': 1, 'whoa': 1, 'the': 1, 'eyes': 1, 'ones': 1
+}
+
+
+class LyricProcessor:
+    def __init__(self, dictionary_path: Optional[str] = None, cache_size: int = 256):
+        self.dictionary = dict(SYLLABLE_DICTIONARY)
+        if dictionary_path:
+            self.dictionary.update(self.load_pronunciation_dictionary(dictionary_path))
+
+        self.cache_size = cache_size
+        self.lyrics_cache = OrderedDict()
+
+        # Per-instance cache so a custom dictionary never leaks into another processor
+        self.count_syllables = lru_cache(maxsize=65536)(self._count_syllables)
+
+    def load_pronunciation_dictionary(self, dictionary_path: str) -> Dict[str, int]:
+        """Load a CMU-style dictionary ("WORD  W ER1 D") as word -> syllable count"""
+        counts = {}
+
+        with open(dictionary_path, 'r', encoding='latin-1') as f:
+            for line in f:
+                if not line.strip() or line.startswith(';;;'):
+                    continue
+
+                parts = line.split()
+                word = parts[0].lower().split('(')[0]  # Alternate pronunciations: WORD(1)
+                syllables = sum(1 for phone in parts[1:] if phone[-1].isdigit())
+                if syllables and word not in counts:
+                    counts[word] = syllables
+
+        return counts
+
+    def _count_syllables(self, word: str) -> int:
+        """Count syllables from the dictionary, falling back to vowel groups"""
+        word = word.lower().strip(EDGE_PUNCTUATION)
+
+        if word in self.dictionary:
+            return self.dictionary[word]
+
+        syllable_count = len(VOWEL_GROUPS.findall(word))
+
+        # Handle silent e
+        if word.endswith('e') and syllable_count > 1:
+            syllable_count -= 1
+
+        return max(1, syllable_count)
+
+    def split_phrases(self, lyrics: str):
+        """Break lyrics into musical phrases at line breaks, punctuation or every 6 words"""
+        phrases = []
+
+        for line in lyrics.splitlines():
+            words = line.split()
+            if not words:
+                continue
+
+            if len(words) <= 8:
+                phrases.append(words)
+                continue
+
+            phrase_words = []
+            for i, word in enumerate(words):
+                phrase_words.append(word)
+                if (i + 1) % 6 == 0 or word.endswith(PHRASE_ENDINGS):
+                    phrases.append(phrase_words)
+                    phrase_words = []
+            if phrase_words:
+                phrases.append(phrase_words)
+
+        return phrases
+
+    def process(self, lyrics: str) -> Dict[str, Any]:
+        """
+        Process lyrics into phrase/word/syllable arrays
+
+        Results are cached by a hash of the lyrics text. The arrays are tuples
+        so a cached result can be shared safely between callers.
+        """
+        lyrics_hash = hashlib.sha1(lyrics.encode('utf-8')).hexdigest()
+
+        if lyrics_hash in self.lyrics_cache:
+            self.lyrics_cache.move_to_end(lyrics_hash)
+            return self.lyrics_cache[lyrics_hash]
+
+        count = self.count_syllables
+        phrase_words = self.split_phrases(lyrics)
+        words = tuple(tuple(phrase) for phrase in phrase_words)
+        syllables = tuple(tuple(count(word) for word in phrase) for phrase in words)
+
+        result = {
+            'hash': lyrics_hash,
+            'phrases': tuple(' '.join(phrase) for phrase in words),
+            'words': words,
+            'syllables': syllables,
+            'total_words': sum(len(phrase) for phrase in words),
+            'total_syllables': sum(sum(phrase) for phrase in syllables)
+        }
+
+        self.lyrics_cache[lyrics_hash] = result
+        if len(self.lyrics_cache) > self.cache_size:
+            self.lyrics_cache.popitem(last=False)
+
+        return result
+
+
+# Shared processor so the caches persist across calls in one process
+_default_processor = None
+
+def get_lyric_processor() -> LyricProcessor:
+    """Return the process-wide lyric processor"""
+    global _default_processor
+    if _default_processor is None:
+        _default_processor = LyricProcessor()
+    return _default_processor
+
+# Main API function
+def process_lyrics(lyrics: str) -> Dict[str, Any]:
+    """Process lyrics into phrase/word/syllable arrays"""
+    return get_lyric_processor().process(lyrics)
+
+# CLI interface
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        import argparse
+        parser = argparse.ArgumentParser(description='Process lyrics into phrases and syllables')
+        parser.add_argument('lyrics_file', help='Lyrics text file path')
+        parser.add_argument('--dictionary', help='CMU-style pronunciation dictionary')
+
+        args = parser.parse_args()
+
+        with open(args.lyrics_file, 'r') as f:
+            lyrics_text = f.read()
+
+        processor = LyricProcessor(args.dictionary)
+        print(json.dumps(processor.process(lyrics_text), indent=2))
+    else:
+        # Read from stdin for API calls
+        input_data = sys.stdin.read()
+        if input_data:
+            try:
+                data = json.loads(input_data)
+                print(json.dumps(process_lyrics(data['lyrics'])))
+            except (json.JSONDecodeError, KeyError):
+                print(json.dumps({"error": "Invalid JSON input"}))
+        else:
+            print("Usage: python lyric_processor.py <lyrics_file> [--dictionary <path>]")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Melody Generator Benchmark for Burnt Beats
+Times MelodyGenerator.generate_melody across genres, modes and song lengths,
+and compares the results against a stored baseline
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import platform
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from melody_generator import MelodyGenerator
+
+DEFAULT_BARS = [8, 16, 32, 64, 128, 256]
+DEFAULT_MODES = ['instrumental', 'lyrics']
+LYRIC_WORDS = ('love fire night baby heart dancing tonight forever shining light believe '
+               'everything someone going crying home dream tomorrow river golden').split()
+
+
+class MelodyBenchmark:
+    def __init__(self, repeats: int = 5, warmup: int = 1, seed: int = 1234):
+        self.repeats = repeats
+        self.warmup = warmup
+        self.seed = seed
+        self.generator = MelodyGenerator()
+
+    def build_lyrics(self, bars: int) -> str:
+        """Deterministic lyrics sized to the song (two 6-word lines per 4 bars)"""
+        rng = random.Random(self.seed + bars)
+        lines = [' '.join(rng.choice(LYRIC_WORDS) for _ in range(6)) for _ in range(max(1, bars // 2))]
+        return '\n'.join(lines)
+
+    def run_case(self, genre: str, mode: str, bars: int) -> Dict[str, Any]:
+        """Benchmark one (genre, mode, bars) combination"""
+        lyrics = self.build_lyrics(bars) if mode == 'lyrics' else None
+
+        def call():
+            # generate_melody prints progress; keep it out of the benchmark output
+            with redirect_stdout(io.StringIO()):
+                return self.generator.generate_melody(genre, 'happy', 120, 'C', 'moderate', bars, lyrics)
+
+        try:
+            random.seed(self.seed)
+            for _ in range(self.warmup):
+                call()
+
+            latencies = []
+            for _ in range(self.repeats):
+                start = time.perf_counter()
+                call()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+            # Memory is measured on a separate run so tracing does not skew the timings
+            tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            result = call()
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            # Blocks still alive after the call (allocations minus frees), not the number allocated
+            net_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+
+            return {
+                'genre': genre,
+                'mode': mode,
+                'bars': bars,
+                'runs': self.repeats,
+                'latency_ms': self.percentiles(latencies),
+                'peak_memory_kb': round(peak / 1024, 1),
+                'net_blocks': net_blocks,
+                'notes': len(result['melody']['notes']),
+                'status': 'ok'
+            }
+
+        except Exception as e:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            return {'genre': genre, 'mode': mode, 'bars': bars, 'status': 'error', 'error': str(e)}
+
+    def percentiles(self, values: List[float]) -> Dict[str, float]:
+        """Nearest-rank latency percentiles"""
+        ordered = sorted(values)
+
+        def rank(p):
+            return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+        return {
+            'p50': round(rank(50), 3),
+            'p90': round(rank(90), 3),
+            'p99': round(rank(99), 3),
+            'mean': round(sum(ordered) / len(ordered), 3),
+            'min': round(ordered[0], 3),
+            'max': round(ordered[-1], 3)
+        }
+
+    def run(self, genres: Optional[List[str]] = None, modes: Optional[List[str]] = None,
+            bars: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Run every requested case and return machine-readable results"""
+        genres = genres or list(self.generator.genre_scales.keys())
+        modes = modes or DEFAULT_MODES
+        bars = bars or DEFAULT_BARS
+
+        results = {}
+        for genre in genres:
+            for mode in modes:
+                for bar_count in bars:
+                    case_id = f"{genre}/{mode}/{bar_count}"
+                    results[case_id] = self.run_case(genre, mode, bar_count)
+                    print(f"⏱️ {case_id}: {self._format_case(results[case_id])}", file=sys.stderr)
+
+        return {
+            'metadata': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'repeats': self.repeats,
+                'warmup': self.warmup,
+                'seed': self.seed,
+                'created_at': datetime.now().isoformat()
+            },
+            'results': results
+        }
+
+    def _format_case(self, case: Dict[str, Any]) -> str:
+        if case['status'] != 'ok':
+            return f"error: {case['error']}"
+        return f"p50 {case['latency_ms']['p50']} ms, peak {case['peak_memory_kb']} KB"
+
+
+def compare_to_baseline(current: Dict[str, Any], baseline: Dict[str, Any],
+                        threshold: float = 0.2) -> Dict[str, Any]:
+    """
+    Compare p50 latency and peak memory per case against a baseline
+
+    A case regresses when either metric grows by more than `threshold`
+    (0.2 = 20%), or when it ran in the baseline and now errors. Cases
+    missing from either side, or failing in the baseline, are skipped.
+    """
+    regressions = []
+    compared = 0
+
+    for case_id, case in current['results'].items():
+        base = baseline.get('results', {}).get(case_id)
+        if not base or base.get('status') != 'ok':
+            continue
+
+        if case['status'] != 'ok':
+            compared += 1
+            regressions.append({
+                'case': case_id,
+                'metric': 'status',
+                'baseline': 'ok',
+                'current': case['status'],
+                'error': case.get('error')
+            })
+            continue
+
+        compared += 1
+        metrics = {
+            'latency_p50_ms': (case['latency_ms']['p50'], base['latency_ms']['p50']),
+            'peak_memory_kb': (case['peak_memory_kb'], base['peak_memory_kb'])
+        }
+
+        for metric, (value, base_value) in metrics.items():
+            if base_value > 0 and value > base_value * (1 + threshold):
+                regressions.append({
+                    'case': case_id,
+                    'metric': metric,
+                    'baseline': base_value,
+                    'current': value,
+                    'change_pct': round((value / base_value - 1) * 100, 1)
+                })
+
+    return {
+        'threshold_pct': round(threshold * 100, 1),
+        'cases_compared': compared,
+        'regressions': regressions,
+        'passed': not regressions
+    }
+
+# Main API function
+def run_melody_benchmark(repeats: int = 5, genres: Optional[List[str]] = None,
+                         modes: Optional[List[str]] = None, bars: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Run the melody generator benchmark suite"""
+    benchmark = MelodyBenchmark(repeats=repeats)
+    return benchmark.run(genres, modes, bars)
+
+# CLI interface
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark MelodyGenerator.generate_melody')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per case')
+    parser.add_argument('--genres', nargs='+', help='Genres to run (default: all in genre_scales)')
+    parser.add_argument('--modes', nargs='+', choices=DEFAULT_MODES, help='Generation modes to run')
+    parser.add_argument('--bars', nargs='+', type=int, help='Song lengths in bars (default: 8-256)')
+    parser.add_argument('--output', default='benchmark_results/melody_benchmark.json', help='Results file')
+    parser.add_argument('--baseline', default='benchmark_results/melody_baseline.json', help='Baseline file')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed regression (0.2 = 20%%)')
+    parser.add_argument('--update-baseline', action='store_true', help='Save these results as the baseline')
+
+    args = parser.parse_args()
+
+    results = run_melody_benchmark(args.repeats, args.genres, args.modes, args.bars)
+
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.update_baseline:
+        with open(baseline_path, 'r') as f:
+            results['comparison'] = compare_to_baseline(results, json.load(f), args.threshold)
+
+    output_path = Path(args.output)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved: {baseline_path}", file=sys.stderr)
+
+    comparison = results.get('comparison')
+    errors = sum(1 for case in results['results'].values() if case['status'] != 'ok')
+    print(json.dumps({
+        'output_path': str(output_path),
+        'cases': len(results['results']),
+        'errors': errors,
+        'comparison': comparison
+    }, indent=2))
+
+    if errors or (comparison and not comparison['passed']):
+        sys.exit(1)
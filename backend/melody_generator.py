@@ -1,9 +1,11 @@
 # backend/melody_generator.py
-from music21 import stream, note, pitch, duration, tempo, key, meter, scale, chord
+from music21 import stream, note, pitch, duration, tempo, key, meter, scale, chord, roman
 import random
 import json
 import sys
+import hashlib
 from datetime import datetime
+from lyric_processor import get_lyric_processor
 
 class MelodyGenerator:
     def __init__(self):
@@ -32,9 +34,20 @@ class MelodyGenerator:
             'hip-hop': [['i', 'VII', 'VI', 'VII'], ['i', 'iv', 'VII', 'VI']],
             'rnb': [['i', 'VII', 'VI', 'VII'], ['vi', 'IV', 'I', 'V']]
         }
+        
+        # Shared lyric processor keeps its syllable and lyrics caches between songs
+        self.lyric_processor = get_lyric_processor()
+        
+        # Variation applied when a repeated section is reused
+        self.section_variation = {
+            'transpose': 0,
+            'velocity_jitter': 0,
+            'resolve_ending': False
+        }
 
     def generate_melody(self, genre: str, mood: str, tempo_bpm: int, song_key: str = 'C', 
-                       complexity: str = 'moderate', duration_bars: int = 32, lyrics: str = None):
+                       complexity: str = 'moderate', duration_bars: int = 32, lyrics: str = None,
+                       reuse_sections: bool = True, section_variation: dict = None):
         """
         Generate a complete melody with harmony using music21
         """
@@ -44,7 +57,7 @@ class MelodyGenerator:
         melody_stream = stream.Stream()
         
         # Set tempo
-        melody_stream.append(tempo.TempoIndication(number=tempo_bpm))
+        melody_stream.append(tempo.MetronomeMark(number=tempo_bpm))
         
         # Set key signature
         key_obj = key.Key(song_key)
@@ -57,9 +70,20 @@ class MelodyGenerator:
         scale_type = self.get_scale_for_genre_mood(genre, mood)
         melody_scale = self.create_scale(song_key, scale_type)
         
+        # Create song structure
+        song_structure = self.create_full_song_structure(genre, duration_bars)
+        
         # Generate melody based on lyrics structure if provided
         if lyrics:
             melody_notes = self.generate_melody_from_lyrics(lyrics, melody_scale, genre, mood, tempo_bpm)
+        elif reuse_sections:
+            # Repeated sections are generated once and reused
+            melody_notes = []
+            for index, section_notes in self.generate_structured_melody(melody_scale, genre, mood, song_structure,
+                                                                        section_variation):
+                song_structure[index]['section_hash'] = self.section_hash(
+                    [self.note_data_to_dict(n, 0) for n in section_notes], tempo_bpm)
+                melody_notes.extend(section_notes)
         else:
             melody_notes = self.generate_instrumental_melody(melody_scale, genre, mood, duration_bars)
         
@@ -72,9 +96,6 @@ class MelodyGenerator:
         # Generate harmony
         harmony = self.generate_harmony(song_key, genre, duration_bars)
         
-        # Create song structure
-        song_structure = self.create_song_structure(genre, duration_bars)
-        
         return {
             'melody': self.stream_to_dict(melody_stream),
             'harmony': harmony,
@@ -90,17 +111,221 @@ class MelodyGenerator:
             }
         }
 
+    def generate_melody_sections(self, genre: str, mood: str, tempo_bpm: int, song_key: str = 'C',
+                                 complexity: str = 'moderate', duration_bars: int = 32, lyrics: str = None,
+                                 section_variation: dict = None):
+        """
+        Generate a song one section at a time
+
+        Yields a header block (structure and metadata), then one block per
+        section with its finished notes and chords, then a closing block.
+        Downstream rendering can start on the intro while later sections
+        are still being generated.
+        """
+        scale_type = self.get_scale_for_genre_mood(genre, mood)
+        melody_scale = self.create_scale(song_key, scale_type)
+        key_name = str(key.Key(song_key))
+
+        song_structure = self.create_full_song_structure(genre, duration_bars)
+
+        # The header goes out before any generation work, so consumers can lay out the song at once
+        yield {
+            'type': 'header',
+            'structure': song_structure,
+            'metadata': {
+                'genre': genre,
+                'mood': mood,
+                'tempo': tempo_bpm,
+                'key': song_key,
+                'complexity': complexity,
+                'scale_type': scale_type,
+                'generated_at': datetime.now().isoformat()
+            }
+        }
+
+        harmony = self.generate_harmony(song_key, genre, duration_bars)
+
+        if lyrics:
+            blocks = self._generate_lyric_sections(lyrics, melody_scale, genre, mood, song_structure)
+        else:
+            blocks = self._generate_instrumental_sections(melody_scale, genre, mood, song_structure,
+                                                          section_variation)
+
+        for index, notes in blocks:
+            section = song_structure[index]
+            yield {
+                'type': 'section',
+                'index': index,
+                'total_sections': len(song_structure),
+                'section': section,
+                'section_hash': self.section_hash(notes, tempo_bpm),
+                'melody': {
+                    'notes': notes,
+                    'tempo': tempo_bpm,
+                    'key': key_name,
+                    'time_signature': '4/4'
+                },
+                'harmony': [c for c in harmony
+                            if section['start_time'] <= c['start_time'] < section['end_time']]
+            }
+
+        yield {
+            'type': 'complete',
+            'total_sections': len(song_structure),
+            'duration': float(duration_bars * 4)
+        }
+
+    def _generate_instrumental_sections(self, melody_scale, genre: str, mood: str, song_structure,
+                                        section_variation: dict = None):
+        """Generate instrumental notes section by section, aligned to the bar grid"""
+        for index, notes in self.generate_structured_melody(melody_scale, genre, mood, song_structure,
+                                                            section_variation):
+            offset = song_structure[index]['start_time']
+            section_notes = []
+
+            for note_data in notes:
+                section_notes.append(self.note_data_to_dict(note_data, offset))
+                offset += note_data['duration']
+
+            yield index, section_notes
+
+    def generate_structured_melody(self, melody_scale, genre: str, mood: str, song_structure,
+                                   section_variation: dict = None):
+        """
+        Generate instrumental notes for each section of a song structure
+
+        Each distinct section label is generated once and reused for its
+        repeats. Variation options (all off by default):
+        - velocity_jitter: random velocity offset applied to every repeat
+        - transpose: scale steps to shift the last repeat of a section
+        - resolve_ending: end the last repeat of a section on the tonic
+        Yields (index, notes) with notes trimmed to the section length.
+        """
+        variation = dict(self.section_variation, **(section_variation or {}))
+        last_occurrence = {section['name']: index for index, section in enumerate(song_structure)}
+        section_cache = {}
+
+        for index, section in enumerate(song_structure):
+            cache_key = (section['name'], section['duration_bars'])
+
+            if cache_key not in section_cache:
+                section_cache[cache_key] = self.trim_notes(
+                    self.generate_instrumental_melody(melody_scale, genre, mood, section['duration_bars']),
+                    section['duration_bars'] * 4
+                )
+                yield index, section_cache[cache_key]
+            else:
+                is_last = last_occurrence[section['name']] == index
+                yield index, self.vary_section(section_cache[cache_key], melody_scale, variation, is_last)
+
+    def vary_section(self, notes, melody_scale, variation: dict, is_last: bool):
+        """Apply cheap variation to a repeated section"""
+        transpose = variation['transpose'] if is_last else 0
+        jitter = variation['velocity_jitter']
+        varied = []
+
+        # music21 scales repeat the tonic an octave up as their last pitch
+        degrees_per_octave = len(melody_scale)
+        if degrees_per_octave > 1 and melody_scale[-1].ps - melody_scale[0].ps == 12:
+            degrees_per_octave -= 1
+
+        for note_data in notes:
+            note_data = dict(note_data)
+
+            if transpose and 'degree' in note_data:
+                # Wrap into the scale and carry the overflow as whole octaves
+                octaves, degree = divmod(note_data['degree'] + transpose, degrees_per_octave)
+                note_data['degree'] = degree
+                note_data['pitch'] = melody_scale[degree].transpose(12 * octaves) if octaves else melody_scale[degree]
+
+            if jitter:
+                velocity = note_data.get('velocity', 80) + random.randint(-jitter, jitter)
+                note_data['velocity'] = max(1, min(127, velocity))
+
+            varied.append(note_data)
+
+        if is_last and variation['resolve_ending'] and varied:
+            varied[-1]['degree'] = 0
+            varied[-1]['pitch'] = melody_scale[0]
+
+        return varied
+
+    def trim_notes(self, notes, total_beats: float):
+        """Cut a note list to an exact length in beats"""
+        trimmed = []
+        current_beat = 0
+
+        for note_data in notes:
+            note_duration = min(note_data['duration'], total_beats - current_beat)
+            if note_duration <= 0:
+                break
+            trimmed.append(dict(note_data, duration=note_duration))
+            current_beat += note_duration
+
+        return trimmed
+
+    def section_hash(self, notes, tempo_bpm: int):
+        """Content hash of a section, usable as a cache key for its rendered audio"""
+        content = [(n['pitch'], n['octave'], n['duration'], n['velocity']) for n in notes]
+        payload = json.dumps([tempo_bpm, content])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+    def _generate_lyric_sections(self, lyrics: str, melody_scale, genre: str, mood: str, song_structure):
+        """Generate lyric phrases in order, grouping each phrase into the section it starts in"""
+        index = 0
+        offset = 0.0
+        section_notes = []
+
+        processed = self.lyric_processor.process(lyrics)
+
+        for phrase, syllable_counts in zip(processed['phrases'], processed['syllables']):
+            # Flush every section the running offset has moved past
+            while index < len(song_structure) - 1 and offset >= song_structure[index]['end_time']:
+                yield index, section_notes
+                section_notes = []
+                index += 1
+
+            for note_data in self.generate_phrase_melody(phrase, melody_scale, genre, mood, offset,
+                                                         syllable_counts):
+                section_notes.append(self.note_data_to_dict(note_data, offset))
+                offset += note_data['duration']
+
+            # Rest between phrases, as in generate_melody_from_lyrics
+            offset += 0.5
+
+        yield index, section_notes
+
+        # Lyrics ran out before the song did
+        for remaining in range(index + 1, len(song_structure)):
+            yield remaining, []
+
+    def note_data_to_dict(self, note_data, offset: float):
+        """Convert a generated note into the dictionary shape used by stream_to_dict"""
+        note_pitch = note_data['pitch']
+        note_dict = {
+            'pitch': note_pitch.name,
+            'octave': note_pitch.octave,
+            'duration': float(note_data['duration']),
+            'offset': float(offset),
+            'velocity': note_data.get('velocity', 80)
+        }
+
+        if 'word' in note_data:
+            note_dict['word'] = note_data['word']
+
+        return note_dict
+
     def generate_melody_from_lyrics(self, lyrics: str, melody_scale, genre: str, mood: str, tempo_bpm: int):
         """Generate melody that follows lyrical phrasing"""
-        words = lyrics.split()
         melody_notes = []
         current_time = 0
         
-        # Analyze lyrical structure
-        phrases = self.analyze_lyrical_phrases(lyrics)
+        # Analyze lyrical structure (cached per lyrics text)
+        processed = self.lyric_processor.process(lyrics)
         
-        for phrase in phrases:
-            phrase_notes = self.generate_phrase_melody(phrase, melody_scale, genre, mood, current_time)
+        for phrase, syllable_counts in zip(processed['phrases'], processed['syllables']):
+            phrase_notes = self.generate_phrase_melody(phrase, melody_scale, genre, mood, current_time,
+                                                       syllable_counts)
             melody_notes.extend(phrase_notes)
             current_time += sum(note['duration'] for note in phrase_notes)
             
@@ -111,28 +336,10 @@ class MelodyGenerator:
 
     def analyze_lyrical_phrases(self, lyrics: str):
         """Break lyrics into musical phrases"""
-        lines = [line.strip() for line in lyrics.split('\n') if line.strip()]
-        phrases = []
-        
-        for line in lines:
-            # Split long lines into phrases at punctuation or natural breaks
-            if len(line.split()) > 8:
-                # Split at commas, periods, or every 6-8 words
-                words = line.split()
-                phrase_words = []
-                for i, word in enumerate(words):
-                    phrase_words.append(word)
-                    if (i + 1) % 6 == 0 or word.endswith((',', '.', '!', '?')):
-                        phrases.append(' '.join(phrase_words))
-                        phrase_words = []
-                if phrase_words:
-                    phrases.append(' '.join(phrase_words))
-            else:
-                phrases.append(line)
-        
-        return phrases
+        return list(self.lyric_processor.process(lyrics)['phrases'])
 
-    def generate_phrase_melody(self, phrase: str, melody_scale, genre: str, mood: str, start_time: float):
+    def generate_phrase_melody(self, phrase: str, melody_scale, genre: str, mood: str, start_time: float,
+                               syllable_counts=None):
         """Generate melody for a single phrase"""
         words = phrase.split()
         phrase_notes = []
@@ -141,7 +348,7 @@ class MelodyGenerator:
         contour = random.choice(['rising', 'falling', 'arch', 'valley'])
         
         # Generate note durations based on syllable count
-        syllable_durations = self.calculate_syllable_durations(words, genre)
+        syllable_durations = self.calculate_syllable_durations(words, genre, syllable_counts)
         
         # Generate pitches following the contour
         pitches = self.generate_phrase_pitches(len(words), melody_scale, contour, mood)
@@ -156,7 +363,7 @@ class MelodyGenerator:
         
         return phrase_notes
 
-    def calculate_syllable_durations(self, words, genre):
+    def calculate_syllable_durations(self, words, genre, syllable_counts=None):
         """Calculate note durations based on syllables and genre"""
         base_duration = 0.5  # Half note base
         
@@ -165,34 +372,14 @@ class MelodyGenerator:
         elif genre.lower() in ['ballad', 'classical']:
             base_duration = 1.0  # Slower for ballads
         
-        durations = []
-        for word in words:
-            syllable_count = self.count_syllables(word)
-            word_duration = base_duration * max(1, syllable_count * 0.5)
-            durations.append(word_duration)
+        if syllable_counts is None:
+            syllable_counts = [self.count_syllables(word) for word in words]
         
-        return durations
+        return [base_duration * max(1, count * 0.5) for count in syllable_counts]
 
     def count_syllables(self, word):
-        """Simple syllable counting"""
-        word = word.lower()
-        vowels = 'aeiouy'
-        syllable_count = 0
-        prev_was_vowel = False
-        
-        for char in word:
-            if char in vowels:
-                if not prev_was_vowel:
-                    syllable_count += 1
-                prev_was_vowel = True
-            else:
-                prev_was_vowel = False
-        
-        # Handle silent e
-        if word.endswith('e') and syllable_count > 1:
-            syllable_count -= 1
-        
-        return max(1, syllable_count)
+        """Syllable count from the shared, LRU-cached lyric processor"""
+        return self.lyric_processor.count_syllables(word)
 
     def generate_phrase_pitches(self, num_notes, melody_scale, contour, mood):
         """Generate pitches following a melodic contour"""
@@ -290,13 +477,14 @@ class MelodyGenerator:
                     break
                 
                 # Choose pitch
-                scale_degree = self.choose_scale_degree_weighted(mood)
-                pitch_note = melody_scale[scale_degree % len(melody_scale)]
+                scale_degree = self.choose_scale_degree_weighted(mood) % len(melody_scale)
+                pitch_note = melody_scale[scale_degree]
                 
                 phrase_notes.append({
                     'pitch': pitch_note,
                     'duration': duration,
-                    'velocity': random.randint(70, 100)
+                    'velocity': random.randint(70, 100),
+                    'degree': scale_degree
                 })
                 
                 current_beat += duration
@@ -384,7 +572,7 @@ class MelodyGenerator:
             roman_numeral = chosen_progression[i // bars_per_chord % len(chosen_progression)]
             
             try:
-                chord_obj = key_obj.getChord(roman_numeral)
+                chord_obj = roman.RomanNumeral(roman_numeral, key_obj)
                 chord_progression.append({
                     'roman': roman_numeral,
                     'pitches': [str(p) for p in chord_obj.pitches],
@@ -393,7 +581,7 @@ class MelodyGenerator:
                 })
             except:
                 # Fallback to tonic chord
-                chord_obj = key_obj.getChord('I')
+                chord_obj = roman.RomanNumeral('I', key_obj)
                 chord_progression.append({
                     'roman': 'I',
                     'pitches': [str(p) for p in chord_obj.pitches],
@@ -432,6 +620,13 @@ class MelodyGenerator:
         
         return song_structure
 
+    def create_full_song_structure(self, genre: str, duration_bars: int):
+        """Song structure with the leftover bars of the even split folded into the last section"""
+        song_structure = self.create_song_structure(genre, duration_bars)
+        song_structure[-1]['duration_bars'] = duration_bars - song_structure[-1]['start_bar']
+        song_structure[-1]['end_time'] = duration_bars * 4
+        return song_structure
+
     def stream_to_dict(self, music_stream):
         """Convert music21 stream to dictionary for JSON serialization"""
         notes_data = []
@@ -460,7 +655,7 @@ class MelodyGenerator:
 
 # Main API function
 def generate_song_melody(genre: str, mood: str, tempo: int, song_key: str = 'C', 
-                        complexity: str = 'moderate', lyrics: str = None):
+                        complexity: str = 'moderate', lyrics: str = None, section_variation: dict = None):
     """
     Main function to be called by the API
     """
@@ -468,7 +663,8 @@ def generate_song_melody(genre: str, mood: str, tempo: int, song_key: str = 'C',
         generator = MelodyGenerator()
         
         # Generate melody with harmony
-        result = generator.generate_melody(genre, mood, tempo, song_key, complexity, 32, lyrics)
+        result = generator.generate_melody(genre, mood, tempo, song_key, complexity, 32, lyrics,
+                                           section_variation=section_variation)
         
         print(f"✅ Generated {genre} melody successfully")
         return result
@@ -477,6 +673,28 @@ def generate_song_melody(genre: str, mood: str, tempo: int, song_key: str = 'C',
         print(f"❌ Melody generation failed: {str(e)}")
         raise e
 
+def stream_song_melody(genre: str, mood: str, tempo: int, song_key: str = 'C',
+                       complexity: str = 'moderate', lyrics: str = None, duration_bars: int = 32,
+                       section_variation: dict = None):
+    """
+    Streaming counterpart of generate_song_melody, yields one block per section
+    """
+    generator = MelodyGenerator()
+    yield from generator.generate_melody_sections(genre, mood, tempo, song_key, complexity,
+                                                  duration_bars, lyrics, section_variation)
+
+def write_ndjson(blocks, output=None):
+    """Write blocks as newline-delimited JSON, flushing after each line"""
+    output = output or sys.stdout
+
+    try:
+        for block in blocks:
+            output.write(json.dumps(block) + '\n')
+            output.flush()
+    except Exception as e:
+        output.write(json.dumps({'type': 'error', 'error': str(e)}) + '\n')
+        output.flush()
+
 # CLI interface for testing
 if __name__ == "__main__":
     if len(sys.argv) > 1:
@@ -489,6 +707,8 @@ if __name__ == "__main__":
         parser.add_argument('--key', default='C', help='Musical key')
         parser.add_argument('--complexity', default='moderate', help='Complexity level')
         parser.add_argument('--lyrics', help='Lyrics text file path')
+        parser.add_argument('--bars', type=int, default=32, help='Song length in bars (streaming only)')
+        parser.add_argument('--stream', action='store_true', help='Stream sections as NDJSON')
         
         args = parser.parse_args()
         
@@ -500,16 +720,23 @@ if __name__ == "__main__":
             except FileNotFoundError:
                 print(f"Lyrics file not found: {args.lyrics}")
         
-        result = generate_song_melody(args.genre, args.mood, args.tempo, args.key, args.complexity, lyrics_text)
-        print(json.dumps(result, indent=2))
+        if args.stream:
+            write_ndjson(stream_song_melody(args.genre, args.mood, args.tempo, args.key,
+                                            args.complexity, lyrics_text, args.bars))
+        else:
+            result = generate_song_melody(args.genre, args.mood, args.tempo, args.key, args.complexity, lyrics_text)
+            print(json.dumps(result, indent=2))
     else:
         # Read from stdin for API calls
         input_data = sys.stdin.read()
         if input_data:
             try:
                 data = json.loads(input_data)
-                result = generate_song_melody(**data)
-                print(json.dumps(result))
+                if data.pop('stream', False):
+                    write_ndjson(stream_song_melody(**data))
+                else:
+                    result = generate_song_melody(**data)
+                    print(json.dumps(result))
             except json.JSONDecodeError:
                 print(json.dumps({"error": "Invalid JSON input"}))
         else:
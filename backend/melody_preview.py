@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Melody Preview Renderer for Burnt Beats
+Synthesizes a quick mono preview straight from a generated melody dict,
+without MIDI files, FluidSynth or SoundFonts
+"""
+
+import io
+import re
+import sys
+import json
+import wave
+import base64
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+PITCH_PATTERN = re.compile(r'^([A-Ga-g])([#\-]*)(\d+)?$')
+STEP_SEMITONES = {'C': 0, 'D': 2, 'E': 4, 'F': 5, 'G': 7, 'A': 9, 'B': 11}
+
+
+@lru_cache(maxsize=512)
+def pitch_to_midi(name: str, octave: Optional[int] = None) -> int:
+    """Convert a music21 pitch name ('C#', 'E-4') to a MIDI note number"""
+    match = PITCH_PATTERN.match(name.strip())
+    if not match:
+        return 60
+
+    step, accidentals, name_octave = match.groups()
+    if octave is None:
+        octave = int(name_octave) if name_octave else 4
+
+    semitone = STEP_SEMITONES[step.upper()] + accidentals.count('#') - accidentals.count('-')
+    return 12 * (octave + 1) + semitone
+
+
+class MelodyPreviewRenderer:
+    def __init__(self, sample_rate: int = 22050, max_duration: float = 30.0):
+        self.sample_rate = sample_rate
+        self.max_duration = max_duration
+
+        # Oscillator settings
+        self.melody_harmonics = [(1, 1.0), (2, 0.3), (3, 0.12)]
+        self.melody_gain = 0.6
+        self.harmony_gain = 0.15
+        self.attack = 0.01    # seconds
+        self.release = 0.05   # seconds
+
+    def render(self, melody_result: Dict[str, Any], max_duration: Optional[float] = None) -> np.ndarray:
+        """
+        Render a generate_melody result (or streamed section block) to mono float32 audio
+        """
+        max_duration = max_duration or self.max_duration
+        seconds_per_beat = 60.0 / self._get_tempo(melody_result)
+
+        # Streamed section blocks keep song-absolute offsets; render them from the section start
+        origin = float(melody_result.get('section', {}).get('start_time', 0.0))
+
+        melody_notes = melody_result.get('melody', {}).get('notes', [])
+        melody = self._note_arrays(
+            [[(n['pitch'], n.get('octave'))] for n in melody_notes],
+            [n['offset'] - origin for n in melody_notes],
+            [n['duration'] for n in melody_notes],
+            [n.get('velocity', 80) / 127.0 for n in melody_notes],
+            seconds_per_beat
+        )
+
+        # Chords become one layer with a column per chord tone; short chords repeat their root
+        chords = [c for c in melody_result.get('harmony', []) if c.get('pitches')]
+        max_tones = max((len(c['pitches']) for c in chords), default=1)
+        harmony = self._note_arrays(
+            [[(p, None) for p in c['pitches']] + [(c['pitches'][0], None)] * (max_tones - len(c['pitches']))
+             for c in chords],
+            [c['start_time'] - origin for c in chords],
+            [c['duration'] for c in chords],
+            [1.0 / max_tones] * len(chords),
+            seconds_per_beat
+        )
+
+        end_sample = max([int(np.max(starts + lengths)) for starts, lengths, _, _ in (melody, harmony)
+                          if len(starts)], default=0)
+        length = min(int(max_duration * self.sample_rate), end_sample)
+
+        audio = self._render_layer(*melody, length, self.melody_harmonics)
+        audio *= np.float32(self.melody_gain)
+        harmony_audio = self._render_layer(*harmony, length, [(1, 1.0)])
+        harmony_audio *= np.float32(self.harmony_gain)
+        audio += harmony_audio
+
+        peak = np.max(np.abs(audio)) if length else 0
+        if peak > 0:
+            audio *= np.float32(0.8 / peak)
+
+        return audio
+
+    def render_bytes(self, melody_result: Dict[str, Any], output_format: str = 'wav',
+                     max_duration: Optional[float] = None) -> bytes:
+        """Render a preview and encode it (WAV via the standard library, others via soundfile)"""
+        audio = self.render(melody_result, max_duration)
+
+        if output_format.lower() == 'wav':
+            # render() already peaks at 0.8, so no clipping is needed
+            pcm = (audio * np.float32(32767)).astype('<i2')
+            buffer = io.BytesIO()
+            with wave.open(buffer, 'wb') as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(self.sample_rate)
+                wav_file.writeframes(pcm.tobytes())
+            return buffer.getvalue()
+
+        import soundfile as sf
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, self.sample_rate, format=output_format.upper())
+        return buffer.getvalue()
+
+    def _get_tempo(self, melody_result: Dict[str, Any]) -> float:
+        """Find the tempo in a melody result, defaulting to 120 BPM"""
+        tempo = melody_result.get('melody', {}).get('tempo') or \
+            melody_result.get('metadata', {}).get('tempo') or 120
+        return float(tempo)
+
+    def _note_arrays(self, pitch_rows: List[List[Tuple[str, Optional[int]]]], offsets, durations, amps,
+                     seconds_per_beat: float):
+        """Convert note fields into sample-domain arrays sorted by start, one frequency column per tone"""
+        if not pitch_rows:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros((0, 1), dtype=np.float64), np.zeros(0, dtype=np.float32)
+
+        midi = np.array([[pitch_to_midi(name, octave) for name, octave in row] for row in pitch_rows],
+                        dtype=np.float64)
+        samples_per_beat = seconds_per_beat * self.sample_rate
+        starts = np.round(np.asarray(offsets, dtype=np.float64) * samples_per_beat).astype(np.int64)
+        lengths = np.round(np.asarray(durations, dtype=np.float64) * samples_per_beat).astype(np.int64)
+
+        order = np.argsort(starts, kind='stable')
+        freqs = 440.0 * 2.0 ** ((midi - 69.0) / 12.0)
+        return starts[order], lengths[order], freqs[order], np.asarray(amps, dtype=np.float32)[order]
+
+    def _render_layer(self, starts: np.ndarray, lengths: np.ndarray, freqs: np.ndarray,
+                      amps: np.ndarray, total_samples: int, harmonics) -> np.ndarray:
+        """
+        Render one monophonic layer (one column of freqs per simultaneous tone)
+
+        Notes are laid out as contiguous segments: rests are silent segments
+        and overlaps are cut at the next note. Per-sample values come from
+        np.repeat over the segments. Phase is integrated per segment and
+        carried across boundaries, so it stays continuous without a
+        per-sample cumulative sum.
+        """
+        if len(starts) == 0 or total_samples == 0:
+            return np.zeros(total_samples, dtype=np.float32)
+
+        starts = np.minimum(starts, total_samples)
+        next_starts = np.append(starts[1:], total_samples)
+        ends = np.minimum(np.minimum(starts + lengths, next_starts), total_samples)
+
+        # Interleave notes with the gaps after them: [lead gap, note0, gap0, note1, gap1, ...]
+        seg_lengths = np.empty(2 * len(starts) + 1, dtype=np.int64)
+        seg_lengths[0] = starts[0]
+        seg_lengths[1::2] = ends - starts
+        seg_lengths[2::2] = next_starts - ends
+
+        seg_freqs = np.zeros((len(seg_lengths), freqs.shape[1]), dtype=np.float64)
+        seg_freqs[1::2] = freqs
+        seg_amps = np.zeros(len(seg_lengths), dtype=np.float32)
+        seg_amps[1::2] = amps
+
+        # Phase at the start of every segment, wrapped to one cycle
+        seg_cycles = seg_freqs * (seg_lengths[:, None] / self.sample_rate)
+        start_cycles = np.cumsum(seg_cycles, axis=0) - seg_cycles
+        phase_offsets = ((start_cycles - np.floor(start_cycles)) * 2 * np.pi).astype(np.float32)
+        phase_steps = (seg_freqs * (2 * np.pi / self.sample_rate)).astype(np.float32)
+
+        seg_ends = np.cumsum(seg_lengths).astype(np.int32)
+        seg_starts = seg_ends - seg_lengths.astype(np.int32)
+
+        # Samples since the segment started and until it ends
+        sample_index = np.arange(total_samples, dtype=np.int32)
+        position = sample_index - np.repeat(seg_starts, seg_lengths)
+        remaining = np.repeat(seg_ends, seg_lengths) - sample_index
+        position = position.astype(np.float32)
+
+        # Linear attack/release folded into one gain curve
+        gain = np.repeat(seg_amps, seg_lengths)
+        envelope = position * np.float32(1.0 / (self.attack * self.sample_rate))
+        release = remaining.astype(np.float32)
+        release *= np.float32(1.0 / (self.release * self.sample_rate))
+        np.minimum(envelope, release, out=envelope)
+        np.minimum(envelope, np.float32(1.0), out=envelope)
+        gain *= envelope
+
+        layer = np.zeros(total_samples, dtype=np.float32)
+        scratch = np.empty(total_samples, dtype=np.float32)
+
+        for tone in range(freqs.shape[1]):
+            phase = np.repeat(phase_steps[:, tone], seg_lengths)
+            phase *= position
+            phase += np.repeat(phase_offsets[:, tone], seg_lengths)
+
+            for multiple, level in harmonics:
+                if multiple == 1:
+                    np.sin(phase, out=scratch)
+                else:
+                    np.multiply(phase, np.float32(multiple), out=scratch)
+                    np.sin(scratch, out=scratch)
+                if level != 1:
+                    scratch *= np.float32(level)
+                layer += scratch
+
+        layer *= gain
+        return layer
+
+
+# Main API function
+def render_melody_preview(melody_result: Dict[str, Any], output_format: str = 'wav',
+                          max_duration: float = 30.0) -> bytes:
+    """Render encoded preview audio for a generated melody"""
+    renderer = MelodyPreviewRenderer()
+    return renderer.render_bytes(melody_result, output_format, max_duration)
+
+# CLI interface
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        import argparse
+        parser = argparse.ArgumentParser(description='Render a quick preview of a generated melody')
+        parser.add_argument('melody_file', help='JSON file with a generate_melody result')
+        parser.add_argument('--output', default='preview.wav', help='Output audio path')
+        parser.add_argument('--format', default='wav', help='Output format')
+        parser.add_argument('--max-duration', type=float, default=30.0, help='Preview length in seconds')
+
+        args = parser.parse_args()
+
+        with open(args.melody_file, 'r') as f:
+            melody_result = json.load(f)
+
+        audio_bytes = render_melody_preview(melody_result, args.format, args.max_duration)
+        with open(args.output, 'wb') as f:
+            f.write(audio_bytes)
+
+        print(json.dumps({'output_path': args.output, 'bytes': len(audio_bytes)}))
+    else:
+        # Read from stdin for API calls
+        try:
+            input_data = sys.stdin.read()
+            if input_data:
+                data = json.loads(input_data)
+                output_format = data.get('output_format', 'wav')
+                audio_bytes = render_melody_preview(data['melody_result'], output_format,
+                                                    data.get('max_duration', 30.0))
+                print(json.dumps({
+                    'format': output_format,
+                    'sample_rate': 22050,
+                    'audio_base64': base64.b64encode(audio_bytes).decode('ascii')
+                }))
+        except (json.JSONDecodeError, KeyError):
+            print(json.dumps({"error": "Invalid JSON input"}))
+        except Exception as e:
+            print(json.dumps({"error": str(e)}))
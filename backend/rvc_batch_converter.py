@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Batch RVC Conversion for Burnt Beats
+Converts many (source, model, pitch_shift) jobs with one service: jobs are
+grouped by model so each checkpoint is loaded once, short clips that share
+a model and shift are packed into one inference call, and results are
+yielded as soon as each unit finishes.
+"""
+
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Iterator
+
+import numpy as np
+import soundfile as sf
+
+from audio_io import load_audio, get_audio_info
+
+logger = logging.getLogger(__name__)
+
+
+class BatchRVCConverter:
+    """
+    Model-grouped batch conversion through one Ocean82RVCService
+
+    Groups run in order of each model's first job, and each model is
+    dropped from the service's cache once its group is done, so at most
+    one checkpoint is held at a time. Within a group, clips shorter than
+    `pack_seconds` with the same pitch shift are concatenated, with
+    `gap_seconds` of silence between them, into packs of up to
+    `max_pack_seconds`. A pack is converted in a single call and cut back
+    apart at the scaled boundaries. If a pack fails, its clips are retried
+    one by one, so one bad clip cannot fail its neighbours.
+    """
+
+    def __init__(self, service=None, pack_seconds: float = 12.0, max_pack_seconds: float = 60.0,
+                 gap_seconds: float = 0.5):
+        if service is None:
+            from rvc_voice_service import Ocean82RVCService
+            service = Ocean82RVCService()
+        self.service = service
+        self.pack_seconds = pack_seconds
+        self.max_pack_seconds = max_pack_seconds
+        self.gap_seconds = gap_seconds
+
+    @staticmethod
+    def validate_job(job: Any) -> Optional[str]:
+        """Why a job cannot be planned, or None if it is well formed"""
+        if not isinstance(job, dict):
+            return "Job must be an object"
+        for field in ('source_audio', 'model_path'):
+            if not isinstance(job.get(field), str) or not job[field]:
+                return f"Job needs a {field}"
+        try:
+            float(job.get('pitch_shift', 0.0))
+        except (TypeError, ValueError):
+            return f"pitch_shift must be a number, got {job.get('pitch_shift')!r}"
+        return None
+
+    def plan(self, jobs: List[Dict[str, Any]]) -> "OrderedDict[str, List[List[Dict[str, Any]]]]":
+        """
+        {model_path: [unit, ...]} where a unit is a list of jobs converted in one call
+
+        Jobs gain 'index' (their position in the input) and 'duration'.
+        Malformed jobs (see validate_job) are left out. Unreadable sources
+        become single-job units and fail at conversion.
+        """
+        groups = OrderedDict()
+        for index, job in enumerate(jobs):
+            if self.validate_job(job) is not None:
+                continue
+            job = dict(job, index=index, pitch_shift=float(job.get('pitch_shift', 0.0)))
+            try:
+                job['duration'] = get_audio_info(job['source_audio'])[0]
+            except Exception:
+                job['duration'] = None
+            groups.setdefault(os.path.abspath(job['model_path']), []).append(job)
+
+        plan = OrderedDict()
+        for model_path, model_jobs in groups.items():
+            units, open_packs = [], {}
+            for job in model_jobs:
+                if job['duration'] is None or job['duration'] >= self.pack_seconds:
+                    units.append([job])
+                    continue
+
+                # First fit into the open pack for this pitch shift, or start a new one
+                pack = open_packs.get(job['pitch_shift'])
+                if pack is None or self._pack_seconds(pack) + self.gap_seconds + job['duration'] > self.max_pack_seconds:
+                    pack = []
+                    open_packs[job['pitch_shift']] = pack
+                    units.append(pack)
+                pack.append(job)
+            plan[model_path] = units
+
+        return plan
+
+    def _pack_seconds(self, pack: List[Dict[str, Any]]) -> float:
+        return sum(job['duration'] for job in pack) + self.gap_seconds * (len(pack) - 1)
+
+    def convert(self, jobs: List[Dict[str, Any]], index_rate: float = 0.5) -> Iterator[Dict[str, Any]]:
+        """
+        Yield one result per job, unit by unit, as conversions finish (not in input order)
+
+        Malformed jobs are reported first, as error results, and do not stop the batch.
+        """
+        for index, job in enumerate(jobs):
+            error = self.validate_job(job)
+            if error is not None:
+                logger.warning(f"⚠️ Batch job {index} skipped: {error}")
+                yield {'index': index, 'error': error}
+
+        plan = self.plan(jobs)
+        logger.info(f"📦 Batch conversion: {len(jobs)} jobs, {len(plan)} models, "
+                    f"{sum(len(units) for units in plan.values())} inference calls")
+
+        for model_path, units in plan.items():
+            for unit in units:
+                start = time.perf_counter()
+                if len(unit) > 1:
+                    results = self._convert_pack(unit, model_path, index_rate)
+                else:
+                    results = [self._convert_single(unit[0], model_path, index_rate)]
+
+                elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+                for result in results:
+                    result['packed_with'] = len(unit)
+                    result['elapsed_ms'] = elapsed_ms
+                    yield result
+
+            # This model's jobs are done; never hold more than one checkpoint
+            self.service.loaded_models.pop(model_path, None)
+
+    def _result(self, job: Dict[str, Any], output_path: Optional[str] = None,
+                error: Optional[str] = None) -> Dict[str, Any]:
+        result = {
+            'index': job['index'],
+            'source_audio': job['source_audio'],
+            'model_path': job['model_path'],
+            'pitch_shift': job['pitch_shift']
+        }
+        if error is None:
+            result['output_path'] = output_path
+        else:
+            result['error'] = error
+        return result
+
+    def _convert_single(self, job: Dict[str, Any], model_path: str, index_rate: float) -> Dict[str, Any]:
+        try:
+            output_path = self.service.convert_voice(job['source_audio'], model_path, job['pitch_shift'], index_rate)
+            return self._result(job, output_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Batch job {job['index']} failed: {e}")
+            return self._result(job, error=str(e))
+
+    def _convert_pack(self, pack: List[Dict[str, Any]], model_path: str, index_rate: float) -> List[Dict[str, Any]]:
+        """Concatenate, convert once, cut back apart; falls back to one call per clip"""
+        scratch = self.service.scratch
+        sr = self.service.sample_rate
+        gap = np.zeros(int(self.gap_seconds * sr), dtype=np.float32)
+        pack_path = converted_path = None
+
+        try:
+            pieces, bounds, position = [], [], 0
+            for job in pack:
+                audio, _ = load_audio(job['source_audio'], sr=sr, cache=False)
+                if pieces:
+                    pieces.append(gap)
+                    position += len(gap)
+                pieces.append(audio)
+                bounds.append((position, position + len(audio)))
+                position += len(audio)
+
+            pack_path = scratch.path('batch_pack')
+            sf.write(pack_path, np.concatenate(pieces), sr)
+            converted_path = self.service.convert_voice(str(pack_path), model_path, pack[0]['pitch_shift'], index_rate)
+
+            # RVC may change the sample rate (and the length by a few frames); scale the cut points
+            converted, out_sr = sf.read(converted_path, dtype='float32')
+            scale = len(converted) / position
+
+            results = []
+            for job, (begin, end) in zip(pack, bounds):
+                output_path = scratch.path('converted')
+                sf.write(output_path, converted[int(round(begin * scale)):int(round(end * scale))], out_sr)
+                results.append(self._result(job, str(output_path)))
+            return results
+
+        except Exception as e:
+            logger.warning(f"⚠️ Packed conversion of {len(pack)} clips failed ({e}); converting one by one")
+            return [self._convert_single(job, model_path, index_rate) for job in pack]
+
+        finally:
+            scratch.discard(pack_path, converted_path)
+
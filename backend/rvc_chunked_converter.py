@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Chunked RVC Conversion for Burnt Beats
+Splits long vocals at quiet points into overlapping chunks, converts them in
+parallel, and crossfades the results back together. Completed chunks are kept
+on disk, so an interrupted conversion resumes where it stopped.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+import numpy as np
+import soundfile as sf
+
+from rvc_training_preprocess import _blas_thread_env
+
+logger = logging.getLogger(__name__)
+
+_worker_service = None
+
+
+def find_split_points(audio_path: str, chunk_seconds: float = 20.0, search_seconds: float = 2.0,
+                      frame_seconds: float = 0.02) -> List[int]:
+    """
+    Chunk boundaries in source samples, each at the quietest frame within
+    +/- search_seconds of the target chunk length
+
+    The RMS envelope is computed block by block, so only one float per
+    20 ms frame is held in memory.
+    """
+    info = sf.info(audio_path)
+    sr = info.samplerate
+    frame = max(1, int(frame_seconds * sr))
+
+    rms = []
+    for block in sf.blocks(audio_path, blocksize=frame * 1024, dtype='float32', always_2d=True):
+        mono = block.mean(axis=1)
+        usable = len(mono) // frame * frame
+        if usable:
+            rms.append(np.sqrt(np.mean(mono[:usable].reshape(-1, frame) ** 2, axis=1)))
+    rms = np.concatenate(rms) if rms else np.zeros(0)
+
+    chunk_frames = int(chunk_seconds / frame_seconds)
+    search_frames = int(search_seconds / frame_seconds)
+
+    boundaries = [0]
+    position = 0
+    # Leave the remainder in the last chunk unless it is at least half a chunk long
+    while len(rms) - position > chunk_frames * 1.5:
+        low = position + chunk_frames - search_frames
+        high = position + chunk_frames + search_frames
+        position = low + int(np.argmin(rms[low:high]))
+        boundaries.append(position * frame)
+    boundaries.append(info.frames)
+
+    return boundaries
+
+
+def _init_worker(threads: int):
+    """Pin torch's thread pool, then build one RVC service per worker (env limits are set by the parent)"""
+    global _worker_service
+
+    import torch
+    torch.set_num_threads(threads)
+
+    from rvc_voice_service import Ocean82RVCService
+    _worker_service = Ocean82RVCService()
+
+
+def _convert_chunk(index: int, chunk_path: str, output_path: str, model_path: str,
+                   pitch_shift: float, index_rate: float) -> int:
+    converted = _worker_service.convert_voice(chunk_path, model_path, pitch_shift, index_rate)
+
+    # Rename into place so a chunk only counts as done once fully written
+    temp_path = f"{output_path}.tmp"
+    shutil.move(converted, temp_path)
+    os.replace(temp_path, output_path)
+    return index
+
+
+class ChunkedRVCConverter:
+    """
+    Overlap-add RVC conversion with bounded memory
+
+    Each chunk extends `overlap_seconds / 2` past its boundaries. The work
+    directory name is a hash of the source, model and settings, and holds
+    the chunk sources, converted chunks and a manifest. Converted chunks
+    are skipped on resume. Stitching streams chunk by chunk, holding only
+    one chunk and one overlap tail.
+    """
+
+    def __init__(self, work_root: str = "temp_audio/chunked", chunk_seconds: float = 20.0,
+                 overlap_seconds: float = 0.5, workers: Optional[int] = None,
+                 threads_per_worker: int = 2):
+        self.work_root = Path(work_root)
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.threads_per_worker = threads_per_worker
+        self.workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    def _work_dir(self, source_path: str, model_path: str, pitch_shift: float, index_rate: float) -> Path:
+        digest = hashlib.sha1()
+        for path in (source_path, model_path):
+            stat = os.stat(path)
+            digest.update(f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}".encode('utf-8'))
+        digest.update(json.dumps([pitch_shift, index_rate, self.chunk_seconds, self.overlap_seconds]).encode('utf-8'))
+        return self.work_root / digest.hexdigest()[:16]
+
+    def _prepare(self, source_path: str, work_dir: Path) -> Dict[str, Any]:
+        """Load the manifest, or split the source and write chunk files"""
+        manifest_path = work_dir / "manifest.json"
+        if manifest_path.exists():
+            with open(manifest_path, 'r') as f:
+                return json.load(f)
+
+        work_dir.mkdir(parents=True, exist_ok=True)
+        boundaries = find_split_points(source_path, self.chunk_seconds)
+        sr = sf.info(source_path).samplerate
+        pad = int(self.overlap_seconds / 2 * sr)
+
+        chunks = []
+        for i, (start, end) in enumerate(zip(boundaries[:-1], boundaries[1:])):
+            padded_start = max(0, start - pad)
+            padded_end = min(boundaries[-1], end + pad)
+            audio, _ = sf.read(source_path, start=padded_start, stop=padded_end, dtype='float32')
+            chunk_path = work_dir / f"chunk_{i:04d}.wav"
+            sf.write(chunk_path, audio, sr)
+            chunks.append({
+                'index': i,
+                'source_path': str(chunk_path),
+                'output_path': str(work_dir / f"converted_{i:04d}.wav"),
+                'pad_left_s': (start - padded_start) / sr,
+                'pad_right_s': (padded_end - end) / sr
+            })
+
+        manifest = {'sample_rate': sr, 'boundaries': boundaries, 'chunks': chunks}
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+    def convert(self, source_path: str, model_path: str, output_path: str, pitch_shift: float = 0.0,
+                index_rate: float = 0.5, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                keep_chunks: bool = False) -> str:
+        """Convert source_path chunk by chunk and write the stitched result to output_path"""
+        work_dir = self._work_dir(source_path, model_path, pitch_shift, index_rate)
+        manifest = self._prepare(source_path, work_dir)
+        chunks = manifest['chunks']
+
+        pending = [c for c in chunks if not os.path.exists(c['output_path'])]
+        done = len(chunks) - len(pending)
+        if done:
+            logger.info(f"♻️ Resuming chunked conversion: {done}/{len(chunks)} chunks already converted")
+
+        def report(chunk_index):
+            progress = {'completed': done, 'total': len(chunks), 'chunk': chunk_index}
+            logger.info(f"🔄 Chunk {chunk_index} converted ({done}/{len(chunks)})")
+            if progress_callback:
+                progress_callback(progress)
+
+        if pending:
+            context = multiprocessing.get_context('spawn')
+            workers = min(self.workers, len(pending))
+            # Spawned workers re-import __main__ (numpy, torch) before the initializer runs
+            with _blas_thread_env(self.threads_per_worker), \
+                    ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                        initargs=(self.threads_per_worker,)) as executor:
+                futures = [executor.submit(_convert_chunk, c['index'], c['source_path'], c['output_path'],
+                                           model_path, pitch_shift, index_rate) for c in pending]
+                for future in as_completed(futures):
+                    index = future.result()
+                    done += 1
+                    report(index)
+
+        self._stitch(chunks, output_path)
+
+        if not keep_chunks:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        return output_path
+
+    def _stitch(self, chunks: List[Dict[str, Any]], output_path: str):
+        """Linear crossfade across each boundary's overlap, streamed to the output file"""
+        out_sr = sf.info(chunks[0]['output_path']).samplerate
+        tail = np.zeros(0, dtype=np.float32)
+
+        with sf.SoundFile(output_path, 'w', samplerate=out_sr, channels=1) as out:
+            for chunk in chunks:
+                audio, sr = sf.read(chunk['output_path'], dtype='float32', always_2d=True)
+                audio = audio.mean(axis=1)
+                if sr != out_sr:
+                    raise ValueError(f"Chunk {chunk['index']} has sample rate {sr}, expected {out_sr}")
+
+                # Crossfade with the previous chunk's tail
+                overlap = min(len(tail), len(audio))
+                if overlap:
+                    fade_in = np.linspace(0.0, 1.0, overlap, dtype=np.float32)
+                    audio[:overlap] = tail[:overlap] * (1 - fade_in) + audio[:overlap] * fade_in
+
+                # The overlap with the next chunk (its left pad plus our right pad) becomes the new tail
+                right = min(int(round(2 * chunk['pad_right_s'] * out_sr)), len(audio) - overlap)
+                out.write(audio[:len(audio) - right])
+                tail = audio[len(audio) - right:].copy()
+
+            out.write(tail)
+
+
+# Main API function
+def convert_long_vocal(source_path: str, model_path: str, output_path: str, pitch_shift: float = 0.0,
+                       index_rate: float = 0.5, workers: Optional[int] = None) -> str:
+    """Chunked, resumable RVC conversion of a long vocal"""
+    converter = ChunkedRVCConverter(workers=workers)
+    return converter.convert(source_path, model_path, output_path, pitch_shift, index_rate)
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+CPU Inference Mode for Burnt Beats RVC
+Dynamic int8 quantisation of the voice synthesizer (cached next to the
+.pth), pinned torch thread pools, and a measured quality/speed report
+against fp32 on a fixed test clip
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTIZED_SUFFIX = ".int8.pt"
+
+# Synthesizer class in the fork's infer_pack.models by (version, f0)
+SYNTHESIZER_CLASSES = {
+    ('v1', 1): 'SynthesizerTrnMs256NSFsid',
+    ('v1', 0): 'SynthesizerTrnMs256NSFsid_nono',
+    ('v2', 1): 'SynthesizerTrnMs768NSFsid',
+    ('v2', 0): 'SynthesizerTrnMs768NSFsid_nono'
+}
+INFER_PACK_MODULES = ('infer.lib.infer_pack.models', 'lib.infer_pack.models', 'infer_pack.models')
+
+
+def configure_cpu_threads(intra_op_threads: Optional[int] = None, inter_op_threads: int = 1) -> Dict[str, int]:
+    """
+    Pin torch's intra-op and inter-op thread pools
+
+    intra_op_threads=None keeps torch's current count (physical cores, or
+    OMP_NUM_THREADS when a worker pool has set it). RVC inference is one
+    long chain of ops, so a single inter-op thread avoids oversubscription.
+    """
+    import torch
+
+    torch.set_num_threads(intra_op_threads or torch.get_num_threads())
+    try:
+        torch.set_num_interop_threads(inter_op_threads)
+    except RuntimeError:
+        # Can only be set once per process, before any parallel work starts
+        pass
+
+    return {'intra_op_threads': torch.get_num_threads(), 'inter_op_threads': torch.get_num_interop_threads()}
+
+
+def build_synthesizer(checkpoint):
+    """
+    The fork's synthesizer network for a plain RVC checkpoint, or None
+
+    RVC checkpoints are {'weight': state dict, 'config': constructor args,
+    'f0', 'version'}. The network class comes from the fork's infer_pack
+    (rvc_source must be on sys.path), picked by version and f0. The
+    speaker count is taken from the embedding weights, as the fork does,
+    and the training-only posterior encoder is dropped.
+    """
+    import importlib
+
+    if not isinstance(checkpoint, dict) or 'weight' not in checkpoint or 'config' not in checkpoint:
+        return None
+
+    class_name = SYNTHESIZER_CLASSES.get((checkpoint.get('version', 'v1'), int(checkpoint.get('f0', 1))))
+    if class_name is None:
+        logger.warning(f"⚠️ Unknown RVC checkpoint version {checkpoint.get('version')!r}")
+        return None
+
+    for module_name in INFER_PACK_MODULES:
+        try:
+            models = importlib.import_module(module_name)
+            break
+        except ImportError:
+            continue
+    else:
+        logger.warning("⚠️ RVC infer_pack not importable; is rvc_source on sys.path?")
+        return None
+
+    try:
+        config = list(checkpoint['config'])
+        config[-3] = checkpoint['weight']['emb_g.weight'].shape[0]
+        net_g = getattr(models, class_name)(*config, is_half=False)
+        if hasattr(net_g, 'enc_q'):
+            del net_g.enc_q
+        net_g.load_state_dict(checkpoint['weight'], strict=False)
+        return net_g.eval()
+    except Exception as e:
+        logger.warning(f"⚠️ Could not build {class_name} from checkpoint: {e}")
+        return None
+
+
+def quantize_checkpoint(checkpoint) -> Optional[Dict[str, Any]]:
+    """
+    Dynamic int8 quantisation of a plain RVC checkpoint's synthesizer
+
+    Returns {'net_g': quantised network, 'quantization': coverage}, or None
+    when the network cannot be built or has nothing to quantise. Linear
+    and recurrent layers get int8 weights with activations quantised on
+    the fly; torch's dynamic quantisation has no conv kernels, so conv
+    layers stay fp32. The synthesizer is mostly conv (its Linear layers
+    are few, e.g. emb_phone), so 'parameter_fraction' reports how much of
+    it was actually quantised; whether that pays off is for
+    benchmark_cpu_inference to measure.
+    """
+    import torch
+    from torch import nn
+
+    model = build_synthesizer(checkpoint)
+    if model is None:
+        return None
+
+    layer_types = {nn.Linear, nn.LSTM, nn.GRU}
+    layers = [module for module in model.modules() if type(module) in layer_types]
+    if not layers:
+        return None
+
+    total = sum(parameter.numel() for parameter in model.parameters())
+    quantized = sum(parameter.numel() for layer in layers for parameter in layer.parameters())
+    return {
+        'net_g': torch.ao.quantization.quantize_dynamic(model, layer_types, dtype=torch.qint8),
+        'quantization': {
+            'layers': len(layers),
+            'parameter_fraction': round(quantized / max(total, 1), 4)
+        }
+    }
+
+
+def quantized_path(model_path: str) -> Path:
+    return Path(model_path).with_suffix(QUANTIZED_SUFFIX)
+
+
+def load_cpu_model(model_path: str, quantize: bool = True) -> Dict[str, Any]:
+    """
+    Load a checkpoint for CPU inference
+
+    Always returns the checkpoint dict the fork's inference API takes
+    ('weight', 'config', 'f0', 'version', 'tgt_sr', ...). With quantize
+    set, the int8 synthesizer is attached as 'net_g', with its coverage
+    under 'quantization'; a loader that builds its own network from
+    'weight' simply ignores them. The quantised network is saved as
+    <name>.int8.pt next to the checkpoint and reused while it is newer
+    than the .pth. When nothing can be quantised, no cache file is written.
+    """
+    import torch
+    from torch import nn
+
+    checkpoint = torch.load(model_path, map_location='cpu')
+    if not quantize:
+        return checkpoint
+
+    cache_path = quantized_path(model_path)
+    if cache_path.exists() and cache_path.stat().st_mtime_ns >= os.stat(model_path).st_mtime_ns:
+        try:
+            cached = torch.load(cache_path, map_location='cpu', weights_only=False)
+            if isinstance(cached, dict) and isinstance(cached.get('net_g'), nn.Module):
+                return dict(checkpoint, **cached)
+            logger.warning(f"⚠️ Ignoring {cache_path}: not a quantised network")
+        except Exception as e:
+            logger.warning(f"⚠️ Ignoring unreadable quantised model {cache_path}: {e}")
+
+    start = time.perf_counter()
+    quantized = quantize_checkpoint(checkpoint)
+    if quantized is None:
+        logger.info(f"ℹ️ Nothing to quantise in {Path(model_path).name}; using fp32")
+        return checkpoint
+
+    temp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    torch.save(quantized, temp_path)
+    os.replace(temp_path, cache_path)
+
+    logger.info(f"✅ Quantised {quantized['quantization']['layers']} layer(s) of {Path(model_path).name} "
+                f"({quantized['quantization']['parameter_fraction']:.1%} of parameters) "
+                f"in {time.perf_counter() - start:.1f}s")
+    return dict(checkpoint, **quantized)
+
+
+def is_quantized(model) -> bool:
+    """Whether load_cpu_model attached a quantised network to the checkpoint"""
+    return isinstance(model, dict) and 'net_g' in model
+
+
+def write_reference_clip(path: str, sample_rate: int = 44100, duration: float = 6.0) -> str:
+    """
+    Deterministic sung-vowel test clip: a five-note phrase with vibrato,
+    harmonics and light breath noise
+    """
+    import soundfile as sf
+
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    notes = np.array([220.0, 246.9, 261.6, 293.7, 329.6])
+    f0 = notes[np.minimum((t / duration * len(notes)).astype(int), len(notes) - 1)]
+    f0 = f0 * (1 + 0.006 * np.sin(2 * np.pi * 5.5 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+
+    audio = sum(np.sin(h * phase) / h for h in range(1, 9))
+    audio += 0.02 * np.random.default_rng(0).standard_normal(len(t))
+    audio *= 0.3 * np.minimum(1.0, np.minimum(t, duration - t) / 0.05)
+
+    sf.write(path, audio.astype(np.float32), sample_rate)
+    return path
+
+
+def _log_spectral_distance(reference: np.ndarray, test: np.ndarray) -> float:
+    """Mean log-spectral distance in dB over 2048-point frames"""
+    import librosa
+
+    ref_power = np.abs(librosa.stft(reference, n_fft=2048)) ** 2 + 1e-10
+    test_power = np.abs(librosa.stft(test, n_fft=2048)) ** 2 + 1e-10
+    return float(np.mean(np.sqrt(np.mean((10 * np.log10(ref_power / test_power)) ** 2, axis=0))))
+
+
+def benchmark_cpu_inference(infer_func, model_path: str, clip_path: Optional[str] = None,
+                            index_rate: float = 0.5, runs: int = 3, work_dir: str = "temp_audio") -> Dict[str, Any]:
+    """
+    Convert a fixed clip with the fp32 and the int8 model and report speed and quality
+
+    Speed is the median wall time over `runs` conversions and the real-time
+    factor (seconds of compute per second of audio). Quality is the SNR of
+    the int8 output against the fp32 output and their log-spectral distance.
+    When the checkpoint has nothing to quantise, only fp32 is reported;
+    'int8_used' is False when the fork ignored the attached int8 network.
+    """
+    import torch
+    from audio_io import load_audio
+    from rvc_inference_server import run_rvc_inference
+
+    work_dir = Path(work_dir)
+    work_dir.mkdir(exist_ok=True)
+    clip_path = clip_path or write_reference_clip(str(work_dir / "cpu_benchmark_clip.wav"))
+    clip, clip_sr = load_audio(clip_path, cache=False)
+    clip_seconds = len(clip) / clip_sr
+
+    report = {
+        'model_path': str(model_path),
+        'clip_path': str(clip_path),
+        'clip_seconds': round(clip_seconds, 2),
+        'threads': configure_cpu_threads()
+    }
+    outputs = {}
+
+    models = {'fp32': load_cpu_model(model_path, quantize=False)}
+    quantized = load_cpu_model(model_path, quantize=True)
+    if is_quantized(quantized):
+        models['int8'] = quantized
+        report['quantization'] = quantized['quantization']
+    else:
+        report['int8'] = None
+        report['int8_unavailable'] = "nothing in the checkpoint could be quantised"
+
+    for mode, model in models.items():
+        output_path = work_dir / f"cpu_benchmark_{mode}.wav"
+
+        timings = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run_rvc_inference(infer_func, clip_path, model, output_path, index_rate, 'cpu')
+            timings.append(time.perf_counter() - start)
+
+        outputs[mode], _ = load_audio(str(output_path), cache=False)
+        median = float(np.median(timings))
+        report[mode] = {
+            'median_seconds': round(median, 3),
+            'real_time_factor': round(median / clip_seconds, 3)
+        }
+
+    report['fp32']['model_mb'] = round(os.path.getsize(model_path) / (1024 * 1024), 2)
+    if 'int8' not in models:
+        return report
+
+    report['int8']['quantized_net_mb'] = round(quantized_path(model_path).stat().st_size / (1024 * 1024), 2)
+
+    reference, test = outputs['fp32'], outputs['int8']
+    length = min(len(reference), len(test))
+    reference, test = reference[:length], test[:length]
+    noise = np.sum((reference - test) ** 2)
+    # Identical output means the fork built its own fp32 network and never used net_g
+    report['int8_used'] = bool(noise > 0)
+    report['speedup'] = round(report['fp32']['median_seconds'] / max(report['int8']['median_seconds'], 1e-9), 2)
+    report['quality'] = {
+        'snr_db': round(float(10 * np.log10(np.sum(reference ** 2) / noise)), 2) if noise > 0 else None,
+        'log_spectral_distance_db': round(_log_spectral_distance(reference, test), 3)
+    }
+
+    return report
+
+# CLI interface
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='RVC CPU inference: quantise checkpoints and compare int8 with fp32')
+    parser.add_argument('command', choices=['quantize', 'benchmark'])
+    parser.add_argument('--model-path', required=True, help='Voice checkpoint (.pth)')
+    parser.add_argument('--clip', help='Test clip (default: built-in reference phrase)')
+    parser.add_argument('--runs', type=int, default=3, help='Timed conversions per mode')
+    parser.add_argument('--threads', type=int, help='Intra-op threads (default: physical cores)')
+    parser.add_argument('--rvc-source', default='rvc_source', help='Ocean82/RVC checkout')
+
+    args = parser.parse_args()
+
+    try:
+        configure_cpu_threads(args.threads)
+        sys.path.insert(0, args.rvc_source)
+        if args.command == 'quantize':
+            quantized = is_quantized(load_cpu_model(args.model_path))
+            result = {'quantized': quantized,
+                      'quantized_path': str(quantized_path(args.model_path)) if quantized else None}
+        else:
+            from rvc.infer import infer_audio
+            result = benchmark_cpu_inference(infer_audio, args.model_path, args.clip, runs=args.runs)
+
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+RVC Inference Server for Burnt Beats
+Long-lived process that keeps torch, the Ocean82/RVC inference code and recently
+used voice checkpoints in memory, and serves conversion jobs over a Unix socket
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import logging
+import threading
+import socketserver
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+import numpy as np
+
+from scratch_store import default_scratch_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.environ.get('RVC_INFERENCE_SOCKET', 'temp_audio/rvc_infer.sock')
+
+
+class RVCInferenceError(Exception):
+    """A conversion job failed inside the server"""
+
+
+def run_rvc_inference(infer_func, source_path: Union[str, Path], model, output_path: Union[str, Path],
+                      index_rate: float, device: str, f0_up_key: float = 0.0):
+    """
+    The single call into the Ocean82/RVC inference API
+
+    Shared by the server and Ocean82RVCService._convert_with_api, so an API
+    change in the fork only needs fixing here. Runs under inference_mode:
+    no autograd graph or version counters are kept. f0_up_key transposes
+    RVC's f0 track (see rvc_pitch_shift.can_fold_pitch_shift).
+    """
+    import torch
+    from rvc_pitch_shift import transpose_parameter
+
+    kwargs = {}
+    if f0_up_key:
+        kwargs[transpose_parameter(infer_func)] = int(f0_up_key)
+
+    with torch.inference_mode():
+        return infer_func(
+            input_path=str(source_path),
+            model=model,
+            output_path=str(output_path),
+            index_rate=index_rate,
+            device=device,
+            **kwargs
+        )
+
+
+class RVCModelCache:
+    """LRU of loaded voice checkpoints keyed by (path, mtime); int8-quantised when `quantize` is set"""
+
+    def __init__(self, max_models: int = 4, device: str = 'cpu', quantize: bool = False):
+        self.max_models = max_models
+        self.device = device
+        self.quantize = quantize
+        self.models = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_path: str):
+        import torch
+
+        key = (os.path.abspath(model_path), os.stat(model_path).st_mtime_ns)
+        if key in self.models:
+            self.models.move_to_end(key)
+            self.hits += 1
+            return self.models[key]
+
+        self.misses += 1
+        if self.quantize:
+            from rvc_cpu_inference import load_cpu_model
+            model = load_cpu_model(model_path)
+        else:
+            model = torch.load(model_path, map_location=self.device)
+        self.models[key] = model
+        if len(self.models) > self.max_models:
+            self.models.popitem(last=False)
+        return model
+
+
+class RVCInferenceServer:
+    """
+    Serves conversion jobs from a single inference thread
+
+    Connections are handled on their own threads and only parse requests.
+    Jobs go through one queue to one worker, so the GPU runs a single
+    conversion at a time.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, rvc_source_dir: str = "rvc_source",
+                 max_models: int = 4, device: Optional[str] = None, quantize: Optional[bool] = None):
+        self.socket_path = Path(socket_path)
+        self.rvc_source_dir = Path(rvc_source_dir)
+        self.temp_dir = Path("temp_audio")
+        self.temp_dir.mkdir(exist_ok=True)
+        self.scratch = default_scratch_store()
+        self.sample_rate = 44100  # Match Ocean82RVCService
+
+        self.jobs = queue.Queue()
+        self.completed = 0
+        self.started_at = time.time()
+
+        self._load_runtime(device)
+        
+        # CPU inference mode: int8 checkpoints and pinned thread pools
+        self.quantize = self.device == 'cpu' if quantize is None else quantize
+        if self.device == 'cpu':
+            from rvc_cpu_inference import configure_cpu_threads
+            configure_cpu_threads()
+        self.model_cache = RVCModelCache(max_models, self.device, self.quantize)
+
+    def _load_runtime(self, device: Optional[str]):
+        """Import torch and the RVC inference API once for the life of the server"""
+        import torch
+
+        self.device = device or ("cuda:0" if torch.cuda.is_available() else "cpu")
+
+        sys.path.insert(0, str(self.rvc_source_dir))
+        from rvc.infer import infer_audio
+        self.infer_func = infer_audio
+
+        logger.info(f"✅ RVC runtime loaded on {self.device}")
+
+    def convert(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one conversion job (called only from the inference thread)"""
+        import soundfile as sf
+        from audio_io import load_audio
+        from rvc_pitch_shift import can_fold_pitch_shift, pitch_shift as shift_pitch
+
+        start = time.perf_counter()
+        source_path = request['source_path']
+        model = self.model_cache.get(request['model_path'])
+        pitch_shift = float(request.get('pitch_shift', 0.0))
+
+        # Whole-semitone shifts go to RVC's f0 track; anything else shifts the audio first
+        f0_up_key = pitch_shift if can_fold_pitch_shift(self.infer_func, pitch_shift) else 0.0
+        shift_audio = pitch_shift != 0.0 and not f0_up_key
+
+        # One scratch job per request: the shifted source goes when it closes, the output is kept
+        with self.scratch.job('server') as job:
+            if shift_audio:
+                source_audio, sr = load_audio(source_path, sr=self.sample_rate)
+                source_audio = shift_pitch(source_audio, sr, pitch_shift)
+                source_path = job.path('source')
+                sf.write(source_path, source_audio, sr)
+
+            output_path = request.get('output_path') or job.path('converted')
+            run_rvc_inference(self.infer_func, source_path, model, output_path,
+                              float(request.get('index_rate', 0.5)), self.device, f0_up_key)
+            if not request.get('output_path'):
+                job.keep(output_path)
+
+        self.completed += 1
+        return {
+            'status': 'ok',
+            'output_path': str(output_path),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1)
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'status': 'ok',
+            'device': self.device,
+            'quantized': self.quantize,
+            'completed': self.completed,
+            'queued': self.jobs.qsize(),
+            'loaded_models': len(self.model_cache.models),
+            'model_cache_hits': self.model_cache.hits,
+            'model_cache_misses': self.model_cache.misses,
+            'uptime_s': round(time.time() - self.started_at, 1)
+        }
+
+    def _inference_worker(self):
+        while True:
+            request, reply = self.jobs.get()
+            try:
+                reply.put(self.convert(request))
+            except Exception as e:
+                logger.error(f"❌ Conversion job failed: {e}")
+                reply.put({'status': 'error', 'error': str(e)})
+
+    def serve_forever(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    try:
+                        request = json.loads(line)
+                        command = request.get('command', 'convert')
+                    except json.JSONDecodeError:
+                        self._send({'status': 'error', 'error': 'Invalid JSON request'})
+                        continue
+
+                    if command == 'ping':
+                        self._send({'status': 'ok'})
+                    elif command == 'stats':
+                        self._send(server.stats())
+                    elif command == 'shutdown':
+                        self._send({'status': 'ok'})
+                        threading.Thread(target=unix_server.shutdown, daemon=True).start()
+                        return
+                    elif command == 'convert':
+                        reply = queue.Queue(maxsize=1)
+                        server.jobs.put((request, reply))
+                        self._send_result(reply.get(), request.get('return_pcm', False))
+                    else:
+                        self._send({'status': 'error', 'error': f"Unknown command: {command}"})
+
+            def _send(self, response: Dict[str, Any], payload: bytes = b''):
+                self.wfile.write(json.dumps(response).encode('utf-8') + b'\n' + payload)
+                self.wfile.flush()
+
+            def _send_result(self, result: Dict[str, Any], return_pcm: bool):
+                if result['status'] != 'ok' or not return_pcm:
+                    self._send(result)
+                    return
+
+                # Header line with the byte count, then raw float32 PCM
+                from audio_io import load_audio
+                pcm, sr = load_audio(result['output_path'], cache=False)
+                payload = pcm.tobytes()
+                self._send(dict(result, sample_rate=sr, dtype='float32', pcm_bytes=len(payload)), payload)
+
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+
+        threading.Thread(target=self._inference_worker, daemon=True).start()
+
+        unix_server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        unix_server.daemon_threads = True
+        logger.info(f"🎧 RVC inference server listening on {self.socket_path}")
+
+        try:
+            unix_server.serve_forever()
+        finally:
+            unix_server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+
+class RVCInferenceClient:
+    """Client for a running RVCInferenceServer; one connection per client"""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 300.0):
+        self.socket_path = str(socket_path)
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+
+    def _connect(self):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(self.timeout)
+            self._sock.connect(self.socket_path)
+            self._reader = self._sock.makefile('rb')
+
+    def request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self._connect()
+        try:
+            self._sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            line = self._reader.readline()
+            if not line:
+                raise ConnectionError("RVC inference server closed the connection")
+            response = json.loads(line)
+
+            if response.get('pcm_bytes'):
+                response['pcm'] = np.frombuffer(self._reader.read(response.pop('pcm_bytes')), dtype=np.float32)
+        except (OSError, ValueError):
+            self.close()
+            raise
+
+        if response.get('status') != 'ok':
+            raise RVCInferenceError(response.get('error', 'Unknown server error'))
+        return response
+
+    def convert(self, source_path: str, model_path: str, index_rate: float = 0.5, pitch_shift: float = 0.0,
+                output_path: Optional[str] = None, return_pcm: bool = False) -> Dict[str, Any]:
+        """Convert one file; returns output_path (plus pcm/sample_rate when return_pcm is set)"""
+        return self.request({
+            'command': 'convert',
+            'source_path': os.path.abspath(source_path),
+            'model_path': os.path.abspath(model_path),
+            'index_rate': index_rate,
+            'pitch_shift': pitch_shift,
+            'output_path': os.path.abspath(output_path) if output_path else None,
+            'return_pcm': return_pcm
+        })
+
+    def ping(self) -> bool:
+        try:
+            return self.request({'command': 'ping'})['status'] == 'ok'
+        except OSError:
+            return False
+
+    def close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = None
+            self._reader = None
+
+# CLI interface
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Persistent RVC inference server')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='Unix socket path')
+    parser.add_argument('--rvc-source', default='rvc_source', help='Ocean82/RVC checkout')
+    parser.add_argument('--max-models', type=int, default=4, help='Voice checkpoints kept in memory')
+    parser.add_argument('--device', help='Torch device (default: cuda:0 when available)')
+    parser.add_argument('--no-quantize', action='store_true', help='Keep fp32 checkpoints on CPU')
+    parser.add_argument('--stats', action='store_true', help='Print stats of a running server and exit')
+    parser.add_argument('--shutdown', action='store_true', help='Stop a running server and exit')
+
+    args = parser.parse_args()
+
+    if args.stats or args.shutdown:
+        client = RVCInferenceClient(args.socket)
+        print(json.dumps(client.request({'command': 'stats' if args.stats else 'shutdown'}), indent=2))
+    else:
+        RVCInferenceServer(args.socket, args.rvc_source, args.max_models, args.device,
+                           False if args.no_quantize else None).serve_forever()
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+RVC Model Registry for Burnt Beats
+JSON index of trained and imported voice checkpoints (size, hash, sample
+rate, validation, test audio), so listing models never touches the
+checkpoints. Validation reads only the checkpoint's pickle header.
+"""
+
+import os
+import sys
+import json
+import fcntl
+import pickle
+import shutil
+import hashlib
+import zipfile
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bytes per element of torch storage types, for checking storage records against the archive
+STORAGE_ITEM_SIZES = {
+    'DoubleStorage': 8, 'FloatStorage': 4, 'HalfStorage': 2, 'BFloat16Storage': 2,
+    'LongStorage': 8, 'IntStorage': 4, 'ShortStorage': 2, 'CharStorage': 1,
+    'ByteStorage': 1, 'BoolStorage': 1, 'UntypedStorage': 1
+}
+
+
+class _TensorStub:
+    """Stands in for a tensor: shape and storage, no data"""
+
+    def __init__(self, storage, shape):
+        self.storage = storage
+        self.shape = tuple(shape)
+
+    @property
+    def numel(self) -> int:
+        count = 1
+        for dim in self.shape:
+            count *= dim
+        return count
+
+
+class _OpaqueObject:
+    """Stands in for any other class referenced by the checkpoint"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __setstate__(self, state):
+        pass
+
+
+def _rebuild_tensor_stub(storage, storage_offset, size, *args, **kwargs):
+    return _TensorStub(storage, size)
+
+
+def _rebuild_parameter_stub(data, *args, **kwargs):
+    return data
+
+
+def _rebuild_from_type_stub(func, new_type, args, state):
+    return func(*args)
+
+
+class _HeaderUnpickler(pickle.Unpickler):
+    """Unpickles a torch zip checkpoint's data.pkl without torch and without reading storages"""
+
+    def find_class(self, module, name):
+        if module == 'collections' and name == 'OrderedDict':
+            return OrderedDict
+        if module == 'torch._utils' and name.startswith('_rebuild_parameter'):
+            return _rebuild_parameter_stub
+        if module == 'torch._tensor' and name == '_rebuild_from_type_v2':
+            return _rebuild_from_type_stub
+        if module == 'torch._utils' and name.startswith('_rebuild_'):
+            return _rebuild_tensor_stub
+        if module == 'torch' and name.endswith('Storage'):
+            return name
+        return _OpaqueObject
+
+    def persistent_load(self, pid):
+        # ('storage', storage_type, key, location, numel)
+        _, storage_type, key, _, numel = pid
+        return {'type': storage_type if isinstance(storage_type, str) else 'UntypedStorage',
+                'key': str(key), 'numel': numel}
+
+
+def _walk_tensors(obj, depth: int = 0):
+    if depth > 8:
+        return
+    if isinstance(obj, _TensorStub):
+        yield obj
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            yield from _walk_tensors(value, depth + 1)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            yield from _walk_tensors(value, depth + 1)
+
+
+def _checkpoint_sample_rate(checkpoint) -> Optional[int]:
+    """RVC checkpoints store 'sr' as e.g. '40k' or 40000, and repeat it as the last config entry"""
+    if not isinstance(checkpoint, dict):
+        return None
+    sr = checkpoint.get('sr')
+    if isinstance(sr, str) and sr.lower().endswith('k') and sr[:-1].isdigit():
+        return int(sr[:-1]) * 1000
+    if isinstance(sr, int):
+        return sr
+    config = checkpoint.get('config')
+    if isinstance(config, (list, tuple)) and config and isinstance(config[-1], int) and config[-1] >= 8000:
+        return config[-1]
+    return None
+
+
+def _load_header(archive: zipfile.ZipFile) -> Optional[Tuple[Any, str]]:
+    """(object graph with tensor stubs, archive prefix), or None without a data.pkl"""
+    pickle_name = next((name for name in archive.namelist() if name.endswith('/data.pkl') or name == 'data.pkl'), None)
+    if pickle_name is None:
+        return None
+    with archive.open(pickle_name) as f:
+        return _HeaderUnpickler(f).load(), pickle_name[:-len('data.pkl')]
+
+
+def read_checkpoint_header(model_path: str) -> Any:
+    """
+    A zip checkpoint's object graph with tensors replaced by stubs (no weights read)
+
+    Returns None for legacy or unreadable files. Plain values, e.g. the
+    'iteration' RVC stores in its training checkpoints, come back as is.
+    """
+    try:
+        with zipfile.ZipFile(model_path) as archive:
+            header = _load_header(archive)
+    except Exception:
+        return None
+    return header[0] if header else None
+
+
+def inspect_checkpoint(model_path: str) -> Dict[str, Any]:
+    """
+    Validate a checkpoint from its header only
+
+    torch's zip format keeps the object graph in data.pkl and each storage
+    in its own archive member. The graph is unpickled with tensors
+    replaced by stubs, and every referenced storage is checked against the
+    archive directory, so no weights are read.
+    """
+    path = Path(model_path)
+    if not path.exists():
+        return {'valid': False, 'error': 'Model file not found'}
+
+    size_mb = round(path.stat().st_size / (1024 * 1024), 2)
+    if not zipfile.is_zipfile(path):
+        # Pre-1.6 torch.save format has no separate header
+        return {'valid': None, 'format': 'legacy', 'size_mb': size_mb,
+                'error': 'Legacy checkpoint format; header-only validation unavailable'}
+
+    try:
+        with zipfile.ZipFile(path) as archive:
+            members = {info.filename: info.file_size for info in archive.infolist()}
+            header = _load_header(archive)
+            if header is None:
+                return {'valid': False, 'format': 'zip', 'size_mb': size_mb, 'error': 'No data.pkl in checkpoint'}
+            checkpoint, prefix = header
+
+        tensors = list(_walk_tensors(checkpoint))
+        missing = []
+        for tensor in tensors:
+            storage = tensor.storage
+            member = f"{prefix}data/{storage['key']}"
+            expected = storage['numel'] * STORAGE_ITEM_SIZES.get(storage['type'], 1)
+            if members.get(member, -1) < expected:
+                missing.append(storage['key'])
+
+        if missing:
+            return {'valid': False, 'format': 'zip', 'size_mb': size_mb,
+                    'error': f"Missing or truncated storages: {sorted(set(missing))[:10]}"}
+
+        return {
+            'valid': True,
+            'format': 'zip',
+            'size_mb': size_mb,
+            'parameters': len(checkpoint) if isinstance(checkpoint, dict) else 'unknown',
+            'tensors': len(tensors),
+            'parameter_count': sum(tensor.numel for tensor in tensors),
+            'sample_rate': _checkpoint_sample_rate(checkpoint)
+        }
+
+    except Exception as e:
+        return {'valid': False, 'format': 'zip', 'size_mb': size_mb, 'error': f'Failed to read checkpoint header: {e}'}
+
+
+def file_sha256(path: str) -> str:
+    """sha256 of the file's bytes, read in 1 MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class RVCModelRegistry:
+    """
+    Index of voice models at rvc_models/registry.json
+
+    Entries are written when a model is trained, imported or synced.
+    Reads never stat or open checkpoints. Updates are read-modify-write
+    under an flock and replace the file atomically, so the API, training
+    jobs and CLI can share it.
+    """
+
+    def __init__(self, models_dir: str = "rvc_models", default_sample_rate: int = 44100):
+        self.models_dir = Path(models_dir)
+        self.models_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.models_dir / "registry.json"
+        self.default_sample_rate = default_sample_rate
+
+    def _read_index(self) -> Dict[str, Any]:
+        if not self.index_path.exists():
+            return {}
+        try:
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.warning(f"⚠️ Unreadable model registry {self.index_path}; rebuilding")
+            return {}
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        return self._read_index().get('models', {})
+
+    @contextmanager
+    def _editing(self, seed: bool = True):
+        """
+        Locked read-modify-write of the index
+
+        An index that has never been synced is seeded from disk first, under
+        the same lock. Otherwise the first register or import would write an
+        index that hides every checkpoint already in rvc_models.
+        """
+        with open(self.models_dir / "registry.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            index = self._read_index()
+            models = index.get('models', {})
+            if seed and not index.get('synced'):
+                self._reconcile(models)
+            yield models
+            temp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, 'w') as f:
+                json.dump({'version': 1, 'synced': True, 'models': models}, f, indent=2)
+            os.replace(temp_path, self.index_path)
+
+    def is_synced(self) -> bool:
+        """Whether the index has been reconciled with the models directory at least once"""
+        return bool(self._read_index().get('synced'))
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self._read().get(name)
+
+    def list_models(self) -> List[Dict[str, Any]]:
+        return sorted(self._read().values(), key=lambda entry: entry['created'])
+
+    def _build_entry(self, name: str, model_path: Path, previous: Optional[Dict[str, Any]],
+                     validation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        stat = model_path.stat()
+        unchanged = previous and previous['size_bytes'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns
+
+        if validation is None:
+            validation = previous['validation'] if unchanged else inspect_checkpoint(str(model_path))
+
+        return {
+            'id': name,
+            'name': name,
+            'path': str(model_path),
+            'size_bytes': stat.st_size,
+            'size_mb': round(stat.st_size / (1024 * 1024), 2),
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': previous['sha256'] if unchanged else file_sha256(str(model_path)),
+            'sample_rate': validation.get('sample_rate') or self.default_sample_rate,
+            'validation': validation,
+            'test_audio_path': previous.get('test_audio_path') if previous else None,
+            'created': previous['created'] if previous else datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+        }
+
+    def register(self, model_path: str, name: Optional[str] = None, test_audio_path: Optional[str] = None,
+                 validation: Optional[Dict[str, Any]] = None, **metadata) -> Dict[str, Any]:
+        """Add or refresh one model; hashing and validation are skipped while the file is unchanged"""
+        model_path = Path(model_path)
+        name = name or model_path.stem
+
+        with self._editing() as models:
+            entry = self._build_entry(name, model_path, models.get(name), validation)
+            if test_audio_path:
+                entry['test_audio_path'] = str(test_audio_path)
+            entry.update(metadata)
+            models[name] = entry
+
+        logger.info(f"📇 Registered RVC model {name}")
+        return entry
+
+    def import_model(self, source_path: str, name: Optional[str] = None) -> Dict[str, Any]:
+        """Copy an external checkpoint into rvc_models/<name>/<name>.pth and register it"""
+        name = name or Path(source_path).stem
+        validation = inspect_checkpoint(source_path)
+        if validation['valid'] is False:
+            raise ValueError(f"Invalid checkpoint {source_path}: {validation.get('error')}")
+
+        model_dir = self.models_dir / name
+        model_dir.mkdir(parents=True, exist_ok=True)
+        model_path = model_dir / f"{name}.pth"
+        temp_path = model_path.with_suffix(".pth.tmp")
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, model_path)
+
+        return self.register(str(model_path), name, validation=validation, imported_from=os.path.abspath(source_path))
+
+    def remove(self, name: str) -> bool:
+        with self._editing() as models:
+            return models.pop(name, None) is not None
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Reconcile the index with rvc_models/<name>/<name>.pth on disk
+
+        Picks up checkpoints copied in by hand and drops deleted ones. This is
+        the only operation that scans the directory; unchanged files are
+        only stat'ed.
+        """
+        with self._editing(seed=False) as models:
+            return self._reconcile(models)
+
+    def _reconcile(self, models: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Bring `models` in line with the directory, in place; caller holds the lock"""
+        counts = {'added': 0, 'updated': 0, 'removed': 0}
+        on_disk = {}
+        for model_dir in self.models_dir.iterdir():
+            model_file = model_dir / f"{model_dir.name}.pth"
+            if model_dir.is_dir() and model_file.exists():
+                on_disk[model_dir.name] = model_file
+
+        for name in list(models):
+            if name not in on_disk:
+                del models[name]
+                counts['removed'] += 1
+
+        for name, model_file in on_disk.items():
+            previous = models.get(name)
+            entry = self._build_entry(name, model_file, previous, None)
+            if previous is None:
+                counts['added'] += 1
+            elif previous['sha256'] != entry['sha256']:
+                counts['updated'] += 1
+            models[name] = dict(previous or {}, **entry)
+
+        return counts
+
+
+# Main API function
+def list_registered_models(models_dir: str = "rvc_models") -> List[Dict[str, Any]]:
+    return RVCModelRegistry(models_dir).list_models()
+
+# CLI interface
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='RVC model registry')
+    parser.add_argument('command', choices=['list', 'sync', 'import', 'register', 'remove', 'inspect'])
+    parser.add_argument('--model-path', help='Checkpoint to import, register or inspect')
+    parser.add_argument('--name', help='Model name (default: checkpoint file name)')
+    parser.add_argument('--models-dir', default='rvc_models', help='Models directory')
+
+    args = parser.parse_args()
+
+    try:
+        registry = RVCModelRegistry(args.models_dir)
+        if args.command == 'list':
+            result = registry.list_models()
+        elif args.command == 'sync':
+            result = registry.sync()
+        elif args.command == 'import':
+            result = registry.import_model(args.model_path, args.name)
+        elif args.command == 'register':
+            result = registry.register(args.model_path, args.name)
+        elif args.command == 'remove':
+            result = {'removed': registry.remove(args.name)}
+        else:
+            result = inspect_checkpoint(args.model_path)
+
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(1)
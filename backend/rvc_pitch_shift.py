@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Fast Pitch Shifting for Burnt Beats RVC
+WSOLA time-stretch plus one soxr resample, on float32 in blocks of frames,
+in place of librosa's phase-vocoder pitch_shift. When the RVC API can
+transpose its own f0 track, the shift is handed to RVC instead and the
+audio is not touched at all.
+"""
+
+import sys
+import json
+import time
+import inspect
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+import soxr
+
+# Names the RVC forks use for the f0 transpose argument, in semitones
+TRANSPOSE_PARAMETERS = ('f0_up_key', 'transpose', 'pitch')
+
+FRAME_SECONDS = 0.04  # Two to three periods of a low voice
+TOLERANCE_SECONDS = 0.0125  # Search range either side, longer than an 80 Hz period
+SEARCH_DECIMATION = 4
+BLOCK_FRAMES = 512
+
+
+def semitones_to_ratio(n_steps: float) -> float:
+    return float(2.0 ** (n_steps / 12.0))
+
+
+def transpose_parameter(infer_func) -> Optional[str]:
+    """Name of infer_func's f0 transpose argument, or None if the RVC API has none"""
+    try:
+        parameters = inspect.signature(infer_func).parameters
+    except (TypeError, ValueError):
+        return None
+    return next((name for name in TRANSPOSE_PARAMETERS if name in parameters), None)
+
+
+def can_fold_pitch_shift(infer_func, pitch_shift: float) -> bool:
+    """
+    Whether RVC can apply the shift to its f0 track itself
+
+    RVC re-synthesises the voice from the f0 it extracts, so transposing
+    that track is free and avoids processing the audio. The forks round
+    the transpose to whole semitones, so fractional shifts are not folded.
+    """
+    return (infer_func is not None and float(pitch_shift).is_integer()
+            and transpose_parameter(infer_func) is not None)
+
+
+def wsola_time_stretch(audio: np.ndarray, stretch: float, sr: int) -> np.ndarray:
+    """
+    Waveform-similarity overlap-add: output is `stretch` times as long, same pitch
+
+    Hann frames are laid down every half frame. Each one is taken from
+    within TOLERANCE_SECONDS of its nominal input position, at the offset
+    whose start best matches the natural continuation of the previous
+    frame. The offset search is coarse on a decimated copy, then refined
+    at full rate. The overlap-add runs in blocks of BLOCK_FRAMES frames.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    output_length = int(round(len(audio) * stretch))
+    if stretch == 1.0 or len(audio) == 0:
+        return audio.copy()
+
+    hop = max(SEARCH_DECIMATION, int(FRAME_SECONDS * sr) // 2 // SEARCH_DECIMATION * SEARCH_DECIMATION)
+    frame = 2 * hop
+    tolerance = int(TOLERANCE_SECONDS * sr) // SEARCH_DECIMATION * SEARCH_DECIMATION
+    analysis_hop = hop / stretch
+
+    n_frames = output_length // hop + 2
+    positions = np.round(np.arange(n_frames) * analysis_hop).astype(np.int64)
+
+    # Padded so that every frame, candidate and continuation lies inside the signal
+    padded = np.pad(audio, (hop + tolerance, frame + 2 * tolerance + int(np.ceil(analysis_hop))))
+    usable = len(padded) // SEARCH_DECIMATION * SEARCH_DECIMATION
+    decimated = padded[:usable].reshape(-1, SEARCH_DECIMATION).mean(axis=1)
+    template_d = hop // SEARCH_DECIMATION
+    span_d = 2 * tolerance // SEARCH_DECIMATION
+
+    # Views over the padded signal: row i is the hop (or frame) starting at sample i
+    hops = np.lib.stride_tricks.sliding_window_view(padded, hop)
+    frames_view = np.lib.stride_tricks.sliding_window_view(padded, frame)
+
+    # Plain ints: numpy scalar arithmetic would dominate this loop
+    positions = positions.tolist()
+    offsets = [positions[0] + tolerance]
+    for k in range(1, n_frames):
+        natural = offsets[-1] + hop
+        lowest = positions[k]
+
+        # Coarse search at 1/SEARCH_DECIMATION rate
+        nd, ld = natural // SEARCH_DECIMATION, lowest // SEARCH_DECIMATION
+        scores = np.correlate(decimated[ld:ld + span_d + template_d], decimated[nd:nd + template_d], 'valid')
+        coarse = lowest + int(scores.argmax()) * SEARCH_DECIMATION
+
+        # Refine at full rate around the coarse match
+        start = max(lowest, coarse - SEARCH_DECIMATION)
+        stop = min(lowest + 2 * tolerance, coarse + SEARCH_DECIMATION)
+        offsets.append(start + int((hops[start:stop + 1] @ hops[natural]).argmax()))
+    offsets = np.array(offsets)
+
+    # Periodic Hann at half-frame hop sums to one, so no normalisation pass is needed
+    window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(frame) / frame)).astype(np.float32)
+    output = np.empty(n_frames * hop, dtype=np.float32)
+    carry = np.zeros(hop, dtype=np.float32)
+
+    for block_start in range(0, n_frames, BLOCK_FRAMES):
+        block_offsets = offsets[block_start:block_start + BLOCK_FRAMES]
+        frames = frames_view[block_offsets] * window
+
+        # Half-frame hop: each output hop is this frame's first half plus the previous frame's second half
+        heads, tails = frames[:, :hop], frames[:, hop:]
+        heads[0] += carry
+        heads[1:] += tails[:-1]
+        carry = tails[-1].copy()
+        output[block_start * hop:(block_start + len(block_offsets)) * hop] = heads.reshape(-1)
+
+    # Frame k is centred on output sample k * hop - hop; drop the lead-in
+    return output[hop:hop + output_length]
+
+
+def pitch_shift(audio: np.ndarray, sr: int, n_steps: float, quality: str = 'HQ') -> np.ndarray:
+    """
+    Shift pitch by n_steps semitones, keeping duration (float32 in and out)
+
+    Drop-in replacement for librosa.effects.pitch_shift: stretch by the
+    pitch ratio with WSOLA, then resample back to the original length.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if n_steps == 0.0 or len(audio) == 0:
+        return audio.copy()
+
+    ratio = semitones_to_ratio(n_steps)
+    stretched = wsola_time_stretch(audio, ratio, sr)
+    shifted = soxr.resample(stretched, sr * ratio, sr, quality=quality)
+
+    # soxr's output length can differ by a sample from the input
+    if len(shifted) >= len(audio):
+        return np.ascontiguousarray(shifted[:len(audio)], dtype=np.float32)
+    return np.pad(shifted, (0, len(audio) - len(shifted))).astype(np.float32)
+
+
+def _median_pitch_error_cents(original: np.ndarray, shifted: np.ndarray, sr: int, n_steps: float) -> float:
+    """Median |error| in cents of the frame-wise f0 ratio against the requested shift"""
+    import librosa
+
+    f0_original = librosa.yin(original, fmin=60, fmax=1200, sr=sr, frame_length=2048)
+    f0_shifted = librosa.yin(shifted, fmin=60, fmax=1200, sr=sr, frame_length=2048)
+    length = min(len(f0_original), len(f0_shifted))
+    f0_original, f0_shifted = f0_original[:length], f0_shifted[:length]
+
+    # Skip the edges, where yin sees the fades
+    voiced = slice(4, length - 4)
+    cents = 1200 * np.log2(f0_shifted[voiced] / f0_original[voiced]) - 100 * n_steps
+    return float(np.median(np.abs(cents)))
+
+
+def benchmark_pitch_shift(clip_path: Optional[str] = None, shifts: Optional[List[float]] = None,
+                          runs: int = 3, work_dir: str = "temp_audio") -> Dict[str, Any]:
+    """
+    Time the WSOLA path against librosa.effects.pitch_shift and measure pitch accuracy
+
+    Speed is the median wall time over `runs` shifts of the clip. Accuracy
+    is the median error in cents between the requested shift and the f0
+    ratio measured with yin, for both implementations.
+    """
+    import librosa
+    from audio_io import load_audio
+    from rvc_cpu_inference import write_reference_clip
+
+    work_dir = Path(work_dir)
+    work_dir.mkdir(exist_ok=True)
+    clip_path = clip_path or write_reference_clip(str(work_dir / "pitch_benchmark_clip.wav"))
+    clip, sr = load_audio(clip_path, cache=False)
+
+    def timed(func):
+        timings, result = [], None
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+        return float(np.median(timings)), result
+
+    cases = []
+    for n_steps in shifts or [-7, -3, -1, 0.5, 2, 5, 12]:
+        librosa_seconds, librosa_audio = timed(lambda: librosa.effects.pitch_shift(clip, sr=sr, n_steps=n_steps))
+        fast_seconds, fast_audio = timed(lambda: pitch_shift(clip, sr, n_steps))
+        cases.append({
+            'n_steps': n_steps,
+            'librosa_seconds': round(librosa_seconds, 4),
+            'wsola_seconds': round(fast_seconds, 4),
+            'speedup': round(librosa_seconds / max(fast_seconds, 1e-9), 2),
+            'librosa_error_cents': round(_median_pitch_error_cents(clip, librosa_audio, sr, n_steps), 2),
+            'wsola_error_cents': round(_median_pitch_error_cents(clip, fast_audio, sr, n_steps), 2)
+        })
+
+    return {
+        'clip_path': str(clip_path),
+        'clip_seconds': round(len(clip) / sr, 2),
+        'sample_rate': sr,
+        'cases': cases
+    }
+
+# CLI interface
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Fast pitch shifting: shift a file or benchmark against librosa')
+    parser.add_argument('command', choices=['shift', 'benchmark'])
+    parser.add_argument('--input', help='Audio file (shift: required; benchmark: default built-in phrase)')
+    parser.add_argument('--output', help='Output file for shift')
+    parser.add_argument('--steps', type=float, default=0.0, help='Pitch shift in semitones')
+    parser.add_argument('--shifts', type=float, nargs='+', help='Semitone shifts to benchmark')
+    parser.add_argument('--runs', type=int, default=3, help='Timed runs per shift')
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'shift':
+            if not args.input or not args.output:
+                raise ValueError("shift needs --input and --output")
+            import soundfile as sf
+            from audio_io import load_audio
+            audio, sr = load_audio(args.input, cache=False)
+            sf.write(args.output, pitch_shift(audio, sr, args.steps), sr)
+            result = {'output_path': args.output, 'n_steps': args.steps}
+        else:
+            result = benchmark_pitch_shift(args.input, args.shifts, args.runs)
+
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(1)
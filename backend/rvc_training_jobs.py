@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+RVC Training Jobs for Burnt Beats
+Runs voice model training in the background with persistent job records,
+a bounded number of concurrent trainings, live progress (epoch, loss, ETA)
+parsed from the trainer's output, and resume from the latest checkpoint
+after a crash, timeout or restart
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import fcntl
+import signal
+import logging
+import threading
+import subprocess
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from rvc_model_registry import read_checkpoint_header
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOBS_DIR = "rvc_models/.jobs"
+AUDIO_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg', '.m4a')
+ACTIVE_STATES = ('queued', 'running')
+
+EPOCH_PATTERN = re.compile(r'\bepoch\b\D{0,3}(\d+)(?:\s*(?:/|of)\s*(\d+))?', re.IGNORECASE)
+LOSS_PATTERN = re.compile(r'\bloss\w*\b\s*[:=]?\s*(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)', re.IGNORECASE)
+
+
+class TrainingCancelled(Exception):
+    """The job was cancelled while it was being worked on"""
+
+
+def parse_progress_line(line: str) -> Optional[Dict[str, Any]]:
+    """
+    Epoch and loss from one line of trainer output, e.g. "Epoch 12/300 ... loss: 0.4312"
+
+    Returns None for lines without an epoch or loss.
+    """
+    event = {}
+    epoch = EPOCH_PATTERN.search(line)
+    if epoch:
+        event['epoch'] = int(epoch.group(1))
+        if epoch.group(2):
+            event['total_epochs'] = int(epoch.group(2))
+    loss = LOSS_PATTERN.search(line)
+    if loss:
+        event['loss'] = float(loss.group(1))
+    return event or None
+
+
+def process_identity(pid: int) -> Optional[List[str]]:
+    """
+    [boot id, start time] of a live process, or None if it is gone (Linux /proc)
+
+    A pid alone is not an identity: after a reboot or once the process
+    exits it may belong to something else. Its start time, in clock ticks
+    since boot, together with the boot id, is unique for the machine's life.
+    """
+    try:
+        with open('/proc/sys/kernel/random/boot_id', 'r') as f:
+            boot_id = f.read().strip()
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            # The command name is parenthesised and may contain spaces; starttime is field 22
+            start_time = f.read().rsplit(')', 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+    return [boot_id, start_time]
+
+
+def latest_checkpoint(checkpoint_dir: Path) -> Optional[Tuple[Optional[int], Path]]:
+    """
+    (epoch, path) of the newest generator checkpoint, or None if there is none
+
+    RVC saves G_<step>.pth and D_<step>.pth in pairs, numbered by global
+    step (or a fixed number when only the latest is kept), so only G_
+    files count, newest by mtime. The epoch is the 'iteration' stored in
+    the checkpoint, read from its header; None when it cannot be read.
+    """
+    paths = list(Path(checkpoint_dir).glob("G_*.pth"))
+    if not paths:
+        return None
+    path = max(paths, key=lambda p: p.stat().st_mtime_ns)
+    header = read_checkpoint_header(str(path))
+    epoch = header.get('iteration') if isinstance(header, dict) else None
+    return (epoch if isinstance(epoch, int) else None), path
+
+
+class TrainingJobManager:
+    """
+    File-backed training queue
+
+    Each job is one JSON record in jobs_dir, rewritten atomically on every
+    state or progress change, so any process (the API route included) can
+    poll it. Jobs are run by a single scheduler process, started on demand
+    and detached from the submitter. It holds an flock on scheduler.lock,
+    runs at most `max_concurrent` trainings, and exits when the queue is
+    empty. A job still marked running when a scheduler starts was
+    interrupted, and is requeued to resume from its latest checkpoint.
+    """
+
+    def __init__(self, jobs_dir: str = DEFAULT_JOBS_DIR, max_concurrent: int = 1,
+                 timeout_hours: float = 4.0, max_attempts: int = 3):
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs_dir.mkdir(parents=True, exist_ok=True)
+        self.max_concurrent = max_concurrent
+        self.timeout_seconds = timeout_hours * 3600
+        self.max_attempts = max_attempts
+        self._write_lock = threading.Lock()
+        self._service = None
+
+    # Job records
+
+    def _record_path(self, job_id: str) -> Path:
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+            raise ValueError(f"Invalid job id: {job_id}")
+        return self.jobs_dir / f"{job_id}.json"
+
+    def _save(self, job: Dict[str, Any]):
+        job['updated_at'] = datetime.now().isoformat()
+        path = self._record_path(job['id'])
+        with self._write_lock:
+            temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temp_path, 'w') as f:
+                json.dump(job, f, indent=2)
+            os.replace(temp_path, path)
+
+    @contextmanager
+    def _locked(self, job_id: str):
+        """flock on a job's lock file, so a read-check-write of its record is atomic across processes"""
+        with open(self._record_path(job_id).with_suffix(".lock"), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        path = self._record_path(job_id)
+        if not path.exists():
+            raise KeyError(f"Unknown training job: {job_id}")
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        jobs = []
+        for path in self.jobs_dir.glob("*.json"):
+            try:
+                with open(path, 'r') as f:
+                    jobs.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(jobs, key=lambda job: job['created_at'])
+
+    # Client API
+
+    def submit(self, model_name: str, audio_files: Optional[List[str]] = None, training_dir: Optional[str] = None,
+               epochs: int = 300, batch_size: int = 8, start_scheduler: bool = True) -> Dict[str, Any]:
+        """Queue a training job (from explicit files or every audio file in training_dir)"""
+        if not audio_files and training_dir:
+            audio_files = sorted(str(p) for p in Path(training_dir).iterdir()
+                                 if p.suffix.lower() in AUDIO_EXTENSIONS)
+        if not audio_files:
+            raise ValueError("No training audio files")
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'model_name': model_name,
+            'audio_files': [os.path.abspath(f) for f in audio_files],
+            'epochs': epochs,
+            'batch_size': batch_size,
+            'status': 'queued',
+            'attempts': 0,
+            'progress': {'stage': 'queued', 'epoch': 0, 'total_epochs': epochs, 'loss': None,
+                         'eta_seconds': None, 'percent': 0.0},
+            'created_at': datetime.now().isoformat()
+        }
+        job['log_path'] = str((self.jobs_dir / f"{job['id']}.log").resolve())
+        self._save(job)
+        logger.info(f"📋 Queued training job {job['id']} for {model_name}")
+
+        if start_scheduler:
+            self.ensure_scheduler()
+        return job
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a queued job, or stop a running one (its checkpoints are kept)"""
+        with self._locked(job_id):
+            job = self.get(job_id)
+            if job['status'] in ACTIVE_STATES:
+                self._stop_trainer(job)
+                job['status'] = 'cancelled'
+                job['finished_at'] = datetime.now().isoformat()
+                self._save(job)
+        return job
+
+    def _stop_trainer(self, job: Dict[str, Any]):
+        """SIGTERM the job's trainer group, only if its pid still belongs to the trainer that was started"""
+        pid = job.get('trainer_pid')
+        if pid and job.get('trainer_identity') and process_identity(pid) == job['trainer_identity']:
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        job['trainer_pid'] = None
+        job['trainer_identity'] = None
+
+    def ensure_scheduler(self):
+        """Start a detached scheduler unless one already holds the lock"""
+        if self._scheduler_running():
+            return
+        log = open(self.jobs_dir / "scheduler.log", 'a')
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'run', '--jobs-dir', str(self.jobs_dir),
+             '--max-concurrent', str(self.max_concurrent)],
+            stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            cwd=os.getcwd(), start_new_session=True
+        )
+        log.close()
+
+    def _scheduler_running(self) -> bool:
+        with open(self.jobs_dir / "scheduler.lock", 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+            fcntl.flock(lock, fcntl.LOCK_UN)
+            return False
+
+    # Scheduler
+
+    def run(self, poll_seconds: float = 1.0):
+        """Run queued jobs until none are left; returns at once if another scheduler is active"""
+        while True:
+            lock = open(self.jobs_dir / "scheduler.lock", 'a')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return
+
+            try:
+                self._recover_interrupted()
+                self._drain_queue(poll_seconds)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+                lock.close()
+
+            # A job submitted while the lock was held saw a running scheduler and
+            # started none, so look again now that the lock is released
+            if not any(job['status'] == 'queued' for job in self.list_jobs()):
+                return
+
+    def _drain_queue(self, poll_seconds: float):
+        workers: Dict[str, threading.Thread] = {}
+
+        while True:
+            workers = {job_id: t for job_id, t in workers.items() if t.is_alive()}
+            queued = [job for job in self.list_jobs() if job['status'] == 'queued' and job['id'] not in workers]
+
+            for job in queued[:self.max_concurrent - len(workers)]:
+                thread = threading.Thread(target=self._run_job, args=(job,), daemon=True)
+                workers[job['id']] = thread
+                thread.start()
+
+            if not workers and not queued:
+                return
+            time.sleep(poll_seconds)
+
+    def _recover_interrupted(self):
+        """Requeue jobs left running by a scheduler that died; stop any orphaned trainer"""
+        for job in self.list_jobs():
+            if job['status'] != 'running':
+                continue
+            with self._locked(job['id']):
+                job = self.get(job['id'])
+                if job['status'] != 'running':
+                    continue
+                self._stop_trainer(job)
+                job['status'] = 'queued'
+                job['progress']['stage'] = 'interrupted, resuming'
+                self._save(job)
+            logger.info(f"♻️ Requeued interrupted training job {job['id']}")
+
+    def _get_service(self):
+        if self._service is None:
+            from rvc_voice_service import Ocean82RVCService
+            self._service = Ocean82RVCService()
+        return self._service
+
+    def _update(self, job: Dict[str, Any]):
+        """Save a job from its worker, unless it has been cancelled meanwhile"""
+        with self._locked(job['id']):
+            if self.get(job['id'])['status'] == 'cancelled':
+                job['status'] = 'cancelled'
+                raise TrainingCancelled(job['id'])
+            self._save(job)
+
+    def _set_progress(self, job: Dict[str, Any], **progress):
+        job['progress'].update(progress)
+        self._update(job)
+
+    def _run_job(self, job: Dict[str, Any]):
+        try:
+            job.update(status='running', started_at=job.get('started_at') or datetime.now().isoformat())
+            self._set_progress(job, stage='preprocessing', percent=1.0)
+
+            service = self._get_service()
+            model_dir = service.models_dir / job['model_name']
+            training_dir = model_dir / "training_data"
+            training_dir.mkdir(parents=True, exist_ok=True)
+            processed_files = service._preprocess_training_audio(job['audio_files'], training_dir)
+            if not processed_files:
+                raise ValueError("No usable training audio after preprocessing")
+
+            model_path = self._train(job, service, model_dir)
+
+            self._set_progress(job, stage='finalizing', percent=97.0, eta_seconds=None)
+            result = service._finalize_trained_model(model_path, job['model_name'], len(processed_files),
+                                                     job['epochs'], job['batch_size'])
+
+            job.update(status='completed', result=result, finished_at=datetime.now().isoformat())
+            self._set_progress(job, stage='completed', percent=100.0, eta_seconds=0)
+            logger.info(f"✅ Training job {job['id']} completed")
+
+        except TrainingCancelled:
+            logger.info(f"🛑 Training job {job['id']} cancelled")
+        except Exception as e:
+            job.update(status='failed', error=str(e), finished_at=datetime.now().isoformat())
+            try:
+                self._update(job)
+            except TrainingCancelled:
+                logger.info(f"🛑 Training job {job['id']} cancelled")
+                return
+            logger.error(f"❌ Training job {job['id']} failed: {e}")
+
+    def _train(self, job: Dict[str, Any], service, model_dir: Path) -> Path:
+        """
+        Run train.py, rerunning it after each failed attempt that saved a new checkpoint
+
+        The trainer resumes from its own latest checkpoint; the epoch it
+        resumes at is read from that checkpoint, or else taken from the
+        trainer's last reported epoch.
+        """
+        checkpoint_dir = service._training_checkpoint_dir(job['model_name'])
+        model_path = model_dir / f"{job['model_name']}.pth"
+
+        while True:
+            checkpoint = latest_checkpoint(checkpoint_dir)
+            if checkpoint is None:
+                start_epoch = 0
+            else:
+                start_epoch = checkpoint[0] if checkpoint[0] is not None else job['progress']['epoch']
+            saved = (checkpoint[1], checkpoint[1].stat().st_mtime_ns) if checkpoint else None
+            job['attempts'] += 1
+            job['resumed_from'] = str(checkpoint[1]) if checkpoint else None
+            self._set_progress(job, stage='training', epoch=start_epoch)
+
+            cmd = service._training_command(job['model_name'], job['epochs'], job['batch_size'])
+            logger.info(f"🚀 Training job {job['id']} attempt {job['attempts']} from epoch {start_epoch}")
+            returncode, tail = self._run_trainer(job, cmd, service.rvc_source_dir, start_epoch)
+
+            if returncode == 0 and model_path.exists():
+                return model_path
+
+            reason = "timed out" if returncode is None else f"exited with code {returncode}"
+            newest = latest_checkpoint(checkpoint_dir)
+            made_progress = newest is not None and (newest[1], newest[1].stat().st_mtime_ns) != saved
+            if not made_progress or job['attempts'] >= self.max_attempts:
+                raise RuntimeError(f"RVC training {reason}: {''.join(tail).strip()[-2000:]}")
+            logger.warning(f"⚠️ Training job {job['id']} {reason}; resuming from {newest[1].name}")
+
+    def _run_trainer(self, job: Dict[str, Any], cmd: List[str], cwd: Path,
+                     start_epoch: int) -> Tuple[Optional[int], List[str]]:
+        """
+        Stream the trainer's output to the job log, updating progress as lines arrive
+
+        Returns (exit code or None on timeout, last lines of output).
+        """
+        tail = deque(maxlen=40)
+        started = time.monotonic()
+        last_saved = 0.0
+
+        process = subprocess.Popen(cmd, cwd=str(cwd), stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, bufsize=1, start_new_session=True)
+        job['trainer_pid'] = process.pid
+        job['trainer_identity'] = process_identity(process.pid)
+        try:
+            self._update(job)
+        except TrainingCancelled:
+            # Cancelled between the last progress save and the Popen: nobody else knows this pid
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+            process.wait()
+            raise
+
+        timed_out = threading.Event()
+
+        def stop():
+            timed_out.set()
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+
+        timer = threading.Timer(self.timeout_seconds, stop)
+        timer.start()
+
+        try:
+            with open(job['log_path'], 'a') as log:
+                for line in process.stdout:
+                    log.write(line)
+                    tail.append(line)
+
+                    event = parse_progress_line(line)
+                    if not event:
+                        continue
+                    progress = job['progress']
+                    epoch_changed = event.get('epoch', progress['epoch']) != progress['epoch']
+                    progress.update(event)
+
+                    # ETA from this attempt's epoch rate
+                    epochs_done = progress['epoch'] - start_epoch
+                    if epochs_done > 0:
+                        rate = (time.monotonic() - started) / epochs_done
+                        progress['eta_seconds'] = round(rate * max(progress['total_epochs'] - progress['epoch'], 0))
+                    progress['percent'] = round(5.0 + 90.0 * min(progress['epoch'] / max(progress['total_epochs'], 1), 1.0), 1)
+
+                    # Persist on every new epoch, otherwise at most once a second
+                    now = time.monotonic()
+                    if epoch_changed or now - last_saved >= 1.0:
+                        log.flush()
+                        self._update(job)
+                        last_saved = now
+            process.wait()
+        finally:
+            timer.cancel()
+            job['trainer_pid'] = None
+            job['trainer_identity'] = None
+            self._update(job)
+
+        return (None if timed_out.is_set() else process.returncode), list(tail)
+
+
+# Main API functions
+def submit_training_job(model_name: str, audio_files: Optional[List[str]] = None, training_dir: Optional[str] = None,
+                        epochs: int = 300, batch_size: int = 8) -> Dict[str, Any]:
+    """Queue RVC training in the background and return the job record"""
+    return TrainingJobManager().submit(model_name, audio_files, training_dir, epochs, batch_size)
+
+
+def get_training_job(job_id: str, jobs_dir: str = DEFAULT_JOBS_DIR) -> Dict[str, Any]:
+    """Job record; polling an unfinished job also restarts the scheduler if it died (e.g. on reboot)"""
+    manager = TrainingJobManager(jobs_dir)
+    job = manager.get(job_id)
+    if job['status'] in ACTIVE_STATES:
+        manager.ensure_scheduler()
+    return job
+
+# CLI interface
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    if len(sys.argv) > 1:
+        import argparse
+        parser = argparse.ArgumentParser(description='Background RVC training jobs')
+        parser.add_argument('command', choices=['submit', 'status', 'list', 'cancel', 'run'])
+        parser.add_argument('--model-name', help='Model name')
+        parser.add_argument('--audio-files', nargs='+', help='Training audio files')
+        parser.add_argument('--training-dir', help='Directory of training audio files')
+        parser.add_argument('--epochs', type=int, default=300, help='Training epochs')
+        parser.add_argument('--batch-size', type=int, default=8, help='Batch size')
+        parser.add_argument('--job-id', help='Job id for status/cancel')
+        parser.add_argument('--jobs-dir', default=DEFAULT_JOBS_DIR, help='Job records directory')
+        parser.add_argument('--max-concurrent', type=int, default=1, help='Concurrent trainings (scheduler)')
+
+        args = parser.parse_args()
+
+        try:
+            manager = TrainingJobManager(args.jobs_dir, args.max_concurrent)
+            if args.command == 'submit':
+                result = manager.submit(args.model_name, args.audio_files, args.training_dir,
+                                        args.epochs, args.batch_size)
+            elif args.command == 'status':
+                result = get_training_job(args.job_id, args.jobs_dir)
+            elif args.command == 'list':
+                result = manager.list_jobs()
+            elif args.command == 'cancel':
+                result = manager.cancel(args.job_id)
+            else:
+                manager.run()
+                result = {'status': 'idle'}
+            print(json.dumps(result, indent=2))
+
+        except Exception as e:
+            print(json.dumps({"error": str(e)}), file=sys.stderr)
+            sys.exit(1)
+    else:
+        # Read from stdin for API calls
+        try:
+            data = json.loads(sys.stdin.read())
+            command = data.get('command')
+
+            if command == 'submit':
+                result = submit_training_job(data['model_name'], data.get('audio_files'), data.get('training_dir'),
+                                             data.get('epochs', 300), data.get('batch_size', 8))
+            elif command == 'status':
+                result = get_training_job(data['job_id'])
+            elif command == 'cancel':
+                result = TrainingJobManager().cancel(data['job_id'])
+            else:
+                result = {'error': 'Unknown command'}
+
+            print(json.dumps(result))
+        except json.JSONDecodeError:
+            print(json.dumps({"error": "Invalid JSON input"}))
+        except Exception as e:
+            print(json.dumps({"error": str(e)}))
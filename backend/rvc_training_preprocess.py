@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+RVC Training Data Preprocessing for Burnt Beats
+Resamples, trims, normalises and segments training clips across a process
+pool. Segments are content-addressed and recorded in a per-model manifest,
+so retraining only processes new or changed clips.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from voice_model_batch import BLAS_THREAD_VARS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the segmenting below changes, so old manifests are rebuilt
+PREPROCESS_VERSION = 1
+
+
+def preprocess_params(sample_rate: int) -> Dict[str, Any]:
+    """Everything that affects segment contents; a change invalidates the manifest"""
+    return {
+        'version': PREPROCESS_VERSION,
+        'sample_rate': sample_rate,
+        'top_db': 20,
+        'peak': 0.95,
+        'segment_seconds': 8,  # RVC works better with 3-10 second clips
+        'min_segment_seconds': 2
+    }
+
+
+def file_digest(path: str) -> str:
+    """sha256 of the file's bytes, read in 1 MB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def _blas_thread_env(blas_threads: int):
+    """
+    Set BLAS_THREAD_VARS in this process while a spawn pool is alive
+
+    Spawn workers copy the parent environment and re-import __main__
+    (numpy, torch) before any initializer runs, so the limits have to be
+    in place here, for as long as workers may still be started.
+    """
+    previous = {var: os.environ.get(var) for var in BLAS_THREAD_VARS}
+    for var in BLAS_THREAD_VARS:
+        os.environ[var] = str(blas_threads)
+    try:
+        yield
+    finally:
+        for var, value in previous.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _segment_file(audio_file: str, digest: str, output_dir: str, params: Dict[str, Any]) -> List[str]:
+    """Load, trim, normalise and cut one clip; returns segment file names"""
+    import numpy as np
+    import librosa
+    import soundfile as sf
+    from audio_io import load_audio
+
+    sr = params['sample_rate']
+    audio, _ = load_audio(audio_file, sr=sr, cache=False)
+
+    # Trim silence
+    audio, _ = librosa.effects.trim(audio, top_db=params['top_db'])
+
+    # Normalize
+    peak = np.max(np.abs(audio)) if len(audio) else 0.0
+    if peak == 0:
+        raise ValueError("Audio is silent")
+    audio = audio * (params['peak'] / peak)
+
+    # Split into segments if too long
+    segment_length = params['segment_seconds'] * sr
+    if len(audio) > segment_length:
+        segments = [audio[i:i + segment_length] for i in range(0, len(audio), segment_length)]
+        segments = [s for s in segments if len(s) > params['min_segment_seconds'] * sr]
+    else:
+        segments = [audio]
+
+    names = []
+    for j, segment in enumerate(segments):
+        name = f"{digest[:16]}_{j:03d}.wav"
+        temp_path = Path(output_dir) / f"{name}.tmp"
+        sf.write(temp_path, segment, sr, format='WAV')
+        os.replace(temp_path, Path(output_dir) / name)
+        names.append(name)
+
+    return names
+
+
+class TrainingDataPreprocessor:
+    """
+    Incremental preprocessing into a model's training_data directory
+
+    The manifest maps each source path to its size, mtime and content
+    digest, and each digest to its segment files. Unchanged paths skip
+    hashing, and known digests skip processing, even if the clip was
+    renamed or moved. Segments that no current source needs are deleted,
+    because the trainer reads the whole directory.
+    """
+
+    def __init__(self, sample_rate: int = 44100, workers: Optional[int] = None):
+        self.params = preprocess_params(sample_rate)
+        self.workers = workers or os.cpu_count() or 1
+
+    def _load_manifest(self, manifest_path: Path) -> Dict[str, Any]:
+        empty = {'params': self.params, 'files': {}, 'segments': {}}
+        if not manifest_path.exists():
+            return empty
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return empty
+        return manifest if manifest.get('params') == self.params else empty
+
+    def _save_manifest(self, manifest: Dict[str, Any], manifest_path: Path):
+        temp_path = manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, manifest_path)
+
+    def _digest(self, audio_file: str, stat: os.stat_result, known: Dict[str, Any]) -> str:
+        """Content digest, reused from the manifest while size and mtime are unchanged"""
+        entry = known.get(os.path.abspath(audio_file))
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['digest']
+        return file_digest(audio_file)
+
+    def preprocess(self, audio_files: List[str], output_dir: Path) -> List[str]:
+        """Segment paths for audio_files (in input order), processing only what the manifest lacks"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        manifest_path = output_dir / "manifest.json"
+        manifest = self._load_manifest(manifest_path)
+
+        files, digests = {}, {}
+        for audio_file in audio_files:
+            try:
+                stat = os.stat(audio_file)
+                digest = self._digest(audio_file, stat, manifest['files'])
+            except OSError as e:
+                logger.warning(f"⚠️ Failed to process {audio_file}: {e}")
+                continue
+            files[os.path.abspath(audio_file)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                                  'digest': digest}
+            digests[audio_file] = digest
+
+        segments = {}
+        pending = {}
+        for audio_file, digest in digests.items():
+            names = manifest['segments'].get(digest)
+            if names is not None and all((output_dir / name).exists() for name in names):
+                segments[digest] = names
+            else:
+                pending.setdefault(digest, audio_file)
+
+        reused = len(set(digests.values())) - len(pending)
+        if reused:
+            logger.info(f"♻️ Reusing preprocessed segments for {reused} unchanged file(s)")
+
+        segments.update(self._process(pending, output_dir))
+
+        # The trainer reads the whole directory, so drop segments nothing needs any more
+        keep = {name for names in segments.values() for name in names}
+        for path in output_dir.glob("*.wav"):
+            if path.name not in keep:
+                path.unlink()
+
+        self._save_manifest({'params': self.params, 'files': files, 'segments': segments}, manifest_path)
+
+        processed_files = []
+        emitted = set()
+        for digest in digests.values():
+            if digest in segments and digest not in emitted:
+                emitted.add(digest)
+                processed_files.extend(str(output_dir / name) for name in segments[digest])
+
+        logger.info(f"📁 Preprocessed {len(processed_files)} audio segments "
+                    f"({len(pending)} file(s) processed, {reused} reused)")
+        return processed_files
+
+    def _process(self, pending: Dict[str, str], output_dir: Path) -> Dict[str, List[str]]:
+        """Segment pending {digest: path} files, in a spawn pool when there is more than one"""
+        results = {}
+        if not pending:
+            return results
+
+        workers = min(self.workers, len(pending))
+        if workers == 1:
+            for digest, audio_file in pending.items():
+                try:
+                    results[digest] = _segment_file(audio_file, digest, str(output_dir), self.params)
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to process {audio_file}: {e}")
+            return results
+
+        context = multiprocessing.get_context('spawn')
+        blas_threads = max(1, (os.cpu_count() or 1) // workers)
+        with _blas_thread_env(blas_threads), \
+                ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {executor.submit(_segment_file, audio_file, digest, str(output_dir), self.params):
+                       (digest, audio_file) for digest, audio_file in pending.items()}
+            for future in as_completed(futures):
+                digest, audio_file = futures[future]
+                try:
+                    results[digest] = future.result()
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to process {audio_file}: {e}")
+
+        return results
+
+
+# Main API function
+def preprocess_training_audio(audio_files: List[str], output_dir: str, sample_rate: int = 44100,
+                              workers: Optional[int] = None) -> List[str]:
+    """Incrementally preprocess training clips into output_dir"""
+    return TrainingDataPreprocessor(sample_rate, workers).preprocess(audio_files, Path(output_dir))
@@ -2,7 +2,6 @@ import os
 import sys
 import json
 import numpy as np
-import librosa
 import soundfile as sf
 from typing import Dict, Any, Optional, List
 import subprocess
@@ -13,6 +12,14 @@ import torchaudio
 from pathlib import Path
 import shutil
 import logging
+from audio_io import load_audio
+from rvc_training_preprocess import TrainingDataPreprocessor
+from rvc_cpu_inference import configure_cpu_threads, load_cpu_model
+from rvc_model_registry import RVCModelRegistry, inspect_checkpoint
+from rvc_pitch_shift import can_fold_pitch_shift, pitch_shift as shift_pitch
+from scratch_store import default_scratch_store
+from rvc_inference_server import (RVCInferenceClient, RVCInferenceError, run_rvc_inference,
+                                  DEFAULT_SOCKET_PATH)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -24,9 +31,13 @@ class Ocean82RVCService:
     Handles voice model training and inference with MIDI pipeline compatibility
     """
     
-    def __init__(self):
+    def __init__(self, cpu_optimized: Optional[bool] = None):
         self.sample_rate = 44100  # Match MIDI output sample rate
         self.hop_length = 512
+        
+        # Guide vocal harmonic stack (fundamental, 2nd, 3rd, 4th harmonic)
+        self.guide_harmonic_gains = (1.0, 0.3, 0.2, 0.1)
+        
         self.models_dir = Path("rvc_models")
         self.temp_dir = Path("temp_audio")
         self.rvc_source_dir = Path("rvc_source")
@@ -35,18 +46,35 @@ class Ocean82RVCService:
         self.models_dir.mkdir(exist_ok=True)
         self.temp_dir.mkdir(exist_ok=True)
         
+        # Intermediates go to this instance's own scratch job (deleted at exit unless kept)
+        self.scratch = default_scratch_store().job('rvc')
+        
+        # Index of trained/imported models (rvc_models/registry.json)
+        self.registry = RVCModelRegistry(str(self.models_dir), self.sample_rate)
+        
         # Check Python version
         self._check_python_version()
         
         # Check CUDA availability
         self._check_cuda()
         
+        # CPU inference mode (rvc_cpu_inference.py): int8 synthesizer attached to checkpoints, pinned thread pools
+        self.device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        self.cpu_optimized = self.device == "cpu" if cpu_optimized is None else cpu_optimized
+        if self.cpu_optimized:
+            self.device = "cpu"
+            configure_cpu_threads()
+        
         # Initialize RVC components
         self._setup_rvc_environment()
         
         # Model cache for faster inference
         self.loaded_models = {}
         
+        # Persistent inference server (rvc_inference_server.py), used whenever its socket exists
+        self.inference_socket = Path(DEFAULT_SOCKET_PATH)
+        self._inference_client = None
+        
     def _check_python_version(self):
         """Ensure Python 3.9+ as required by Ocean82/RVC"""
         import sys
@@ -68,7 +96,7 @@ class Ocean82RVCService:
             if gpu_memory < 6:
                 logger.warning("⚠️ Less than 6GB VRAM detected. Training may be slow or fail.")
         else:
-            logger.warning("⚠️ CUDA not available. RVC will run on CPU (very slow).")
+            logger.warning("⚠️ CUDA not available. RVC will run in CPU inference mode.")
     
     def _setup_rvc_environment(self):
         """Setup Ocean82/RVC environment and dependencies"""
@@ -131,27 +159,8 @@ class Ocean82RVCService:
                 # Fallback to CLI
                 model_path = self._train_with_cli(processed_files, model_name, epochs, batch_size)
             
-            # Validate trained model
-            validation_result = self._validate_model(model_path, model_name)
-            
-            # Generate test audio
-            test_audio_path = self._generate_test_audio(model_path, model_name)
-            
-            model_info = {
-                'id': f"rvc_{model_name}_{int(datetime.now().timestamp())}",
-                'name': model_name,
-                'model_path': str(model_path),
-                'test_audio_path': str(test_audio_path),
-                'training_files': len(processed_files),
-                'epochs': epochs,
-                'batch_size': batch_size,
-                'sample_rate': self.sample_rate,
-                'status': 'ready',
-                'created_at': datetime.now().isoformat(),
-                'validation': validation_result,
-                'gpu_info': self._get_gpu_info(),
-                'file_size_mb': round(model_path.stat().st_size / (1024 * 1024), 2)
-            }
+            model_info = self._finalize_trained_model(model_path, model_name, len(processed_files),
+                                                      epochs, batch_size)
             
             logger.info(f"✅ RVC model trained successfully: {model_name}")
             return model_info
@@ -160,6 +169,37 @@ class Ocean82RVCService:
             logger.error(f"❌ RVC training failed: {str(e)}")
             raise e
     
+    def _finalize_trained_model(self, model_path: Path, model_name: str, training_files: int,
+                                epochs: int, batch_size: int) -> Dict[str, Any]:
+        """
+        Validate a freshly trained checkpoint, render its test audio and describe it
+        """
+        # Validate trained model
+        validation_result = self._validate_model(model_path, model_name)
+        
+        # Generate test audio
+        test_audio_path = self._generate_test_audio(model_path, model_name)
+        
+        entry = self.registry.register(str(model_path), model_name, test_audio_path, validation_result,
+                                       epochs=epochs, batch_size=batch_size, training_files=training_files)
+        
+        return {
+            'id': f"rvc_{model_name}_{int(datetime.now().timestamp())}",
+            'name': model_name,
+            'model_path': str(model_path),
+            'test_audio_path': test_audio_path,
+            'training_files': training_files,
+            'epochs': epochs,
+            'batch_size': batch_size,
+            'sample_rate': self.sample_rate,
+            'status': 'ready',
+            'created_at': datetime.now().isoformat(),
+            'validation': validation_result,
+            'gpu_info': self._get_gpu_info(),
+            'file_size_mb': entry['size_mb'],
+            'sha256': entry['sha256']
+        }
+    
     def _preprocess_training_audio(self, audio_files: List[str], output_dir: Path) -> List[str]:
         """
         Preprocess audio files for RVC training
@@ -167,57 +207,26 @@ class Ocean82RVCService:
         - Trim silence
         - Normalize volume
         - Split long files into segments
-        """
-        processed_files = []
         
-        for i, audio_file in enumerate(audio_files):
-            try:
-                # Load audio
-                audio, sr = librosa.load(audio_file, sr=self.sample_rate)
-                
-                # Trim silence
-                audio, _ = librosa.effects.trim(audio, top_db=20)
-                
-                # Normalize
-                audio = audio / np.max(np.abs(audio)) * 0.95
-                
-                # Split into segments if too long (RVC works better with 3-10 second clips)
-                segment_length = 8 * self.sample_rate  # 8 seconds
-                
-                if len(audio) > segment_length:
-                    segments = [audio[i:i + segment_length] 
-                              for i in range(0, len(audio), segment_length)]
-                    
-                    for j, segment in enumerate(segments):
-                        if len(segment) > self.sample_rate * 2:  # Minimum 2 seconds
-                            output_path = output_dir / f"{Path(audio_file).stem}_{i}_{j}.wav"
-                            sf.write(output_path, segment, self.sample_rate)
-                            processed_files.append(str(output_path))
-                else:
-                    output_path = output_dir / f"{Path(audio_file).stem}_{i}.wav"
-                    sf.write(output_path, audio, self.sample_rate)
-                    processed_files.append(str(output_path))
-                    
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to process {audio_file}: {e}")
-                continue
-        
-        logger.info(f"📁 Preprocessed {len(processed_files)} audio segments")
-        return processed_files
+        Segments of unchanged files are reused from the model's manifest
+        (see rvc_training_preprocess.py); new or changed files are processed
+        in parallel.
+        """
+        return TrainingDataPreprocessor(self.sample_rate).preprocess(audio_files, output_dir)
     
-    def _train_with_cli(self, audio_files: List[str], model_name: str, 
-                       epochs: int, batch_size: int) -> Path:
+    def _training_command(self, model_name: str, epochs: int, batch_size: int) -> List[str]:
         """
-        Train model using Ocean82/RVC CLI interface
+        Ocean82/RVC train.py command line
+        Paths are absolute because training runs with rvc_source as its cwd
         """
-        model_output_path = self.models_dir / model_name / f"{model_name}.pth"
+        model_dir = (self.models_dir / model_name).resolve()
         
         # Prepare training command for Ocean82/RVC
         cmd = [
-            "python", str(self.rvc_source_dir / "train.py"),
+            "python", str((self.rvc_source_dir / "train.py").resolve()),
             "--model_name", model_name,
-            "--dataset_path", str(self.models_dir / model_name / "training_data"),
-            "--output_path", str(model_output_path),
+            "--dataset_path", str(model_dir / "training_data"),
+            "--output_path", str(model_dir / f"{model_name}.pth"),
             "--epochs", str(epochs),
             "--batch_size", str(batch_size),
             "--sample_rate", str(self.sample_rate),
@@ -228,6 +237,26 @@ class Ocean82RVCService:
         if torch.cuda.is_available():
             cmd.extend(["--gpu", "0"])
         
+        return cmd
+    
+    def _training_checkpoint_dir(self, model_name: str) -> Path:
+        """
+        Where train.py's --save_every checkpoints are written
+
+        Assumes the fork keeps upstream RVC's layout, logs/<model_name>
+        under its cwd, and, like upstream, resumes from the latest G_/D_
+        pair there when rerun with the same command.
+        """
+        return self.rvc_source_dir / "logs" / model_name
+    
+    def _train_with_cli(self, audio_files: List[str], model_name: str, 
+                       epochs: int, batch_size: int) -> Path:
+        """
+        Train model using Ocean82/RVC CLI interface
+        """
+        model_output_path = self.models_dir / model_name / f"{model_name}.pth"
+        cmd = self._training_command(model_name, epochs, batch_size)
+        
         logger.info(f"🚀 Starting RVC training: {' '.join(cmd)}")
         
         try:
@@ -253,29 +282,11 @@ class Ocean82RVCService:
     
     def _validate_model(self, model_path: Path, model_name: str) -> Dict[str, Any]:
         """
-        Validate trained RVC model
+        Validate trained RVC model from the checkpoint header, without loading weights
         """
-        try:
-            # Check if model file exists and is valid
-            if not model_path.exists():
-                return {'valid': False, 'error': 'Model file not found'}
-            
-            # Try to load the model
-            try:
-                model_state = torch.load(model_path, map_location='cpu')
-                model_size = model_path.stat().st_size / (1024 * 1024)  # MB
-                
-                return {
-                    'valid': True,
-                    'size_mb': round(model_size, 2),
-                    'parameters': len(model_state) if isinstance(model_state, dict) else 'unknown',
-                    'torch_version': torch.__version__
-                }
-            except Exception as e:
-                return {'valid': False, 'error': f'Failed to load model: {str(e)}'}
-                
-        except Exception as e:
-            return {'valid': False, 'error': str(e)}
+        validation = inspect_checkpoint(str(model_path))
+        validation['torch_version'] = torch.__version__
+        return validation
     
     def convert_voice(self, source_audio_path: str, model_path: str, 
                      pitch_shift: float = 0.0, index_rate: float = 0.5) -> str:
@@ -285,24 +296,30 @@ class Ocean82RVCService:
         """
         logger.info(f"🔄 Converting voice with RVC model...")
         
+        # A running inference server already holds the runtime and checkpoints in memory
+        server_output = self._convert_with_server(source_audio_path, model_path, pitch_shift, index_rate)
+        if server_output:
+            logger.info(f"✅ Voice conversion completed (inference server)")
+            return server_output
+        
         try:
             # Load and validate source audio
-            source_audio, sr = librosa.load(source_audio_path, sr=self.sample_rate)
+            source_audio, sr = load_audio(source_audio_path, sr=self.sample_rate)
             
-            # Apply pitch shifting if needed (for MIDI compatibility)
-            if pitch_shift != 0.0:
-                source_audio = librosa.effects.pitch_shift(
-                    source_audio, sr=sr, n_steps=pitch_shift
-                )
+            # Apply pitch shifting if needed (for MIDI compatibility). Whole-semitone
+            # shifts are applied by RVC to its f0 track; others shift the audio first
+            f0_up_key = pitch_shift if can_fold_pitch_shift(self.infer_func, pitch_shift) else 0.0
+            if pitch_shift != 0.0 and not f0_up_key:
+                source_audio = shift_pitch(source_audio, sr, pitch_shift)
             
             # Save preprocessed audio
-            temp_source = self.temp_dir / f"source_{int(datetime.now().timestamp())}.wav"
+            temp_source = self.scratch.path('source')
             sf.write(temp_source, source_audio, sr)
             
             # Run RVC conversion
             if self.infer_func:
                 # Use direct API if available
-                output_path = self._convert_with_api(temp_source, model_path, index_rate)
+                output_path = self._convert_with_api(temp_source, model_path, index_rate, f0_up_key)
             else:
                 # Fallback to CLI
                 output_path = self._convert_with_cli(temp_source, model_path, index_rate)
@@ -317,11 +334,77 @@ class Ocean82RVCService:
             logger.error(f"❌ Voice conversion failed: {str(e)}")
             raise e
     
+    def convert_voice_chunked(self, source_audio_path: str, model_path: str, pitch_shift: float = 0.0,
+                              index_rate: float = 0.5, workers: Optional[int] = None,
+                              progress_callback=None) -> str:
+        """
+        Convert a long vocal in overlapping chunks across a worker pool
+        Memory stays bounded by the chunk size and interrupted runs resume
+        """
+        from rvc_chunked_converter import ChunkedRVCConverter
+        
+        output_path = self.scratch.path('converted')
+        converter = ChunkedRVCConverter(work_root=str(self.temp_dir / "chunked"), workers=workers)
+        converter.convert(source_audio_path, model_path, str(output_path), pitch_shift, index_rate,
+                          progress_callback)
+        
+        logger.info(f"✅ Chunked voice conversion completed")
+        return str(output_path)
+    
+    def convert_voice_batch(self, jobs: List[Dict[str, Any]], index_rate: float = 0.5):
+        """
+        Convert many {'source_audio', 'model_path', 'pitch_shift'} jobs grouped by model
+        Yields one result dict per job as soon as it is converted
+        """
+        from rvc_batch_converter import BatchRVCConverter
+        
+        return BatchRVCConverter(self).convert(jobs, index_rate)
+    
+    def _convert_with_server(self, source_audio_path: str, model_path: str,
+                             pitch_shift: float, index_rate: float) -> Optional[str]:
+        """
+        Convert through the persistent inference server
+        Returns None when no server is reachable so the caller falls back
+        """
+        if not self.inference_socket.exists():
+            return None
+        
+        try:
+            if self._inference_client is None:
+                self._inference_client = RVCInferenceClient(self.inference_socket)
+            result = self._inference_client.convert(source_audio_path, model_path, index_rate, pitch_shift)
+            return result['output_path']
+        
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Inference server unavailable, converting locally: {e}")
+            self._inference_client = None
+            return None
+        except RVCInferenceError as e:
+            raise Exception(f"RVC conversion error: {str(e)}")
+    
+    def _convert_with_api(self, source_path: Path, model_path: str, index_rate: float,
+                          f0_up_key: float = 0.0) -> Path:
+        """
+        Convert voice in-process using the Ocean82/RVC Python API
+        """
+        output_path = self.scratch.path('converted')
+        
+        # Checkpoints stay loaded between conversions
+        if model_path not in self.loaded_models:
+            if self.cpu_optimized:
+                self.loaded_models[model_path] = load_cpu_model(model_path)
+            else:
+                self.loaded_models[model_path] = torch.load(model_path, map_location=self.device)
+        
+        run_rvc_inference(self.infer_func, source_path, self.loaded_models[model_path], output_path,
+                          index_rate, self.device, f0_up_key)
+        return output_path
+    
     def _convert_with_cli(self, source_path: Path, model_path: str, index_rate: float) -> Path:
         """
         Convert voice using Ocean82/RVC CLI
         """
-        output_path = self.temp_dir / f"converted_{int(datetime.now().timestamp())}.wav"
+        output_path = self.scratch.path('converted')
         
         cmd = [
             "python", str(self.rvc_source_dir / "infer.py"),
@@ -329,7 +412,7 @@ class Ocean82RVCService:
             "--model", model_path,
             "--output", str(output_path),
             "--index_rate", str(index_rate),
-            "--device", "cuda:0" if torch.cuda.is_available() else "cpu"
+            "--device", self.device
         ]
         
         try:
@@ -368,6 +451,7 @@ class Ocean82RVCService:
             
             # Step 3: Apply musical corrections (pitch, timing) to match key/tempo
             final_vocal = self._apply_musical_corrections(expressive_vocal, key, tempo)
+            self.scratch.discard(*{monotone_vocal, expressive_vocal} - {final_vocal})
             
             logger.info(f"✅ MIDI to RVC vocal conversion completed")
             return final_vocal
@@ -399,34 +483,21 @@ class Ocean82RVCService:
             if not vocal_instrument:
                 raise Exception("No vocal track found in MIDI file")
             
-            # Generate monotone vocal audio
-            duration = midi_data.get_end_time()
-            audio = np.zeros(int(duration * self.sample_rate))
+            # Note table in samples, rendered in one pass
+            total_samples = int(midi_data.get_end_time() * self.sample_rate)
+            notes = vocal_instrument.notes
+            starts = np.array([int(note.start * self.sample_rate) for note in notes], dtype=np.int64)
+            ends = np.array([int(note.end * self.sample_rate) for note in notes], dtype=np.int64)
+            pitches = np.array([note.pitch for note in notes], dtype=np.float64)
             
-            # Synthesize each note with vocal-like timbre
-            for note in vocal_instrument.notes:
-                start_sample = int(note.start * self.sample_rate)
-                end_sample = int(note.end * self.sample_rate)
-                
-                if start_sample >= len(audio) or end_sample <= start_sample:
-                    continue
-                
-                end_sample = min(end_sample, len(audio))
-                note_duration = (end_sample - start_sample) / self.sample_rate
-                
-                # Generate vocal-like synthesis
-                note_audio = self._generate_vocal_synthesis(note.pitch, note_duration)
-                
-                # Add to main audio
-                audio_slice_len = end_sample - start_sample
-                note_slice_len = min(len(note_audio), audio_slice_len)
-                audio[start_sample:start_sample + note_slice_len] += note_audio[:note_slice_len]
+            audio = self._render_guide_vocal(starts, ends, pitches, total_samples)
             
             # Normalize and save
-            if np.max(np.abs(audio)) > 0:
-                audio = audio / np.max(np.abs(audio)) * 0.8
+            peak = np.max(np.abs(audio)) if len(audio) else 0.0
+            if peak > 0:
+                audio *= 0.8 / peak
             
-            output_path = self.temp_dir / f"monotone_{int(datetime.now().timestamp())}.wav"
+            output_path = self.scratch.path('monotone')
             sf.write(output_path, audio, self.sample_rate)
             
             return str(output_path)
@@ -434,39 +505,103 @@ class Ocean82RVCService:
         except Exception as e:
             raise Exception(f"MIDI to monotone conversion failed: {str(e)}")
     
-    def _generate_vocal_synthesis(self, midi_pitch: int, duration: float) -> np.ndarray:
+    def _render_guide_vocal(self, starts: np.ndarray, ends: np.ndarray, pitches: np.ndarray,
+                            total_samples: int) -> np.ndarray:
         """
-        Generate vocal-like synthesis for a MIDI note
-        This creates a more realistic base for RVC conversion
+        Render a monophonic guide vocal from a note table (sample positions, MIDI pitches)
+        
+        The notes become a piecewise-constant f0 contour whose phase is
+        integrated with one cumulative sum, so pitch changes never reset the
+        waveform. Overlapping notes are sung legato: a note ends where the
+        next one starts. Rests hold the previous pitch at zero gain, so phase
+        is continuous across them too. Synthesis runs one second at a time
+        in float32, keeping the temporaries cache-sized.
         """
-        samples = int(duration * self.sample_rate)
-        t = np.linspace(0, duration, samples)
+        sr = self.sample_rate
+        audio = np.zeros(total_samples, dtype=np.float32)
+        
+        order = np.argsort(starts, kind='stable')
+        starts, ends, pitches = starts[order], ends[order], pitches[order]
+        ends = np.minimum(ends, np.append(starts[1:], total_samples))
+        keep = (starts < total_samples) & (ends > starts)
+        starts, ends, pitches = starts[keep], ends[keep], pitches[keep]
+        if len(starts) == 0:
+            return audio
+        
+        # Constant-pitch pieces: a note runs until the next one starts, cut on every
+        # second so per-sample phase offsets stay small enough for float32
+        breaks = np.union1d(np.append(0, starts[1:]), np.arange(0, total_samples, sr))
+        piece_note = np.maximum(np.searchsorted(starts, breaks, side='right') - 1, 0)
+        piece_lengths = np.diff(np.append(breaks, total_samples))
         
-        # Convert MIDI pitch to frequency
-        frequency = 440 * (2 ** ((midi_pitch - 69) / 12))
+        # Phase at the start of each piece, integrated and wrapped in float64
+        omega = 2 * np.pi * 440.0 * 2.0 ** ((pitches[piece_note] - 69) / 12) / sr
+        piece_phase = np.concatenate(([0.0], np.cumsum(omega * piece_lengths)[:-1]))
+        np.mod(piece_phase, 2 * np.pi, out=piece_phase)
         
-        # Generate vocal-like waveform with formants
-        fundamental = np.sin(2 * np.pi * frequency * t)
+        # Linear 50 ms attack and release, shortened to half the note for short notes
+        fade = np.maximum(np.minimum(int(0.05 * sr), (ends - starts) // 2), 1)
         
-        # Add formants (vocal tract resonances)
-        formant1 = np.sin(2 * np.pi * frequency * 2 * t) * 0.3  # 2nd harmonic
-        formant2 = np.sin(2 * np.pi * frequency * 3 * t) * 0.2  # 3rd harmonic
-        formant3 = np.sin(2 * np.pi * frequency * 4 * t) * 0.1  # 4th harmonic
+        piece_omega = omega.astype(np.float32)
+        piece_phase = piece_phase.astype(np.float32)
+        piece_since_start = (breaks - starts[piece_note]).astype(np.float32)
+        piece_until_end = (ends[piece_note] - breaks).astype(np.float32)
+        piece_fade_rate = (1.0 / fade[piece_note]).astype(np.float32)
+        coefficients = self._harmonic_polynomial(self.guide_harmonic_gains).astype(np.float32)
         
-        # Combine for vocal-like timbre
-        vocal_audio = fundamental + formant1 + formant2 + formant3
+        ramp = np.arange(sr, dtype=np.float32)
+        block_pieces = np.append(np.searchsorted(breaks, np.arange(0, total_samples, sr)), len(breaks))
         
-        # Apply envelope (ADSR)
-        envelope = np.ones_like(vocal_audio)
-        fade_samples = int(0.05 * self.sample_rate)  # 50ms fade
+        for block, (first, last) in enumerate(zip(block_pieces[:-1], block_pieces[1:])):
+            pieces = slice(first, last)
+            lengths = piece_lengths[pieces]
+            block_start = block * sr
+            
+            local = ramp[:lengths.sum()] - np.repeat(breaks[pieces] - block_start, lengths).astype(np.float32)
+            
+            phase = np.repeat(piece_omega[pieces], lengths)
+            phase *= local
+            phase += np.repeat(piece_phase[pieces], lengths)
+            
+            gain = np.repeat(piece_since_start[pieces], lengths)
+            gain += local
+            until_end = np.repeat(piece_until_end[pieces], lengths)
+            until_end -= local
+            np.minimum(gain, until_end, out=gain)
+            gain *= np.repeat(piece_fade_rate[pieces], lengths)
+            np.clip(gain, 0.0, 1.0, out=gain)
+            
+            # Whole harmonic stack as sin(x) * P(cos(x)), evaluated with Horner's rule
+            cos_phase = np.cos(phase)
+            voice = np.full_like(cos_phase, coefficients[-1])
+            for coefficient in coefficients[-2::-1]:
+                voice *= cos_phase
+                voice += coefficient
+            
+            np.sin(phase, out=phase)
+            voice *= phase
+            voice *= gain
+            audio[block_start:block_start + len(voice)] = voice
         
-        if len(envelope) > fade_samples * 2:
-            # Attack
-            envelope[:fade_samples] = np.linspace(0, 1, fade_samples)
-            # Release
-            envelope[-fade_samples:] = np.linspace(1, 0, fade_samples)
+        audio *= 0.5
+        return audio
+    
+    @staticmethod
+    def _harmonic_polynomial(harmonic_gains) -> np.ndarray:
+        """
+        Coefficients c (lowest order first) with sum_h g_h*sin(h*x) = sin(x) * sum_k c_k*cos(x)**k
         
-        return vocal_audio * envelope * 0.5
+        Uses sin(h*x) = sin(x) * U_{h-1}(cos(x)), with the Chebyshev recurrence
+        U_{n+1}(c) = 2c*U_n(c) - U_{n-1}(c).
+        """
+        size = len(harmonic_gains)
+        coefficients = np.zeros(size)
+        previous, current = np.zeros(size), np.eye(size)[0]
+        for gain in harmonic_gains:
+            coefficients += gain * current
+            # Multiplying by c shifts coefficients up one degree (U_size itself is never used)
+            previous, current = current, 2 * np.concatenate(([0.0], current[:-1])) - previous
+        return coefficients
     
     def _apply_musical_corrections(self, vocal_audio_path: str, key: str, tempo: int) -> str:
         """
@@ -474,7 +609,7 @@ class Ocean82RVCService:
         """
         try:
             # Load converted vocal
-            audio, sr = librosa.load(vocal_audio_path, sr=self.sample_rate)
+            audio, sr = load_audio(vocal_audio_path, sr=self.sample_rate)
             
             # Apply pitch correction to match key (simplified)
             # In production, you'd use more sophisticated pitch correction
@@ -484,7 +619,7 @@ class Ocean82RVCService:
             # This would involve beat tracking and time stretching
             
             # Save corrected audio
-            output_path = self.temp_dir / f"corrected_{int(datetime.now().timestamp())}.wav"
+            output_path = self.scratch.path('corrected')
             sf.write(output_path, corrected_audio, sr)
             
             return str(output_path)
@@ -493,10 +628,11 @@ class Ocean82RVCService:
             logger.warning(f"⚠️ Musical corrections failed: {e}")
             return vocal_audio_path  # Return original if correction fails
     
-    def _generate_test_audio(self, model_path: Path, model_name: str) -> str:
+    def _generate_test_audio(self, model_path: Path, model_name: str) -> Optional[str]:
         """
-        Generate test audio to verify model quality
+        Generate test audio to verify model quality (None if conversion fails)
         """
+        test_input_path = self.scratch.path(f"test_input_{model_name}")
         try:
             # Create simple test phrase
             test_duration = 3.0  # 3 seconds
@@ -519,17 +655,22 @@ class Ocean82RVCService:
                 test_audio[start_idx:end_idx] = note_audio
             
             # Save test input
-            test_input_path = self.temp_dir / f"test_input_{model_name}.wav"
             sf.write(test_input_path, test_audio, sr)
             
-            # Convert using the model
-            test_output_path = self.convert_voice(str(test_input_path), str(model_path))
+            # Convert using the model; the result is kept with the model, not in scratch
+            converted_path = self.convert_voice(str(test_input_path), str(model_path))
+            test_output_path = model_path.parent / f"{model_name}_test.wav"
+            shutil.move(converted_path, test_output_path)
             
-            return test_output_path
+            return str(test_output_path)
             
         except Exception as e:
+            # The registry keeps this path for good, so never point it at scratch
             logger.warning(f"⚠️ Test audio generation failed: {e}")
-            return str(test_input_path)
+            return None
+        
+        finally:
+            self.scratch.discard(test_input_path)
     
     def _get_gpu_info(self) -> Dict[str, Any]:
         """Get GPU information for model metadata"""
@@ -545,28 +686,12 @@ class Ocean82RVCService:
             return {'available': False}
     
     def get_available_models(self) -> List[Dict[str, Any]]:
-        """Get list of available RVC models"""
-        models = []
-        
-        if self.models_dir.exists():
-            for model_dir in self.models_dir.iterdir():
-                if model_dir.is_dir():
-                    model_file = model_dir / f"{model_dir.name}.pth"
-                    if model_file.exists():
-                        try:
-                            stat = model_file.stat()
-                            models.append({
-                                'id': model_dir.name,
-                                'name': model_dir.name,
-                                'path': str(model_file),
-                                'size_mb': round(stat.st_size / (1024 * 1024), 2),
-                                'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
-                                'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                            })
-                        except Exception as e:
-                            logger.warning(f"⚠️ Error reading model {model_dir.name}: {e}")
-        
-        return models
+        """Get list of available RVC models from the registry (never opens checkpoints)"""
+        if not self.registry.is_synced():
+            # First run (or an index from before seeding): index whatever is already on disk
+            self.registry.sync()
+        
+        return self.registry.list_models()
 
 # Main API functions for integration
 def train_rvc_model(audio_files: List[str], model_name: str, epochs: int = 300) -> Dict[str, Any]:
@@ -574,16 +699,26 @@ def train_rvc_model(audio_files: List[str], model_name: str, epochs: int = 300)
     service = Ocean82RVCService()
     return service.train_voice_model(audio_files, model_name, epochs)
 
-def convert_with_rvc(source_audio: str, model_path: str, pitch_shift: float = 0.0) -> str:
-    """Convert voice using RVC model"""
+def convert_with_rvc(source_audio: str, model_path: str, pitch_shift: float = 0.0, chunked: bool = False) -> str:
+    """Convert voice using RVC model (the result is kept in scratch until released or expired)"""
+    service = Ocean82RVCService()
+    if chunked:
+        return service.scratch.keep(service.convert_voice_chunked(source_audio, model_path, pitch_shift))
+    return service.scratch.keep(service.convert_voice(source_audio, model_path, pitch_shift))
+
+def convert_batch_with_rvc(jobs: List[Dict[str, Any]]):
+    """Batch conversion grouped by model, yielding results as they finish (outputs kept like convert_with_rvc)"""
     service = Ocean82RVCService()
-    return service.convert_voice(source_audio, model_path, pitch_shift)
+    for result in service.convert_voice_batch(jobs):
+        if 'output_path' in result:
+            service.scratch.keep(result['output_path'])
+        yield result
 
 def convert_midi_to_rvc_vocals(midi_path: str, model_path: str, lyrics: str, 
                               tempo: int, key: str) -> str:
-    """Convert MIDI vocals to RVC singing - main integration function"""
+    """Convert MIDI vocals to RVC singing - main integration function (result kept like convert_with_rvc)"""
     service = Ocean82RVCService()
-    return service.convert_midi_vocals_to_rvc(midi_path, model_path, lyrics, tempo, key)
+    return service.scratch.keep(service.convert_midi_vocals_to_rvc(midi_path, model_path, lyrics, tempo, key))
 
 def get_available_rvc_models() -> List[Dict[str, Any]]:
     """Get list of available RVC models"""
@@ -595,7 +730,7 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         import argparse
         parser = argparse.ArgumentParser(description='Ocean82 RVC Voice Service')
-        parser.add_argument('command', choices=['train', 'convert', 'midi-convert', 'list', 'test'])
+        parser.add_argument('command', choices=['train', 'convert', 'batch', 'midi-convert', 'list', 'test'])
         parser.add_argument('--audio-files', nargs='+', help='Audio files for training')
         parser.add_argument('--model-name', help='Model name')
         parser.add_argument('--source-audio', help='Source audio for conversion')
@@ -606,6 +741,8 @@ if __name__ == "__main__":
         parser.add_argument('--key', default='C', help='Musical key')
         parser.add_argument('--epochs', type=int, default=300, help='Training epochs')
         parser.add_argument('--pitch-shift', type=float, default=0.0, help='Pitch shift in semitones')
+        parser.add_argument('--chunked', action='store_true', help='Convert long vocals in resumable parallel chunks')
+        parser.add_argument('--jobs-file', help='JSON list of {source_audio, model_path, pitch_shift} for batch')
         
         args = parser.parse_args()
         
@@ -614,8 +751,14 @@ if __name__ == "__main__":
                 result = train_rvc_model(args.audio_files, args.model_name, args.epochs)
                 print(json.dumps(result, indent=2))
             elif args.command == 'convert':
-                result = convert_with_rvc(args.source_audio, args.model_path, args.pitch_shift)
+                result = convert_with_rvc(args.source_audio, args.model_path, args.pitch_shift, args.chunked)
                 print(json.dumps({'output_path': result}))
+            elif args.command == 'batch':
+                with open(args.jobs_file, 'r') as f:
+                    jobs = json.load(f)
+                # One JSON line per finished job
+                for result in convert_batch_with_rvc(jobs):
+                    print(json.dumps(result), flush=True)
             elif args.command == 'midi-convert':
                 result = convert_midi_to_rvc_vocals(args.midi_path, args.model_path, 
                                                   args.lyrics, args.tempo, args.key)
@@ -627,6 +770,7 @@ if __name__ == "__main__":
                 service = Ocean82RVCService()
                 print("✅ Ocean82 RVC Service initialized successfully")
                 print(f"GPU Available: {torch.cuda.is_available()}")
+                print(f"CPU Inference Mode: {service.cpu_optimized}")
                 print(f"Models Directory: {service.models_dir}")
                 
         except Exception as e:
@@ -645,7 +789,12 @@ if __name__ == "__main__":
                                            data.get('epochs', 300))
                 elif command == 'convert':
                     result = convert_with_rvc(data['source_audio'], data['model_path'], 
-                                            data.get('pitch_shift', 0.0))
+                                            data.get('pitch_shift', 0.0), data.get('chunked', False))
+                elif command == 'batch':
+                    # Streamed as JSON lines; the final line reports completion
+                    for item in convert_batch_with_rvc(data['jobs']):
+                        print(json.dumps(item), flush=True)
+                    result = {'status': 'completed', 'jobs': len(data['jobs'])}
                 elif command == 'midi-convert':
                     result = convert_midi_to_rvc_vocals(data['midi_path'], data['model_path'], 
                                                       data['lyrics'], data['tempo'], data['key'])
@@ -659,4 +808,3 @@ if __name__ == "__main__":
             print(json.dumps({"error": "Invalid JSON input"}))
         except Exception as e:
             print(json.dumps({"error": str(e)}))
-</merged_code>
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Scratch Storage for Burnt Beats
+Collision-free per-job directories for intermediate audio, with
+reference-counted artifacts and garbage collection by age and total size.
+Can live on a RAM disk (/dev/shm) to keep intermediates off the SSD.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import fcntl
+import atexit
+import shutil
+import logging
+import itertools
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISK_ROOT = "temp_audio/scratch"
+RAM_DISK_ROOT = "/dev/shm/burnt_beats_scratch"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+DEFAULT_MAX_AGE_HOURS = 6.0
+GC_INTERVAL_SECONDS = 60
+
+JOB_MARKER = ".job.json"
+# <prefix>_<YYYYmmdd>_<HHMMSS>_<mkdtemp suffix>; nothing else under the root is ever collected
+JOB_DIR_PATTERN = re.compile(r'.+_\d{8}_\d{6}_[a-z0-9_]{8}')
+
+
+def unique_filename(prefix: str, suffix: str = ".wav") -> str:
+    """Timestamped name that cannot collide with another job's, for files outside the store"""
+    return f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}{suffix}"
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes')
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def default_scratch_root(use_ram: Optional[bool] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> Path:
+    """
+    BURNT_BEATS_SCRATCH_DIR if set, else the RAM disk when requested
+    (use_ram or BURNT_BEATS_SCRATCH_RAM=1) and it has room for max_bytes,
+    else temp_audio/scratch
+    """
+    if os.environ.get('BURNT_BEATS_SCRATCH_DIR'):
+        return Path(os.environ['BURNT_BEATS_SCRATCH_DIR'])
+
+    if use_ram is None:
+        use_ram = _env_flag('BURNT_BEATS_SCRATCH_RAM')
+    if use_ram:
+        ram_parent = Path(RAM_DISK_ROOT).parent
+        if ram_parent.is_dir() and os.access(ram_parent, os.W_OK) and \
+                shutil.disk_usage(ram_parent).free >= max_bytes:
+            return Path(RAM_DISK_ROOT)
+        logger.warning(f"⚠️ RAM disk {ram_parent} unavailable or too small; using {DEFAULT_DISK_ROOT}")
+
+    return Path(DEFAULT_DISK_ROOT)
+
+
+class ScratchJob:
+    """
+    One pipeline's scratch directory
+
+    Files are deleted when the job closes (explicitly, as a context
+    manager, or at interpreter exit) unless they have been kept, which
+    takes a reference on them in the store.
+    """
+
+    def __init__(self, store: 'ScratchStore', directory: Path):
+        self.store = store
+        self.dir = directory
+        self.id = directory.name
+        self.closed = False
+        self._counter = itertools.count()
+
+    def path(self, name: str, suffix: str = ".wav") -> Path:
+        """A fresh file path in this job; repeated names get distinct sequence numbers"""
+        return self.dir / f"{name}_{next(self._counter):04d}{suffix}"
+
+    def keep(self, path: Union[str, Path]) -> str:
+        """Take a reference on an artifact so it outlives the job; release it with the store"""
+        self.store.retain(path)
+        return str(path)
+
+    def discard(self, *paths: Optional[Union[str, Path]]):
+        """Delete intermediates of this job now, skipping kept files and paths outside the job"""
+        refs = self.store.references()
+        for path in paths:
+            if not path:
+                continue
+            path = Path(path).absolute()
+            if path.parent == self.dir.absolute() and str(path) not in refs:
+                path.unlink(missing_ok=True)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        atexit.unregister(self.close)
+        with self.store._locked():
+            self.store._mark_closed(self.dir)
+            self.store._clear_job(self.dir, self.store._read_refs())
+
+    def __enter__(self) -> 'ScratchJob':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ScratchStore:
+    """
+    Per-job scratch directories under one root, shared by every process on the node
+
+    Jobs are mkdtemp directories, so names never collide across processes.
+    Each holds a JOB_MARKER with its owner's pid, written under the lock
+    together with the directory; only directories with a marker and a job
+    name are ever collected, so the root can be shared. refs.json counts references on kept artifacts; it is edited under an
+    flock and replaced atomically. Garbage collection runs at most every
+    GC_INTERVAL_SECONDS when a job starts:
+
+    - jobs whose process has exited lose their unreferenced files,
+    - references older than max_age_hours expire,
+    - if the store still exceeds max_bytes, the oldest files of finished
+      jobs go first, referenced or not. Running jobs are never touched.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_hours: float = DEFAULT_MAX_AGE_HOURS, use_ram: Optional[bool] = None):
+        self.root = Path(root) if root else default_scratch_root(use_ram, max_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_hours * 3600
+        self.refs_path = self.root / "refs.json"
+
+    @contextmanager
+    def _locked(self):
+        with open(self.root / ".lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _read_refs(self) -> Dict[str, Dict[str, Any]]:
+        if not self.refs_path.exists():
+            return {}
+        try:
+            with open(self.refs_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_refs(self, refs: Dict[str, Dict[str, Any]]):
+        temp_path = self.refs_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w') as f:
+            json.dump(refs, f, indent=2)
+        os.replace(temp_path, self.refs_path)
+
+    def references(self) -> Dict[str, Dict[str, Any]]:
+        return self._read_refs()
+
+    def job(self, prefix: str = "job") -> ScratchJob:
+        """Create a new job directory (closed automatically at interpreter exit)"""
+        self.collect_garbage()
+
+        # Under the lock, so a collection never sees the directory without its marker
+        with self._locked():
+            directory = Path(tempfile.mkdtemp(prefix=f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_",
+                                              dir=self.root))
+            with open(directory / JOB_MARKER, 'w') as f:
+                json.dump({'pid': os.getpid(), 'created': time.time()}, f)
+
+        job = ScratchJob(self, directory)
+        atexit.register(job.close)
+        return job
+
+    def retain(self, path: Union[str, Path]) -> int:
+        """Add a reference to an artifact; returns the new count"""
+        key = str(Path(path).absolute())
+        with self._locked():
+            refs = self._read_refs()
+            entry = refs.setdefault(key, {'count': 0})
+            entry['count'] += 1
+            entry['retained_at'] = time.time()
+            self._write_refs(refs)
+            return entry['count']
+
+    def release(self, path: Union[str, Path]) -> int:
+        """
+        Drop a reference; returns the remaining count
+
+        At zero the file is deleted, unless its job is still running, in
+        which case the job deletes it when it closes.
+        """
+        path = Path(path).absolute()
+        key = str(path)
+        with self._locked():
+            refs = self._read_refs()
+            entry = refs.get(key)
+            if entry is None:
+                return 0
+            entry['count'] -= 1
+            if entry['count'] > 0:
+                self._write_refs(refs)
+                return entry['count']
+
+            del refs[key]
+            self._write_refs(refs)
+            if self._is_job_dir(path.parent) and not self._job_running(path.parent):
+                path.unlink(missing_ok=True)
+                self._remove_if_empty(path.parent)
+            return 0
+
+    def _read_marker(self, directory: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(directory / JOB_MARKER, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_job_dir(self, directory: Path) -> bool:
+        """A directory this store created: job name pattern and a marker"""
+        return bool(JOB_DIR_PATTERN.fullmatch(directory.name)) and (directory / JOB_MARKER).is_file()
+
+    def _job_dirs(self):
+        return [Path(entry.path) for entry in os.scandir(self.root)
+                if entry.is_dir() and self._is_job_dir(Path(entry.path))]
+
+    def _job_running(self, directory: Path) -> bool:
+        marker = self._read_marker(directory)
+        if marker is None or marker.get('closed') or 'pid' not in marker:
+            return False
+        return _pid_alive(marker['pid'])
+
+    def _mark_closed(self, directory: Path):
+        """Record that the job has closed, so its kept files become collectable while its process lives on"""
+        marker = self._read_marker(directory)
+        if marker is not None:
+            marker['closed'] = True
+            with open(directory / JOB_MARKER, 'w') as f:
+                json.dump(marker, f)
+
+    def _remove_if_empty(self, directory: Path):
+        """Remove a job directory once nothing but its marker is left"""
+        try:
+            if all(entry.name == JOB_MARKER for entry in os.scandir(directory)):
+                (directory / JOB_MARKER).unlink(missing_ok=True)
+                directory.rmdir()
+        except OSError:
+            pass
+
+    def _clear_job(self, directory: Path, refs: Dict[str, Dict[str, Any]]) -> Dict[str, int]:
+        """Delete a finished job's unreferenced files; the marker goes with the last one (caller holds the lock)"""
+        freed = {'files_removed': 0, 'bytes_freed': 0}
+        for entry in os.scandir(directory):
+            if entry.name == JOB_MARKER:
+                continue
+            if entry.is_file() and str(Path(entry.path).absolute()) not in refs:
+                freed['bytes_freed'] += entry.stat().st_size
+                freed['files_removed'] += 1
+                os.unlink(entry.path)
+            elif entry.is_dir():
+                freed['bytes_freed'] += sum(p.stat().st_size for p in Path(entry.path).rglob('*') if p.is_file())
+                shutil.rmtree(entry.path, ignore_errors=True)
+        self._remove_if_empty(directory)
+        return freed
+
+    def collect_garbage(self, force: bool = False) -> Dict[str, Any]:
+        """Run the collection described on the class; without force, at most every GC_INTERVAL_SECONDS"""
+        gc_stamp = self.root / ".gc"
+        if not force and gc_stamp.exists() and time.time() - gc_stamp.stat().st_mtime < GC_INTERVAL_SECONDS:
+            return {'skipped': True}
+
+        report = {'jobs_removed': 0, 'files_removed': 0, 'bytes_freed': 0, 'refs_expired': 0}
+        with self._locked():
+            gc_stamp.touch()
+            now = time.time()
+            refs = self._read_refs()
+
+            # Expired or dangling references
+            for key in list(refs):
+                if now - refs[key].get('retained_at', 0) > self.max_age_seconds or not os.path.exists(key):
+                    del refs[key]
+                    report['refs_expired'] += 1
+
+            # Finished jobs keep only their referenced files
+            finished = []
+            for directory in self._job_dirs():
+                if self._job_running(directory):
+                    continue
+                freed = self._clear_job(directory, refs)
+                report['files_removed'] += freed['files_removed']
+                report['bytes_freed'] += freed['bytes_freed']
+                if directory.exists():
+                    finished.append(directory)
+                else:
+                    report['jobs_removed'] += 1
+
+            # Size cap: oldest files of finished jobs first
+            usage = self._usage()
+            if usage > self.max_bytes:
+                candidates = sorted((p.stat().st_mtime, p) for d in finished for p in d.iterdir()
+                                    if p.is_file() and p.name != JOB_MARKER)
+                evicted = 0
+                for _, path in candidates:
+                    if usage <= self.max_bytes:
+                        break
+                    size = path.stat().st_size
+                    path.unlink()
+                    refs.pop(str(path.absolute()), None)
+                    usage -= size
+                    report['files_removed'] += 1
+                    report['bytes_freed'] += size
+                    evicted += 1
+                if evicted:
+                    logger.warning(f"⚠️ Scratch store over {self.max_bytes} bytes; evicted {evicted} oldest file(s)")
+                for directory in finished:
+                    self._remove_if_empty(directory)
+                    report['jobs_removed'] += not directory.exists()
+
+            self._write_refs(refs)
+
+        report['bytes_in_use'] = self._usage()
+        if report['files_removed']:
+            logger.info(f"🧹 Scratch GC freed {report['bytes_freed'] / (1024 * 1024):.1f} MB "
+                        f"({report['files_removed']} files, {report['jobs_removed']} jobs)")
+        return report
+
+    def _usage(self) -> int:
+        return sum(p.stat().st_size for job in self._job_dirs() for p in job.rglob('*') if p.is_file())
+
+    def stats(self) -> Dict[str, Any]:
+        jobs = self._job_dirs()
+        return {
+            'root': str(self.root),
+            'jobs': len(jobs),
+            'running_jobs': sum(self._job_running(job) for job in jobs),
+            'references': len(self._read_refs()),
+            'bytes_in_use': self._usage(),
+            'max_bytes': self.max_bytes,
+            'max_age_hours': self.max_age_seconds / 3600
+        }
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_scratch_store() -> ScratchStore:
+    """Process-wide store shared by every service (configured from the environment)"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ScratchStore(
+                max_bytes=int(os.environ.get('BURNT_BEATS_SCRATCH_MAX_BYTES', DEFAULT_MAX_BYTES)),
+                max_age_hours=float(os.environ.get('BURNT_BEATS_SCRATCH_MAX_AGE_HOURS', DEFAULT_MAX_AGE_HOURS))
+            )
+        return _default_store
+
+# CLI interface
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Scratch store maintenance')
+    parser.add_argument('command', choices=['gc', 'stats', 'release'])
+    parser.add_argument('--path', help='Artifact to release')
+
+    args = parser.parse_args()
+
+    try:
+        store = default_scratch_store()
+        if args.command == 'gc':
+            result = store.collect_garbage(force=True)
+        elif args.command == 'stats':
+            result = store.stats()
+        else:
+            if not args.path:
+                raise ValueError("release needs --path")
+            result = {'path': args.path, 'references': store.release(args.path)}
+
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(1)
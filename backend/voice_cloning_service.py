@@ -6,13 +6,32 @@ from typing import Dict, Any, Optional
 import json
 import os
 import sys
+import uuid
+import shutil
+from collections import OrderedDict
 from datetime import datetime
+from audio_io import load_audio
+from voice_feature_engine import VoiceFeatureEngine, VoiceFeatureCache
+from voice_stream_analyzer import StreamingVoiceAnalyzer
+from voice_similarity_index import DEFAULT_INDEX_DIR, index_voice, unindex_voice
 
 class VoiceCloningService:
-    def __init__(self):
+    def __init__(self, pitch_tracker: str = 'piptrack', use_feature_cache: bool = True):
         self.sample_rate = 22050
         self.hop_length = 256
-        self.n_fft = 1024
+        self.n_fft = 2048  # librosa's default, which the spectral features have always used
+        self.last_feature_timings = {}
+        
+        # 'piptrack' (fast, shares the feature STFT) or 'pyin' (slower, proper f0 contour)
+        if pitch_tracker not in ('piptrack', 'pyin'):
+            raise ValueError(f"Unknown pitch tracker: {pitch_tracker}")
+        self.pitch_tracker = pitch_tracker
+        
+        # Re-uploads of the same audio skip feature extraction
+        self.feature_cache = VoiceFeatureCache() if use_feature_cache else None
+        
+        # Uploads longer than this are analysed in blocks instead of loaded whole
+        self.streaming_threshold = 600.0  # seconds
         
         # Star Spangled Banner lyrics for voice model testing
         self.anthem_lyrics = [
@@ -28,26 +47,48 @@ class VoiceCloningService:
             {"text": "light", "start": 4.0, "duration": 1.0}
         ]
         
-    def create_voice_model(self, audio_file_path: str, voice_name: str, make_public: bool = False) -> Dict[str, Any]:
+        # Preview melody as multiples of the voice's mean f0, one per anthem word
+        self.anthem_pitch_ratios = [0.75, 0.84, 1.0, 1.0, 1.0, 0.94, 0.89, 0.84, 0.84, 0.75]
+        self.preview_duration = 5.0  # seconds
+        
+        # Previews keyed by quantised (f0, formants, HNR); built lazily, shared by similar voices
+        self.preview_cache = OrderedDict()
+        self.preview_cache_size = 128
+        self._preview_layout = None
+        
+        # Every created voice is searchable with voice_similarity_index, keyed by name
+        self.similarity_index_dir = DEFAULT_INDEX_DIR
+        
+    def create_voice_model(self, audio_file_path: str, voice_name: str, make_public: bool = False,
+                           streaming: Optional[bool] = None) -> Dict[str, Any]:
         """
         Create a voice MODEL from audio sample - returns voice characteristics and preview
         NOT a full song, just a voice model that can be used later for singing
+        
+        streaming=None picks block-wise analysis automatically for long uploads
         """
         print(f"🎤 Creating voice model: {voice_name}")
         
         try:
-            # Load and analyze audio
-            y, sr = librosa.load(audio_file_path, sr=self.sample_rate)
-            
-            # Extract voice characteristics
-            characteristics = self._extract_voice_features(y, sr)
+            if streaming is None:
+                streaming = self._is_long_upload(audio_file_path)
+            
+            if streaming:
+                # Decode and analyze block by block so memory stays flat
+                characteristics = self._get_streamed_voice_features(audio_file_path)
+            else:
+                # Load and analyze audio
+                y, sr = load_audio(audio_file_path, sr=self.sample_rate)
+                
+                # Extract voice characteristics (or reuse the analysis of identical audio)
+                characteristics = self._get_voice_features(y, sr)
             
             # Generate voice model preview (short Star Spangled Banner sample)
             preview_audio = self._generate_voice_preview(characteristics, voice_name)
             
             # Create voice model data structure
             voice_model = {
-                'id': f"voice_{int(datetime.now().timestamp())}",
+                'id': f"voice_{uuid.uuid4().hex}",
                 'name': voice_name,
                 'characteristics': characteristics,
                 'preview_audio_path': f"/api/voice-models/{voice_name}/preview.wav",
@@ -57,12 +98,19 @@ class VoiceCloningService:
                 'is_public': make_public,
                 'created_at': datetime.now().isoformat(),
                 'status': 'ready',
-                'original_duration': float(len(y) / sr)
+                'original_duration': characteristics['duration'],
+                'analysis_timings_ms': self.last_feature_timings
             }
             
             # Save preview audio file
             self._save_voice_preview(preview_audio, voice_name)
             
+            # Make it findable by "find voices like this one"
+            try:
+                index_voice(voice_name, characteristics, self.similarity_index_dir)
+            except Exception as e:
+                print(f"⚠️ Failed to index voice for similarity search: {e}")
+            
             print(f"✅ Voice model created: {voice_name}")
             print(f"📊 Quality score: {voice_model['quality_score']}/100")
             print(f"🎵 Voice type: {voice_model['voice_type']}")
@@ -74,29 +122,101 @@ class VoiceCloningService:
             print(f"❌ Voice model creation failed: {str(e)}")
             raise e
     
+    def delete_voice_model(self, voice_name: str) -> Dict[str, Any]:
+        """
+        Delete a voice model's files and its similarity index entry
+        """
+        voice_root = os.path.abspath("voice_models")
+        voice_dir = os.path.abspath(os.path.join(voice_root, voice_name))
+        if os.path.dirname(voice_dir) != voice_root or voice_name.startswith('.'):
+            raise ValueError(f"Invalid voice name: {voice_name}")
+        
+        files_removed = os.path.isdir(voice_dir)
+        if files_removed:
+            shutil.rmtree(voice_dir)
+        unindexed = unindex_voice(voice_name, self.similarity_index_dir)
+        
+        print(f"🗑️ Voice model deleted: {voice_name}")
+        return {'name': voice_name, 'files_removed': files_removed, 'unindexed': unindexed}
+    
+    def _is_long_upload(self, audio_file_path: str) -> bool:
+        """True when soundfile can read the file and it is longer than the streaming threshold"""
+        try:
+            return sf.info(audio_file_path).duration > self.streaming_threshold
+        except Exception:
+            return False  # Formats soundfile cannot open are decoded whole
+    
+    def _analysis_params(self, sr: int) -> Dict[str, Any]:
+        return {
+            'sample_rate': sr,
+            'hop_length': self.hop_length,
+            'n_fft': self.n_fft,
+            'pitch_tracker': self.pitch_tracker
+        }
+    
+    def _get_voice_features(self, audio: np.ndarray, sr: int) -> Dict[str, Any]:
+        """Return voice characteristics from the feature cache, extracting them on a miss"""
+        if self.feature_cache is None:
+            return self._extract_voice_features(audio, sr)
+        
+        cache_key = self.feature_cache.make_key(audio, self._analysis_params(sr))
+        
+        characteristics = self.feature_cache.get(cache_key)
+        if characteristics is not None:
+            print("♻️ Reusing cached voice analysis")
+            self.last_feature_timings = {'cache_hit': True}
+            return characteristics
+        
+        characteristics = self._extract_voice_features(audio, sr)
+        self.feature_cache.put(cache_key, characteristics)
+        return characteristics
+    
+    def _get_streamed_voice_features(self, audio_file_path: str) -> Dict[str, Any]:
+        """Block-wise analysis of a long upload, cached by the file's bytes"""
+        cache_key = None
+        if self.feature_cache is not None:
+            cache_key = self.feature_cache.make_file_key(audio_file_path,
+                                                         dict(self._analysis_params(self.sample_rate), streaming=True))
+            characteristics = self.feature_cache.get(cache_key)
+            if characteristics is not None:
+                print("♻️ Reusing cached voice analysis")
+                self.last_feature_timings = {'cache_hit': True}
+                return characteristics
+        
+        analyzer = StreamingVoiceAnalyzer(self)
+        characteristics = analyzer.analyze(audio_file_path)
+        
+        self.last_feature_timings = analyzer.timings
+        print(f"⏱️ Streaming analysis: {analyzer.timings['total']:.1f} ms over {analyzer.blocks} blocks")
+        
+        if cache_key is not None:
+            self.feature_cache.put(cache_key, characteristics)
+        return characteristics
+    
     def _extract_voice_features(self, audio: np.ndarray, sr: int) -> Dict[str, Any]:
         """Extract detailed voice characteristics for the model"""
         
+        # One shared STFT feeds pitch tracking and every spectral feature
+        engine = VoiceFeatureEngine(sr, n_fft=self.n_fft, hop_length=self.hop_length)
+        features = engine.extract(audio)
+        
         # Fundamental frequency analysis
-        pitches, magnitudes = librosa.piptrack(y=audio, sr=sr, hop_length=self.hop_length)
-        pitch_values = []
-        for t in range(pitches.shape[1]):
-            index = magnitudes[:, t].argmax()
-            pitch = pitches[index, t]
-            if pitch > 0:
-                pitch_values.append(pitch)
+        f0_contour, f0_confidence = self._track_pitch(audio, sr, features)
+        pitch_values = f0_contour[f0_contour > 0]
+        # Mean tracker confidence over voiced frames (pYIN: voiced probability)
+        voiced_confidence = np.nan_to_num(f0_confidence[f0_contour > 0])
         
-        f0_mean = np.mean(pitch_values) if pitch_values else 200.0
-        f0_std = np.std(pitch_values) if pitch_values else 20.0
+        f0_mean = np.mean(pitch_values) if len(pitch_values) else 200.0
+        f0_std = np.std(pitch_values) if len(pitch_values) else 20.0
         
         # Spectral features for timbre
-        spectral_centroids = librosa.feature.spectral_centroid(y=audio, sr=sr)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=audio, sr=sr)[0]
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=audio, sr=sr)[0]
-        zero_crossing_rate = librosa.feature.zero_crossing_rate(audio)[0]
+        spectral_centroids = features['spectral_centroid']
+        spectral_rolloff = features['spectral_rolloff']
+        spectral_bandwidth = features['spectral_bandwidth']
+        zero_crossing_rate = features['zero_crossing_rate']
         
         # MFCCs for voice timbre characterization
-        mfccs = librosa.feature.mfcc(y=audio, sr=sr, n_mfcc=13)
+        mfccs = features['mfccs']
         mfcc_means = np.mean(mfccs, axis=1)
         mfcc_stds = np.std(mfccs, axis=1)
         
@@ -106,16 +226,22 @@ class VoiceCloningService:
         # Voice quality metrics
         hnr = self._calculate_hnr(audio, sr)
         jitter = self._calculate_jitter(pitch_values)
-        shimmer = self._calculate_shimmer(audio)
+        shimmer = self._calculate_shimmer(audio, features['frame_amplitude'])
         
         # Vocal range analysis
         vocal_range = self._analyze_vocal_range(pitch_values)
         
+        self.last_feature_timings = engine.timings
+        print(f"⏱️ Feature extraction: {engine.timings['total']:.1f} ms (STFT {engine.timings['stft']:.1f} ms)")
+        
         return {
             'fundamental_frequency': {
                 'mean': float(f0_mean),
                 'std': float(f0_std),
-                'range': [float(f0_mean - f0_std * 2), float(f0_mean + f0_std * 2)]
+                'range': [float(f0_mean - f0_std * 2), float(f0_mean + f0_std * 2)],
+                'voiced_ratio': float(len(pitch_values) / max(1, len(f0_contour))),
+                'confidence': float(np.mean(voiced_confidence)) if len(voiced_confidence) else 0.0,
+                'tracker': self.pitch_tracker
             },
             'spectral_features': {
                 'centroid_mean': float(np.mean(spectral_centroids)),
@@ -140,95 +266,202 @@ class VoiceCloningService:
             'duration': float(len(audio) / sr)
         }
     
+    def _track_pitch(self, audio: np.ndarray, sr: int, features: Dict[str, Any]):
+        """
+        Frame-wise f0 contour (0 Hz where unvoiced) and per-frame confidence
+        """
+        if self.pitch_tracker == 'pyin':
+            f0, voiced_flag, voiced_prob = librosa.pyin(
+                audio, fmin=50.0, fmax=1000.0, sr=sr,
+                frame_length=self.n_fft, hop_length=self.hop_length
+            )
+            return np.where(voiced_flag, np.nan_to_num(f0), 0.0), voiced_prob
+        
+        # Strongest piptrack bin per frame, picked with advanced indexing
+        pitches, magnitudes = features['pitches'], features['magnitudes']
+        frames = np.arange(pitches.shape[1])
+        strongest = magnitudes.argmax(axis=0)
+        f0 = pitches[strongest, frames]
+        peak = magnitudes[strongest, frames]
+        
+        confidence = peak / peak.max() if len(peak) and peak.max() > 0 else np.zeros_like(peak)
+        return f0, confidence
+    
     def _estimate_formants(self, audio: np.ndarray, sr: int) -> Dict[str, float]:
-        """Estimate formant frequencies using LPC analysis"""
+        """
+        Estimate formant frequencies with framewise LPC analysis
+        
+        Short overlapping frames are processed in batches. Each frame's FFT
+        autocorrelation gives one normal-equation solve for the LPC
+        coefficients. The roots of the LPC polynomial (eigenvalues of its
+        companion matrix) give the formant candidates. F1-F4 are the medians
+        over voiced frames, so memory is bounded by the batch size and runtime
+        is linear in duration.
+        """
+        default_formants = {'f1': 500.0, 'f2': 1500.0, 'f3': 2500.0, 'f4': 3500.0}
+        
         try:
-            # Pre-emphasis filter
-            pre_emphasized = np.append(audio[0], audio[1:] - 0.97 * audio[:-1])
-            
-            # Windowing
-            windowed = pre_emphasized * np.hanning(len(pre_emphasized))
-            
-            # LPC analysis (simplified)
-            # In production, use more sophisticated formant tracking
-            fft = np.fft.fft(windowed)
-            magnitude = np.abs(fft)
-            freqs = np.fft.fftfreq(len(fft), 1/sr)
-            
-            # Find peaks in the spectrum
-            from scipy.signal import find_peaks
-            peaks, properties = find_peaks(magnitude[:len(magnitude)//2], 
-                                         height=np.max(magnitude)*0.1, 
-                                         distance=int(sr/4000))  # Minimum 250Hz apart
-            
-            peak_freqs = freqs[peaks]
-            peak_freqs = peak_freqs[peak_freqs > 200]  # Filter out very low frequencies
-            peak_freqs = np.sort(peak_freqs)
-            
-            # Estimate first 4 formants
-            formants = {
-                'f1': 500.0,   # Default values
-                'f2': 1500.0,
-                'f3': 2500.0,
-                'f4': 3500.0
-            }
+            tracks = self._formant_tracks(audio, sr)
             
-            formant_keys = ['f1', 'f2', 'f3', 'f4']
-            for i, key in enumerate(formant_keys):
-                if i < len(peak_freqs):
-                    formants[key] = float(peak_freqs[i])
+            formants = dict(default_formants)
+            for i, key in enumerate(['f1', 'f2', 'f3', 'f4']):
+                if np.any(~np.isnan(tracks[:, i])):
+                    formants[key] = float(np.nanmedian(tracks[:, i]))
             
             return formants
             
         except Exception as e:
             print(f"Formant estimation error: {e}")
-            return {'f1': 500.0, 'f2': 1500.0, 'f3': 2500.0, 'f4': 3500.0}
+            return default_formants
+    
+    def _formant_tracks(self, audio: np.ndarray, sr: int, mean_power: Optional[float] = None) -> np.ndarray:
+        """
+        F1-F4 candidates for every voiced frame, shape (frames, 4), NaN where missing
+        
+        The silence gate is relative to mean_power, which defaults to the
+        power of `audio` itself; streaming analysis passes the running value.
+        """
+        frame_length = int(0.025 * sr)  # 25 ms frames
+        hop = int(0.010 * sr)           # 10 ms hop
+        order = 2 + sr // 1000          # Two poles per kHz plus two
+        n_fft = 1 << int(np.ceil(np.log2(2 * frame_length)))
+        batch_size = 256
+        
+        if len(audio) < frame_length:
+            return np.full((0, 4), np.nan)
+        
+        window = np.hamming(frame_length)
+        lags = np.abs(np.subtract.outer(np.arange(order), np.arange(order)))
+        subdiagonal = np.eye(order, k=-1, dtype=bool)
+        
+        # Frames more than 25 dB below the average power count as silence
+        if mean_power is None:
+            mean_power = float(np.dot(audio, audio)) / len(audio)
+        silence_power = mean_power * 10 ** (-25 / 10)
+        
+        frames = np.lib.stride_tricks.sliding_window_view(audio, frame_length)[::hop]
+        tracks = []
+        
+        for start in range(0, len(frames), batch_size):
+            block = frames[start:start + batch_size].astype(np.float64)
+            
+            # Voiced frames: loud enough and not noise-like (low zero-crossing rate)
+            zero_crossing_rate = np.mean(np.abs(np.diff(np.signbit(block), axis=1)), axis=1)
+            voiced = (np.mean(block ** 2, axis=1) > max(silence_power, 1e-10)) & (zero_crossing_rate < 0.25)
+            block = block[voiced]
+            if len(block) == 0:
+                continue
+            
+            # Pre-emphasis and windowing
+            block[:, 1:] -= 0.97 * block[:, :-1].copy()
+            block *= window
+            
+            # Autocorrelation via the power spectrum, then one Toeplitz solve per frame
+            autocorr = np.fft.irfft(np.abs(np.fft.rfft(block, n_fft, axis=1)) ** 2, n_fft, axis=1)[:, :order + 1]
+            toeplitz = autocorr[:, lags]
+            toeplitz += np.eye(order) * (autocorr[:, :1, None] * 1e-9)  # Keep near-silent frames solvable
+            coefficients = np.linalg.solve(toeplitz, autocorr[:, 1:, None])[:, :, 0]
+            
+            # Roots of z^p - a1 z^(p-1) - ... - ap from the companion matrix
+            companion = np.zeros((len(block), order, order))
+            companion[:, 0, :] = coefficients
+            companion[:, subdiagonal] = 1.0
+            roots = np.linalg.eigvals(companion)
+            
+            freqs = np.angle(roots) * sr / (2 * np.pi)
+            bandwidths = -np.log(np.maximum(np.abs(roots), 1e-12)) * sr / np.pi
+            candidates = (roots.imag > 0) & (freqs > 90) & (freqs < min(5500, sr / 2 - 50)) & (bandwidths < 400)
+            
+            freqs = np.sort(np.where(candidates, freqs, np.inf), axis=1)[:, :4]
+            tracks.append(freqs)
+        
+        tracks = np.concatenate(tracks) if tracks else np.full((0, 4), np.inf)
+        tracks = np.pad(tracks, ((0, 0), (0, 4 - tracks.shape[1])), constant_values=np.inf)
+        tracks[np.isinf(tracks)] = np.nan
+        return tracks
     
     def _calculate_hnr(self, audio: np.ndarray, sr: int) -> float:
-        """Calculate Harmonics-to-Noise Ratio"""
+        """
+        Calculate Harmonics-to-Noise Ratio from short-frame autocorrelation
+
+        Each frame's autocorrelation is taken from its power spectrum
+        (Wiener-Khinchin) and normalised by the window's own autocorrelation.
+        The HNR is averaged over voiced frames. Frames are processed in fixed-size
+        batches, so cost is O(n log n) and memory does not grow with upload length.
+        """
         try:
-            # Autocorrelation-based HNR calculation
-            autocorr = np.correlate(audio, audio, mode='full')
-            autocorr = autocorr[autocorr.size // 2:]
-            
-            if len(autocorr) > 1:
-                # Find fundamental period
-                min_period = int(sr / 500)  # 500 Hz max
-                max_period = int(sr / 50)   # 50 Hz min
-                
-                if max_period < len(autocorr):
-                    period_range = autocorr[min_period:max_period]
-                    if len(period_range) > 0:
-                        peak_idx = np.argmax(period_range) + min_period
-                        
-                        # Calculate HNR
-                        signal_power = autocorr[peak_idx]
-                        noise_power = np.sum(autocorr) - signal_power
-                        
-                        if noise_power > 0:
-                            hnr = 10 * np.log10(signal_power / noise_power)
-                            return max(0.0, min(30.0, hnr))
-            
+            voiced_hnr = self._hnr_frames(audio, sr)
+            if len(voiced_hnr) > 0:
+                return float(max(0.0, min(30.0, np.mean(voiced_hnr))))
+
             return 10.0  # Default value
             
         except Exception:
             return 10.0
     
-    def _calculate_jitter(self, pitch_values: list) -> float:
+    def _hnr_frames(self, audio: np.ndarray, sr: int, mean_power: Optional[float] = None) -> np.ndarray:
+        """
+        HNR in dB of every voiced frame
+        
+        The silence gate is relative to mean_power, which defaults to the
+        power of `audio` itself; streaming analysis passes the running value.
+        """
+        min_lag = int(sr / 500)   # 500 Hz max
+        max_lag = int(sr / 50)    # 50 Hz min
+        frame_length = 3 * max_lag  # Three periods of the lowest pitch
+        hop = frame_length // 2
+        n_fft = 1 << int(np.ceil(np.log2(2 * frame_length)))  # Zero-pad so the autocorrelation is linear
+        batch_size = 128
+
+        if len(audio) < frame_length:
+            audio = np.pad(audio, (0, frame_length - len(audio)))
+
+        window = np.hanning(frame_length)
+        window_autocorr = np.fft.irfft(np.abs(np.fft.rfft(window, n_fft)) ** 2, n_fft)[:max_lag + 1]
+        window_autocorr /= window_autocorr[0]
+
+        # Frames more than 25 dB below the average power count as silence
+        if mean_power is None:
+            mean_power = float(np.dot(audio, audio)) / len(audio)
+        silence_energy = mean_power * np.sum(window ** 2) * 10 ** (-25 / 10)
+
+        frames = np.lib.stride_tricks.sliding_window_view(audio, frame_length)[::hop]
+        voiced_hnr = []
+
+        for start in range(0, len(frames), batch_size):
+            block = frames[start:start + batch_size]
+            block = (block - block.mean(axis=1, keepdims=True)) * window
+
+            power = np.abs(np.fft.rfft(block, n_fft, axis=1)) ** 2
+            autocorr = np.fft.irfft(power, n_fft, axis=1)[:, :max_lag + 1]
+            energy = autocorr[:, 0]
+
+            active = energy > max(silence_energy, 1e-12)
+            if not np.any(active):
+                continue
+
+            normalized = autocorr[active, min_lag:] / (energy[active, None] * window_autocorr[min_lag:])
+            peak = np.clip(normalized.max(axis=1), 0.0, 1.0 - 1e-6)
+
+            # Weakly periodic frames are unvoiced
+            voiced = peak > 0.45
+            voiced_hnr.append(10 * np.log10(peak[voiced] / (1 - peak[voiced])))
+
+        return np.concatenate(voiced_hnr) if voiced_hnr else np.zeros(0)
+    
+    def _calculate_jitter(self, pitch_values: np.ndarray) -> float:
         """Calculate pitch jitter (period-to-period variation)"""
         if len(pitch_values) < 3:
             return 0.0
         
         try:
-            periods = [1/p for p in pitch_values if p > 0]
+            pitch_values = np.asarray(pitch_values, dtype=np.float64)
+            periods = 1.0 / pitch_values[pitch_values > 0]
             if len(periods) < 3:
                 return 0.0
             
             # Calculate period differences
-            period_diffs = []
-            for i in range(len(periods) - 1):
-                diff = abs(periods[i+1] - periods[i])
-                period_diffs.append(diff)
+            period_diffs = np.abs(np.diff(periods))
             
             mean_period = np.mean(periods)
             if mean_period > 0:
@@ -240,12 +473,12 @@ class VoiceCloningService:
         except Exception:
             return 0.0
     
-    def _calculate_shimmer(self, audio: np.ndarray) -> float:
+    def _calculate_shimmer(self, audio: np.ndarray, amplitude_means: Optional[np.ndarray] = None) -> float:
         """Calculate amplitude shimmer (amplitude variation)"""
         try:
-            # Get amplitude envelope
-            amplitude_envelope = np.abs(librosa.stft(audio))
-            amplitude_means = np.mean(amplitude_envelope, axis=0)
+            # Get amplitude envelope (per-frame mean STFT magnitude)
+            if amplitude_means is None:
+                amplitude_means = np.mean(np.abs(librosa.stft(audio)), axis=0)
             
             if len(amplitude_means) < 3:
                 return 0.0
@@ -266,14 +499,15 @@ class VoiceCloningService:
         except Exception:
             return 0.0
     
-    def _analyze_vocal_range(self, pitch_values: list) -> Dict[str, float]:
+    def _analyze_vocal_range(self, pitch_values: np.ndarray) -> Dict[str, float]:
         """Analyze vocal range characteristics"""
-        if not pitch_values:
+        if len(pitch_values) == 0:
             return {'min': 100.0, 'max': 300.0, 'range_semitones': 12.0}
         
         try:
-            min_pitch = min(pitch_values)
-            max_pitch = max(pitch_values)
+            min_pitch = np.min(pitch_values)
+            max_pitch = np.max(pitch_values)
+            lower_quartile, upper_quartile = np.percentile(pitch_values, [25, 75])
             
             # Convert to semitones for range calculation
             min_semitones = 12 * np.log2(min_pitch / 440) + 69  # A4 = 440Hz = MIDI 69
@@ -284,8 +518,7 @@ class VoiceCloningService:
                 'min': float(min_pitch),
                 'max': float(max_pitch),
                 'range_semitones': float(range_semitones),
-                'comfortable_range': [float(np.percentile(pitch_values, 25)), 
-                                    float(np.percentile(pitch_values, 75))]
+                'comfortable_range': [float(lower_quartile), float(upper_quartile)]
             }
             
         except Exception:
@@ -296,84 +529,69 @@ class VoiceCloningService:
         Generate a SHORT voice preview using the voice characteristics
         This creates a 5-second sample of Star Spangled Banner with the cloned voice
         NOT a full song - just a voice model demonstration
+        
+        Voices whose quantised f0, formants and HNR match share one cached
+        preview. The returned array is read-only.
         """
         print(f"🎵 Generating voice preview for: {voice_name}")
         
-        duration = 5.0  # 5 second preview
-        sr = self.sample_rate
-        t = np.linspace(0, duration, int(duration * sr))
+        key = self._preview_key(characteristics)
+        if key in self.preview_cache:
+            self.preview_cache.move_to_end(key)
+            return self.preview_cache[key]
         
-        # Extract voice characteristics
-        f0_mean = characteristics['fundamental_frequency']['mean']
-        formants = characteristics['formants']
-        hnr = characteristics['voice_quality']['harmonics_to_noise_ratio']
-        
-        # Generate Star Spangled Banner melody notes for preview
-        anthem_notes = [
-            {'pitch': f0_mean * 0.75, 'start': 0.0, 'duration': 0.75},    # "Oh"
-            {'pitch': f0_mean * 0.84, 'start': 0.75, 'duration': 0.25},   # "say"
-            {'pitch': f0_mean * 1.0, 'start': 1.0, 'duration': 0.5},     # "can"
-            {'pitch': f0_mean * 1.0, 'start': 1.5, 'duration': 0.5},     # "you"
-            {'pitch': f0_mean * 1.0, 'start': 2.0, 'duration': 0.5},     # "see"
-            {'pitch': f0_mean * 0.94, 'start': 2.5, 'duration': 0.25},   # "by"
-            {'pitch': f0_mean * 0.89, 'start': 2.75, 'duration': 0.25},  # "the"
-            {'pitch': f0_mean * 0.84, 'start': 3.0, 'duration': 0.5},    # "dawn's"
-            {'pitch': f0_mean * 0.84, 'start': 3.5, 'duration': 0.5},    # "early"
-            {'pitch': f0_mean * 0.75, 'start': 4.0, 'duration': 1.0},    # "light"
-        ]
-        
-        # Generate audio
-        audio = np.zeros(len(t))
-        
-        for note in anthem_notes:
-            start_idx = int(note['start'] * sr)
-            end_idx = int((note['start'] + note['duration']) * sr)
-            
-            if end_idx > len(audio):
-                end_idx = len(audio)
-            
-            note_t = t[start_idx:end_idx]
-            note_audio = self._synthesize_note(note_t, note['pitch'], formants, hnr)
-            
-            # Apply envelope
-            envelope = self._create_note_envelope(len(note_audio), note['duration'])
-            note_audio *= envelope
-            
-            audio[start_idx:end_idx] += note_audio
+        audio = self._synthesize_preview(*key)
+        audio.flags.writeable = False
         
-        # Apply overall envelope and normalize
-        overall_envelope = np.exp(-t * 0.2)  # Gentle fade
-        audio *= overall_envelope
-        audio = audio / np.max(np.abs(audio)) * 0.7
+        self.preview_cache[key] = audio
+        if len(self.preview_cache) > self.preview_cache_size:
+            self.preview_cache.popitem(last=False)
         
         return audio
     
-    def _synthesize_note(self, t: np.ndarray, fundamental_freq: float, formants: Dict[str, float], hnr: float) -> np.ndarray:
-        """Synthesize a single note with voice characteristics"""
-        audio = np.zeros_like(t)
-        
-        # Generate harmonic series
-        for harmonic in range(1, 8):  # First 7 harmonics
-            freq = fundamental_freq * harmonic
-            amplitude = 1.0 / harmonic  # Natural harmonic rolloff
-            
-            # Apply formant filtering
-            for formant_freq in formants.values():
-                if abs(freq - formant_freq) < 200:  # Within formant bandwidth
-                    amplitude *= 2.0  # Boost harmonics near formants
-            
-            # Add harmonic
-            audio += amplitude * np.sin(2 * np.pi * freq * t) * 0.1
+    def _preview_key(self, characteristics: Dict[str, Any]) -> tuple:
+        """Quantise the preview inputs: f0 to 10 cents, formants to 25 Hz, HNR to 0.5 dB"""
+        f0_mean = characteristics['fundamental_frequency']['mean']
+        formants = characteristics['formants']
+        hnr = characteristics['voice_quality']['harmonics_to_noise_ratio']
         
-        # Add controlled noise for breathiness
-        noise_level = 1.0 / (1.0 + hnr / 10.0)
-        noise = np.random.normal(0, noise_level * 0.05, len(t))
-        audio += noise
+        f0_cents = round(1200 * np.log2(max(f0_mean, 1.0) / 440.0) / 10) * 10
+        return (
+            float(440.0 * 2 ** (f0_cents / 1200)),
+            tuple(float(round(f / 25) * 25) for f in formants.values()),
+            float(round(hnr * 2) / 2)
+        )
+    
+    def _get_preview_layout(self) -> Dict[str, np.ndarray]:
+        """
+        Voice-independent parts of the preview, computed once: note lengths,
+        the time axis, the combined note/fade envelope and unit noise
+        """
+        if self._preview_layout is not None:
+            return self._preview_layout
         
-        return audio
+        sr = self.sample_rate
+        t = np.linspace(0, self.preview_duration, int(self.preview_duration * sr))
+        
+        starts = np.array([int(word['start'] * sr) for word in self.anthem_lyrics])
+        ends = np.minimum([int((word['start'] + word['duration']) * sr) for word in self.anthem_lyrics], len(t))
+        lengths = ends - starts
+        
+        # Per-note linear attack (10%) and release (20%), then a gentle overall fade
+        envelope = np.concatenate([self._note_envelope_template(length) for length in lengths])
+        envelope *= np.exp(-t * 0.2)
+        
+        # float32 keeps sin/cos on the SIMD path; phase error stays below 1e-3 rad over 5 s
+        self._preview_layout = {
+            'lengths': lengths,
+            'two_pi_t': (2 * np.pi * t).astype(np.float32),
+            'envelope': envelope.astype(np.float32),
+            'noise': np.random.default_rng(0).standard_normal(len(t), dtype=np.float32)
+        }
+        return self._preview_layout
     
-    def _create_note_envelope(self, length: int, duration: float) -> np.ndarray:
-        """Create envelope for a single note"""
+    def _note_envelope_template(self, length: int) -> np.ndarray:
+        """Envelope for one note of `length` samples"""
         envelope = np.ones(length)
         
         # Attack (10% of note)
@@ -388,6 +606,43 @@ class VoiceCloningService:
         
         return envelope
     
+    def _synthesize_preview(self, f0_mean: float, formants: tuple, hnr: float) -> np.ndarray:
+        """Render the whole preview in one pass over a (harmonics x samples) phase matrix"""
+        layout = self._get_preview_layout()
+        
+        # First 7 harmonics of every note, with natural 1/h rolloff
+        harmonics = np.arange(1, 8)
+        note_freqs = f0_mean * np.asarray(self.anthem_pitch_ratios)
+        harmonic_freqs = note_freqs[:, None] * harmonics
+        
+        # Double the gain once per formant within 200 Hz of the harmonic
+        near_formants = np.abs(harmonic_freqs[:, :, None] - np.asarray(formants)) < 200
+        gains = 0.1 / harmonics * 2.0 ** near_formants.sum(axis=2)
+        
+        # Per-sample note frequency and harmonic gains, expanded from the note segments
+        lengths = layout['lengths']
+        phase = layout['two_pi_t'] * np.repeat(note_freqs.astype(np.float32), lengths)
+        sample_gains = np.repeat(gains.astype(np.float32), lengths, axis=0).T
+        
+        # sin(h*x) for every harmonic from one sin and one cos:
+        # sin((h+1)x) = 2cos(x)sin(hx) - sin((h-1)x)
+        previous, current = np.zeros_like(phase), np.sin(phase)
+        two_cos = np.cos(phase)
+        two_cos *= 2
+        audio = sample_gains[0] * current
+        for h in range(1, len(harmonics)):
+            previous, current = current, two_cos * current - previous
+            audio += sample_gains[h] * current
+        
+        # Add controlled noise for breathiness
+        noise_level = 1.0 / (1.0 + hnr / 10.0)
+        audio += layout['noise'] * np.float32(noise_level * 0.05)
+        
+        audio *= layout['envelope']
+        audio *= np.float32(0.7 / np.max(np.abs(audio)))
+        
+        return audio
+    
     def _calculate_quality_score(self, characteristics: Dict[str, Any]) -> int:
         """Calculate voice quality score (0-100)"""
         score = 50  # Base score
@@ -474,21 +729,26 @@ class VoiceCloningService:
             print(f"❌ Failed to save voice preview: {e}")
 
 # Main API function
-def create_voice_model_from_audio(audio_file_path: str, voice_name: str, make_public: bool = False) -> Dict[str, Any]:
+def create_voice_model_from_audio(audio_file_path: str, voice_name: str, make_public: bool = False,
+                                  pitch_tracker: str = 'piptrack', streaming: Optional[bool] = None) -> Dict[str, Any]:
     """
     Main function to create a voice model from audio file
     Returns voice model data with characteristics and preview
     """
-    service = VoiceCloningService()
+    service = VoiceCloningService(pitch_tracker)
     
     try:
-        voice_model = service.create_voice_model(audio_file_path, voice_name, make_public)
+        voice_model = service.create_voice_model(audio_file_path, voice_name, make_public, streaming)
         return voice_model
         
     except Exception as e:
         print(f"❌ Voice model creation failed: {str(e)}")
         raise e
 
+def delete_voice_model(voice_name: str) -> Dict[str, Any]:
+    """Delete a voice model and drop it from the similarity index"""
+    return VoiceCloningService().delete_voice_model(voice_name)
+
 # CLI interface
 if __name__ == "__main__":
     if len(sys.argv) > 1:
@@ -498,10 +758,15 @@ if __name__ == "__main__":
         parser.add_argument('audio_file', help='Path to audio file')
         parser.add_argument('--name', required=True, help='Voice model name')
         parser.add_argument('--public', action='store_true', help='Make voice model public')
+        parser.add_argument('--pitch-tracker', choices=['piptrack', 'pyin'], default='piptrack',
+                            help='Pitch tracker (pyin is slower but returns a proper f0 contour)')
+        parser.add_argument('--stream', action='store_true', default=None,
+                            help='Analyse in blocks with constant memory (default: only for long uploads)')
         
         args = parser.parse_args()
         
-        result = create_voice_model_from_audio(args.audio_file, args.name, args.public)
+        result = create_voice_model_from_audio(args.audio_file, args.name, args.public, args.pitch_tracker,
+                                               args.stream)
         print(json.dumps(result, indent=2))
     else:
         # Read from stdin for API calls
@@ -509,7 +774,10 @@ if __name__ == "__main__":
         if input_data:
             try:
                 data = json.loads(input_data)
-                result = create_voice_model_from_audio(**data)
+                if data.pop('command', None) == 'delete':
+                    result = delete_voice_model(data['voice_name'])
+                else:
+                    result = create_voice_model_from_audio(**data)
                 print(json.dumps(result))
             except json.JSONDecodeError:
                 print(json.dumps({"error": "Invalid JSON input"}))
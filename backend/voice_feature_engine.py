@@ -0,0 +1,171 @@
+# backend/voice_feature_engine.py
+import os
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import librosa
+import numpy as np
+
+# Bump whenever feature extraction changes, so cached analyses are recomputed
+ANALYSIS_VERSION = 1
+
+
+class VoiceFeatureEngine:
+    """
+    Shared-STFT feature extraction for voice analysis
+
+    Computes one magnitude STFT at the pitch-tracking hop and derives every
+    spectral feature from it. Features that use librosa's default hop
+    (n_fft // 4) read every other frame, which with centred framing is
+    exactly the frame a separate STFT would have produced.
+    """
+
+    def __init__(self, sr: int, n_fft: int = 2048, hop_length: int = 256, n_mfcc: int = 13):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.feature_hop = n_fft // 4  # librosa's default hop for spectral features
+        self.n_mfcc = n_mfcc
+
+        if self.feature_hop % hop_length:
+            raise ValueError(f"hop_length {hop_length} must divide the feature hop {self.feature_hop}")
+
+        self.timings = {}
+
+    @contextmanager
+    def _timed(self, name: str):
+        start = time.perf_counter()
+        yield
+        self.timings[name] = round((time.perf_counter() - start) * 1000, 3)
+
+    def extract(self, audio: np.ndarray) -> Dict[str, Any]:
+        """Compute all frame-level voice features from a single STFT"""
+        self.timings = {}
+        sr = self.sr
+
+        with self._timed('stft'):
+            magnitude = np.abs(librosa.stft(audio, n_fft=self.n_fft, hop_length=self.hop_length))
+            frames = magnitude[:, ::self.feature_hop // self.hop_length]
+
+        with self._timed('piptrack'):
+            pitches, magnitudes = librosa.piptrack(S=magnitude, sr=sr, n_fft=self.n_fft,
+                                                   hop_length=self.hop_length)
+
+        with self._timed('spectral_centroid'):
+            centroid = librosa.feature.spectral_centroid(S=frames, sr=sr, n_fft=self.n_fft)
+
+        with self._timed('spectral_rolloff'):
+            rolloff = librosa.feature.spectral_rolloff(S=frames, sr=sr, n_fft=self.n_fft)
+
+        with self._timed('spectral_bandwidth'):
+            bandwidth = librosa.feature.spectral_bandwidth(S=frames, sr=sr, n_fft=self.n_fft,
+                                                           centroid=centroid)
+
+        with self._timed('zero_crossing_rate'):
+            zero_crossing_rate = librosa.feature.zero_crossing_rate(audio, frame_length=self.n_fft,
+                                                                    hop_length=self.feature_hop)
+
+        with self._timed('mfcc'):
+            mel = librosa.feature.melspectrogram(S=frames ** 2, sr=sr, n_fft=self.n_fft)
+            mfccs = librosa.feature.mfcc(S=librosa.power_to_db(mel), sr=sr, n_mfcc=self.n_mfcc)
+
+        with self._timed('frame_amplitude'):
+            frame_amplitude = np.mean(frames, axis=0)
+
+        self.timings['total'] = round(sum(self.timings.values()), 3)
+
+        return {
+            'pitches': pitches,
+            'magnitudes': magnitudes,
+            'spectral_centroid': centroid[0],
+            'spectral_rolloff': rolloff[0],
+            'spectral_bandwidth': bandwidth[0],
+            'zero_crossing_rate': zero_crossing_rate[0],
+            'mfccs': mfccs,
+            'frame_amplitude': frame_amplitude
+        }
+
+
+class VoiceFeatureCache:
+    """
+    Disk cache of extracted voice characteristics keyed by audio content
+
+    Entries are JSON files named by a hash of the decoded PCM plus the
+    analysis parameters. Least recently used entries are evicted once the
+    cache grows past max_size_mb.
+    """
+
+    def __init__(self, cache_dir: str = "voice_models/.feature_cache", max_size_mb: float = 64.0):
+        self.cache_dir = Path(cache_dir)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def make_key(self, audio: np.ndarray, params: Dict[str, Any]) -> str:
+        """Hash the decoded samples together with the analysis parameters"""
+        digest = self._params_digest(params)
+        digest.update(str(audio.dtype).encode('utf-8'))
+        digest.update(np.ascontiguousarray(audio).tobytes())
+        return digest.hexdigest()
+
+    def make_file_key(self, file_path: str, params: Dict[str, Any]) -> str:
+        """Hash the raw file bytes (read in 1 MB chunks) together with the analysis parameters"""
+        digest = self._params_digest(params)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _params_digest(self, params: Dict[str, Any]):
+        digest = hashlib.sha256()
+        digest.update(json.dumps(dict(params, version=ANALYSIS_VERSION), sort_keys=True).encode('utf-8'))
+        return digest
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return cached characteristics, or None on a miss"""
+        entry = self.cache_dir / f"{key}.json"
+
+        try:
+            with open(entry, 'r') as f:
+                characteristics = json.load(f)
+            os.utime(entry)  # Mark as recently used
+            return characteristics
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            entry.unlink(missing_ok=True)  # Corrupt entry
+            return None
+
+    def put(self, key: str, characteristics: Dict[str, Any]):
+        """Store characteristics atomically, then evict if over the size cap"""
+        entry = self.cache_dir / f"{key}.json"
+        temp_entry = self.cache_dir / f"{key}.{os.getpid()}.tmp"
+
+        try:
+            with open(temp_entry, 'w') as f:
+                json.dump(characteristics, f)
+            os.replace(temp_entry, entry)
+            self._evict()
+        except OSError as e:
+            temp_entry.unlink(missing_ok=True)
+            print(f"⚠️ Failed to cache voice analysis: {e}")
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits"""
+        entries = []
+        for entry in self.cache_dir.glob('*.json'):
+            try:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry))
+            except FileNotFoundError:
+                continue
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total_size -= size
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Bulk Voice Model Creation for Burnt Beats
+Creates voice models for a whole manifest of samples across a process pool,
+streaming one NDJSON result per entry as it finishes
+"""
+
+import os
+import sys
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Any, Iterator, List, Optional, TextIO
+
+# numpy/librosa are only imported inside workers, after the thread limits are set
+BLAS_THREAD_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+                    'VECLIB_MAXIMUM_THREADS', 'NUMEXPR_NUM_THREADS', 'NUMBA_NUM_THREADS')
+
+_worker_service = None
+
+
+def load_manifest(manifest_path: str) -> List[Dict[str, Any]]:
+    """Read a manifest file"""
+    with open(manifest_path, 'r') as f:
+        return parse_manifest(f.read())
+
+
+def parse_manifest(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse a manifest given as a JSON array or NDJSON, one entry per sample:
+    {"audio_file_path": ..., "voice_name": ..., "make_public": false}
+    """
+    if text.lstrip().startswith('['):
+        entries = json.loads(text)
+    else:
+        entries = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    for i, entry in enumerate(entries):
+        if 'audio_file_path' not in entry or 'voice_name' not in entry:
+            raise ValueError(f"Manifest entry {i} needs audio_file_path and voice_name")
+
+    return entries
+
+
+def _init_worker(blas_threads: int, pitch_tracker: str):
+    """Limit native thread pools, then build one service per worker process"""
+    global _worker_service
+
+    for var in BLAS_THREAD_VARS:
+        os.environ[var] = str(blas_threads)
+
+    # Progress messages go to stderr so stdout stays pure NDJSON
+    sys.stdout = sys.stderr
+
+    from voice_cloning_service import VoiceCloningService
+    _worker_service = VoiceCloningService(pitch_tracker)
+
+
+def parse_bool(value: Any, field: str) -> bool:
+    """Strict boolean for manifest fields: bools, 0/1 and true/false/yes/no/1/0 strings"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.strip().lower() in ('true', 'yes', '1', 'false', 'no', '0'):
+        return value.strip().lower() in ('true', 'yes', '1')
+    raise ValueError(f"{field} must be a boolean, got {value!r}")
+
+
+def _create_one(index: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+    start = time.perf_counter()
+
+    try:
+        voice_model = _worker_service.create_voice_model(
+            entry['audio_file_path'],
+            entry['voice_name'],
+            parse_bool(entry.get('make_public', False), 'make_public'),
+            None if entry.get('streaming') is None else parse_bool(entry['streaming'], 'streaming')
+        )
+        return {
+            'index': index,
+            'voice_name': entry['voice_name'],
+            'status': 'ok',
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+            'voice_model': voice_model
+        }
+
+    except Exception as e:
+        return {
+            'index': index,
+            'voice_name': entry['voice_name'],
+            'status': 'error',
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+            'error': str(e)
+        }
+
+
+def create_voice_models_bulk(entries: List[Dict[str, Any]], workers: Optional[int] = None,
+                             blas_threads: Optional[int] = None,
+                             pitch_tracker: str = 'piptrack') -> Iterator[Dict[str, Any]]:
+    """
+    Create a voice model per manifest entry, yielding results as they complete
+
+    Workers default to one per core and share the cores between their BLAS
+    threads, so the pool never runs more native threads than there are cores.
+    Workers are spawned (not forked) so the limits apply before numpy loads.
+    """
+    if not entries:
+        return
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or cpu_count, len(entries)))
+    blas_threads = blas_threads or max(1, cpu_count // workers)
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=(blas_threads, pitch_tracker)) as executor:
+        futures = {executor.submit(_create_one, i, entry): (i, entry) for i, entry in enumerate(entries)}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # A worker died (OOM, segfault): the pool is broken and every pending entry lands here
+                index, entry = futures[future]
+                yield {
+                    'index': index,
+                    'voice_name': entry['voice_name'],
+                    'status': 'error',
+                    'error': f"Worker failed: {str(e) or type(e).__name__}"
+                }
+
+
+def write_ndjson_results(results: Iterator[Dict[str, Any]], output: Optional[TextIO] = None) -> Dict[str, Any]:
+    """Write each result as one JSON line (flushed immediately), then a summary line"""
+    output = output or sys.stdout
+    start = time.perf_counter()
+    summary = {'type': 'summary', 'total': 0, 'ok': 0, 'errors': 0}
+
+    for result in results:
+        summary['total'] += 1
+        summary['ok' if result['status'] == 'ok' else 'errors'] += 1
+        output.write(json.dumps(dict(result, type='result')) + '\n')
+        output.flush()
+
+    summary['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    output.write(json.dumps(summary) + '\n')
+    output.flush()
+    return summary
+
+# CLI interface
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Create voice models for every entry in a manifest')
+    parser.add_argument('manifest', nargs='?', help='JSON array or NDJSON manifest (default: stdin)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: one per core)')
+    parser.add_argument('--blas-threads', type=int, help='Native threads per worker (default: cores / workers)')
+    parser.add_argument('--pitch-tracker', choices=['piptrack', 'pyin'], default='piptrack',
+                        help='Pitch tracker used for every entry')
+
+    args = parser.parse_args()
+
+    try:
+        manifest = load_manifest(args.manifest) if args.manifest else parse_manifest(sys.stdin.read())
+    except (OSError, ValueError) as e:
+        print(json.dumps({"error": f"Invalid manifest: {e}"}))
+        sys.exit(1)
+
+    summary = write_ndjson_results(
+        create_voice_models_bulk(manifest, args.workers, args.blas_threads, args.pitch_tracker)
+    )
+    sys.exit(1 if summary['errors'] else 0)
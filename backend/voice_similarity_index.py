@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Voice Similarity Index for Burnt Beats
+Fixed-length embeddings of voice characteristics in a memory-mapped float32
+matrix, with top-k cosine search for "find voices like this one"
+"""
+
+import os
+import sys
+import json
+import fcntl
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+import numpy as np
+
+# Each scalar feature is mapped to roughly unit scale around a typical adult voice,
+# so no single feature dominates the cosine
+FORMANT_REFERENCES = (500.0, 1500.0, 2500.0, 3500.0)
+N_MFCC = 13
+EMBEDDING_DIM = 14 + 2 * (N_MFCC - 1)
+
+DEFAULT_INDEX_DIR = "voice_models/.similarity_index"
+
+
+def voice_embedding(characteristics: Dict[str, Any]) -> np.ndarray:
+    """
+    Unit-length float32 embedding of a characteristics dict
+
+    Pitch, spectral and formant features are log-frequency ratios to a
+    reference voice. Quality metrics are centred and scaled. MFCCs skip c0,
+    which only tracks recording level.
+    """
+    f0 = characteristics['fundamental_frequency']
+    spectral = characteristics['spectral_features']
+    timbre = characteristics['timbre']
+    quality = characteristics['voice_quality']
+    formants = characteristics['formants']
+
+    f0_mean = max(f0['mean'], 1.0)
+    features = [
+        2 * np.log2(f0_mean / 200.0),
+        (f0['std'] / f0_mean - 0.1) / 0.1,
+        np.log2(max(spectral['centroid_mean'], 1.0) / 2000.0),
+        np.log2(max(spectral['rolloff_mean'], 1.0) / 4000.0),
+        np.log2(max(spectral['bandwidth_mean'], 1.0) / 2000.0),
+        (spectral['zcr_mean'] - 0.1) / 0.05,
+        *(2 * np.log2(max(formants.get(key, ref), 1.0) / ref)
+          for key, ref in zip(['f1', 'f2', 'f3', 'f4'], FORMANT_REFERENCES)),
+        (quality['harmonics_to_noise_ratio'] - 15.0) / 10.0,
+        (quality['jitter'] - 1.0) / 2.0,
+        (quality['shimmer'] - 5.0) / 5.0,
+        (characteristics['vocal_range']['range_semitones'] - 24.0) / 12.0
+    ]
+
+    mfcc_means = np.zeros(N_MFCC - 1)
+    mfcc_stds = np.zeros(N_MFCC - 1)
+    means = np.asarray(timbre['mfcc_means'][1:N_MFCC], dtype=np.float64)
+    stds = np.asarray(timbre['mfcc_stds'][1:N_MFCC], dtype=np.float64)
+    mfcc_means[:len(means)] = means / 20.0
+    mfcc_stds[:len(stds)] = (stds - 10.0) / 10.0
+
+    embedding = np.concatenate([features, mfcc_means, mfcc_stds]).astype(np.float32)
+    norm = np.linalg.norm(embedding)
+    return embedding / norm if norm > 0 else embedding
+
+
+class VoiceSimilarityIndex:
+    """
+    Top-k cosine search over voice embeddings
+
+    Embeddings are rows of a contiguous float32 matrix memory-mapped from
+    embeddings.f32. Row order is recorded in ids.json. Rows are unit length,
+    so one matrix-vector product gives every cosine score. Adds append, with
+    capacity growing by doubling. Removals move the last row into the gap,
+    so both are O(1) apart from persisting the id list.
+    """
+
+    def __init__(self, index_dir: str = DEFAULT_INDEX_DIR, initial_capacity: int = 1024):
+        self.index_dir = Path(index_dir)
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self.matrix_path = self.index_dir / "embeddings.f32"
+        self.ids_path = self.index_dir / "ids.json"
+
+        self.ids: List[str] = []
+        if self.ids_path.exists():
+            with open(self.ids_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get('dim') != EMBEDDING_DIM:
+                raise ValueError(f"Index at {index_dir} has dim {meta.get('dim')}, expected {EMBEDDING_DIM}")
+            self.ids = meta['ids']
+        self.positions = {voice_id: i for i, voice_id in enumerate(self.ids)}
+
+        row_bytes = EMBEDDING_DIM * 4
+        existing_rows = self.matrix_path.stat().st_size // row_bytes if self.matrix_path.exists() else 0
+        self.matrix = None
+        self._resize(max(existing_rows, initial_capacity, len(self.ids)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, voice_id: str) -> bool:
+        return voice_id in self.positions
+
+    def _resize(self, capacity: int):
+        """(Re)map the matrix file with room for `capacity` rows"""
+        if self.matrix is not None:
+            self.matrix.flush()
+            self.matrix = None
+
+        with open(self.matrix_path, 'ab') as f:
+            if f.tell() < capacity * EMBEDDING_DIM * 4:
+                f.truncate(capacity * EMBEDDING_DIM * 4)
+
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='r+', shape=(capacity, EMBEDDING_DIM))
+
+    def add(self, voice_id: str, characteristics: Dict[str, Any], save: bool = True):
+        """Add or replace one voice"""
+        embedding = voice_embedding(characteristics)
+
+        if voice_id in self.positions:
+            self.matrix[self.positions[voice_id]] = embedding
+        else:
+            if len(self.ids) == len(self.matrix):
+                self._resize(2 * len(self.matrix))
+            self.matrix[len(self.ids)] = embedding
+            self.positions[voice_id] = len(self.ids)
+            self.ids.append(voice_id)
+
+        if save:
+            self.save()
+
+    def remove(self, voice_id: str, save: bool = True) -> bool:
+        """Remove one voice by moving the last row into its slot"""
+        position = self.positions.pop(voice_id, None)
+        if position is None:
+            return False
+
+        last = len(self.ids) - 1
+        if position != last:
+            moved_id = self.ids[last]
+            self.matrix[position] = self.matrix[last]
+            self.ids[position] = moved_id
+            self.positions[moved_id] = position
+        self.ids.pop()
+
+        if save:
+            self.save()
+        return True
+
+    def save(self):
+        """Flush the matrix, then atomically replace the id list"""
+        self.matrix.flush()
+        temp_path = self.ids_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, 'w') as f:
+            json.dump({'dim': EMBEDDING_DIM, 'ids': self.ids}, f)
+        os.replace(temp_path, self.ids_path)
+
+    def search(self, query: Union[str, Dict[str, Any], np.ndarray], k: int = 10,
+               exclude_self: bool = True) -> List[Dict[str, Any]]:
+        """
+        Top-k most similar voices to a voice id, characteristics dict or embedding
+        """
+        count = len(self.ids)
+        if count == 0:
+            return []
+
+        exclude = None
+        if isinstance(query, str):
+            if query not in self.positions:
+                raise KeyError(f"Unknown voice: {query}")
+            exclude = self.positions[query] if exclude_self else None
+            vector = np.array(self.matrix[self.positions[query]])
+        elif isinstance(query, dict):
+            vector = voice_embedding(query)
+        else:
+            # Rows are unit length; the query must be too for the scores to be cosines
+            vector = np.asarray(query, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm > 0:
+                vector = vector / norm
+
+        scores = self.matrix[:count] @ vector
+        if exclude is not None:
+            scores[exclude] = -np.inf
+
+        k = min(k, count - (exclude is not None))
+        if k <= 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{'voice_id': self.ids[i], 'similarity': float(scores[i])} for i in top]
+
+
+@contextmanager
+def editing_index(index_dir: str = DEFAULT_INDEX_DIR):
+    """
+    The index, freshly loaded under an flock and saved on exit
+
+    Voice models are created by parallel workers (voice_model_batch), so
+    every add or remove is a locked load-modify-save.
+    """
+    Path(index_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(index_dir) / ".lock", 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        index = VoiceSimilarityIndex(index_dir)
+        yield index
+        index.save()
+
+
+# Main API functions
+def find_similar_voices(query: Union[str, Dict[str, Any]], k: int = 10,
+                        index_dir: str = DEFAULT_INDEX_DIR) -> List[Dict[str, Any]]:
+    """Find the k voices most similar to a voice id or characteristics dict"""
+    return VoiceSimilarityIndex(index_dir).search(query, k)
+
+
+def index_voice(voice_id: str, characteristics: Dict[str, Any], index_dir: str = DEFAULT_INDEX_DIR):
+    """Add or replace a voice in the index"""
+    with editing_index(index_dir) as index:
+        index.add(voice_id, characteristics, save=False)
+
+
+def unindex_voice(voice_id: str, index_dir: str = DEFAULT_INDEX_DIR) -> bool:
+    """Remove a voice from the index; False if it was not indexed"""
+    with editing_index(index_dir) as index:
+        return index.remove(voice_id, save=False)
+
+# CLI interface
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description='Voice similarity index')
+    parser.add_argument('command', choices=['add', 'remove', 'search', 'stats'])
+    parser.add_argument('--voice-id', help='Voice id to add, remove or search from')
+    parser.add_argument('--model-json', help='Voice model JSON (create_voice_model output) to add or search with')
+    parser.add_argument('-k', type=int, default=10, help='Number of results')
+    parser.add_argument('--index-dir', default=DEFAULT_INDEX_DIR, help='Index directory')
+
+    args = parser.parse_args()
+
+    try:
+        characteristics = None
+        if args.model_json:
+            with open(args.model_json, 'r') as f:
+                voice_model = json.load(f)
+            characteristics = voice_model['characteristics']
+            args.voice_id = args.voice_id or voice_model['name']
+
+        if args.command == 'add':
+            index_voice(args.voice_id, characteristics, args.index_dir)
+            result = {'added': args.voice_id, 'count': len(VoiceSimilarityIndex(args.index_dir))}
+        elif args.command == 'remove':
+            removed = unindex_voice(args.voice_id, args.index_dir)
+            result = {'removed': removed, 'count': len(VoiceSimilarityIndex(args.index_dir))}
+        elif args.command == 'search':
+            query = args.voice_id if characteristics is None else characteristics
+            result = {'results': find_similar_voices(query, args.k, args.index_dir)}
+        else:
+            index = VoiceSimilarityIndex(args.index_dir)
+            result = {'count': len(index), 'dim': EMBEDDING_DIM, 'capacity': len(index.matrix)}
+
+        print(json.dumps(result, indent=2))
+
+    except Exception as e:
+        print(json.dumps({"error": str(e)}), file=sys.stderr)
+        sys.exit(1)
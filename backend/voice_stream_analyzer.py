@@ -0,0 +1,288 @@
+# backend/voice_stream_analyzer.py
+import time
+from typing import Dict, Any, Iterator, Optional
+
+import numpy as np
+import soundfile as sf
+import soxr
+
+from voice_feature_engine import VoiceFeatureEngine
+
+
+class RunningStats:
+    """
+    Running mean and population std over scalars or fixed-length vectors
+
+    Batches are merged with the parallel form of Welford's update, so the
+    result matches np.mean/np.std over everything seen without keeping it.
+    """
+
+    def __init__(self, shape=()):
+        self.count = 0
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        if n == 0:
+            return
+
+        batch_mean = values.mean(axis=0)
+        batch_m2 = np.sum((values - batch_mean) ** 2, axis=0)
+
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * (self.count * n / total)
+        self.count = total
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.m2 / self.count) if self.count else np.zeros_like(self.mean)
+
+
+class StreamingHistogram:
+    """Fixed-bin histogram for percentiles of a stream (log-spaced bins for pitch)"""
+
+    def __init__(self, low: float, high: float, bins: int, log: bool = False):
+        self.edges = np.geomspace(low, high, bins + 1) if log else np.linspace(low, high, bins + 1)
+        self.counts = np.zeros(bins, dtype=np.int64)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.counts += np.histogram(np.clip(values, self.edges[0], self.edges[-1]), self.edges)[0]
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentile (0-100), interpolated linearly within the bin"""
+        total = self.counts.sum()
+        if total == 0:
+            return None
+
+        cumulative = np.cumsum(self.counts)
+        target = q / 100 * total
+        index = min(int(np.searchsorted(cumulative, target)), len(self.counts) - 1)
+        below = cumulative[index] - self.counts[index]
+        fraction = (target - below) / self.counts[index] if self.counts[index] else 0.0
+
+        low, high = self.edges[index], self.edges[index + 1]
+        return float(low + (high - low) * fraction)
+
+
+class StreamingVoiceAnalyzer:
+    """
+    Constant-memory voice analysis for long uploads
+
+    Decodes the file in blocks with soundfile, resamples them with a
+    stateful soxr stream, and runs the regular per-block analysis
+    (VoiceFeatureEngine, pitch tracking, HNR and formant frames). Only running
+    statistics are kept: Welford means/stds, histograms for percentiles and
+    medians, and sums for HNR, jitter and shimmer. Memory therefore depends
+    on the block size, not the file length.
+
+    Differences from whole-file analysis: the silence gates for HNR and
+    formants use the running mean power rather than the whole file's, and
+    percentiles and medians come from the histogram bins.
+    """
+
+    def __init__(self, service, block_seconds: float = 30.0):
+        self.service = service
+        self.sr = service.sample_rate
+        self.block_samples = int(block_seconds * self.sr)
+        self.engine = VoiceFeatureEngine(self.sr, n_fft=service.n_fft, hop_length=service.hop_length)
+
+    def iter_blocks(self, audio_file_path: str) -> Iterator[np.ndarray]:
+        """Yield mono float32 blocks at the service sample rate"""
+        info = sf.info(audio_file_path)
+        resampler = None
+        if info.samplerate != self.sr:
+            resampler = soxr.ResampleStream(info.samplerate, self.sr, 1, dtype='float32', quality='HQ')
+
+        read_size = max(1, int(self.block_samples * info.samplerate / self.sr))
+        pending = np.zeros(0, dtype=np.float32)
+
+        for block in sf.blocks(audio_file_path, blocksize=read_size, dtype='float32', always_2d=True):
+            mono = block.mean(axis=1)
+            if resampler is not None:
+                mono = resampler.resample_chunk(mono)
+            pending = np.concatenate([pending, mono])
+
+            # Keep at least one full block back so the last block is never a short tail
+            while len(pending) >= 2 * self.block_samples:
+                yield pending[:self.block_samples]
+                pending = pending[self.block_samples:]
+
+        if resampler is not None:
+            pending = np.concatenate([pending, resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True)])
+        if len(pending):
+            yield pending
+
+    def analyze(self, audio_file_path: str) -> Dict[str, Any]:
+        """Return the same characteristics dict as VoiceCloningService._extract_voice_features"""
+        self._reset()
+
+        for block in self.iter_blocks(audio_file_path):
+            self._accumulate(block)
+
+        return self._characteristics()
+
+    def _reset(self):
+        n_mfcc = self.engine.n_mfcc
+
+        self.total_samples = 0
+        self.energy = 0.0
+        self.blocks = 0
+        self.timings = {}
+
+        self.frames = 0
+        self.f0 = RunningStats()
+        self.f0_confidence = RunningStats()
+        self.f0_histogram = StreamingHistogram(20.0, 5000.0, 1920, log=True)  # ~0.05 semitone bins
+        self.f0_min = np.inf
+        self.f0_max = -np.inf
+
+        self.centroid = RunningStats()
+        self.rolloff = RunningStats()
+        self.bandwidth = RunningStats()
+        self.zcr = RunningStats()
+        self.mfcc = RunningStats((n_mfcc,))
+
+        self.hnr_sum = 0.0
+        self.hnr_count = 0
+        self.formant_histograms = [StreamingHistogram(0.0, 6000.0, 1200) for _ in range(4)]  # 5 Hz bins
+
+        # Jitter and shimmer: consecutive differences carried across block boundaries
+        self.periods = RunningStats()
+        self.period_diff_sum = 0.0
+        self.last_period = None
+        self.amplitudes = RunningStats()
+        self.amplitude_diff_sum = 0.0
+        self.last_amplitude = None
+
+    def _accumulate(self, block: np.ndarray):
+        """Fold one block's frame-level features into the running statistics"""
+        sr = self.sr
+        self.blocks += 1
+        self.total_samples += len(block)
+        self.energy += float(np.dot(block, block))
+        mean_power = self.energy / self.total_samples
+
+        features = self.engine.extract(block)
+        for name, value in self.engine.timings.items():
+            self.timings[name] = round(self.timings.get(name, 0.0) + value, 3)
+
+        start = time.perf_counter()
+
+        f0_contour, f0_confidence = self.service._track_pitch(block, sr, features)
+        pitch_values = f0_contour[f0_contour > 0]
+        self.f0_confidence.update(np.nan_to_num(f0_confidence[f0_contour > 0]))
+        self.frames += len(f0_contour)
+        self.f0.update(pitch_values)
+        self.f0_histogram.update(pitch_values)
+        if len(pitch_values):
+            self.f0_min = min(self.f0_min, float(pitch_values.min()))
+            self.f0_max = max(self.f0_max, float(pitch_values.max()))
+
+            periods = 1.0 / pitch_values.astype(np.float64)
+            self.period_diff_sum += self._diff_sum(self.last_period, periods)
+            self.periods.update(periods)
+            self.last_period = periods[-1]
+
+        amplitudes = features['frame_amplitude']
+        if len(amplitudes):
+            self.amplitude_diff_sum += self._diff_sum(self.last_amplitude, amplitudes)
+            self.amplitudes.update(amplitudes)
+            self.last_amplitude = amplitudes[-1]
+
+        self.centroid.update(features['spectral_centroid'])
+        self.rolloff.update(features['spectral_rolloff'])
+        self.bandwidth.update(features['spectral_bandwidth'])
+        self.zcr.update(features['zero_crossing_rate'])
+        self.mfcc.update(features['mfccs'].T)
+
+        voiced_hnr = self.service._hnr_frames(block, sr, mean_power)
+        self.hnr_sum += float(np.sum(voiced_hnr))
+        self.hnr_count += len(voiced_hnr)
+
+        tracks = self.service._formant_tracks(block, sr, mean_power)
+        for i, histogram in enumerate(self.formant_histograms):
+            histogram.update(tracks[:, i])
+
+        self.timings['block_stats'] = round(self.timings.get('block_stats', 0.0) +
+                                            (time.perf_counter() - start) * 1000, 3)
+
+    def _diff_sum(self, previous: Optional[float], values: np.ndarray) -> float:
+        """Sum of absolute consecutive differences, including the step from the previous block"""
+        if previous is not None:
+            values = np.concatenate([[previous], values])
+        return float(np.sum(np.abs(np.diff(values))))
+
+    def _characteristics(self) -> Dict[str, Any]:
+        sr = self.sr
+
+        f0_mean = float(self.f0.mean) if self.f0.count else 200.0
+        f0_std = float(self.f0.std) if self.f0.count else 20.0
+
+        jitter = 0.0
+        if self.periods.count >= 3 and self.periods.mean > 0:
+            jitter = min(self.period_diff_sum / (self.periods.count - 1) / float(self.periods.mean) * 100, 10.0)
+
+        shimmer = 0.0
+        if self.amplitudes.count >= 3 and self.amplitudes.mean > 0:
+            shimmer = min(self.amplitude_diff_sum / (self.amplitudes.count - 1) / float(self.amplitudes.mean) * 100,
+                          20.0)
+
+        hnr = float(max(0.0, min(30.0, self.hnr_sum / self.hnr_count))) if self.hnr_count else 10.0
+
+        formants = {'f1': 500.0, 'f2': 1500.0, 'f3': 2500.0, 'f4': 3500.0}
+        for key, histogram in zip(['f1', 'f2', 'f3', 'f4'], self.formant_histograms):
+            median = histogram.percentile(50)
+            if median is not None:
+                formants[key] = median
+
+        if self.f0.count:
+            vocal_range = {
+                'min': self.f0_min,
+                'max': self.f0_max,
+                'range_semitones': float(12 * np.log2(self.f0_max / self.f0_min)),
+                'comfortable_range': [self.f0_histogram.percentile(25), self.f0_histogram.percentile(75)]
+            }
+        else:
+            vocal_range = {'min': 100.0, 'max': 300.0, 'range_semitones': 12.0}
+
+        self.timings['total'] = round(sum(v for k, v in self.timings.items() if k != 'total'), 3)
+        self.timings['blocks'] = self.blocks
+
+        return {
+            'fundamental_frequency': {
+                'mean': f0_mean,
+                'std': f0_std,
+                'range': [f0_mean - f0_std * 2, f0_mean + f0_std * 2],
+                'voiced_ratio': float(self.f0.count / max(1, self.frames)),
+                'confidence': float(self.f0_confidence.mean) if self.f0_confidence.count else 0.0,
+                'tracker': self.service.pitch_tracker
+            },
+            'spectral_features': {
+                'centroid_mean': float(self.centroid.mean),
+                'rolloff_mean': float(self.rolloff.mean),
+                'bandwidth_mean': float(self.bandwidth.mean),
+                'zcr_mean': float(self.zcr.mean)
+            },
+            'timbre': {
+                'mfcc_means': self.mfcc.mean.tolist(),
+                'mfcc_stds': self.mfcc.std.tolist(),
+                'brightness': float(self.centroid.mean / sr * 2),  # Normalized brightness
+                'roughness': float(self.centroid.std)
+            },
+            'formants': formants,
+            'voice_quality': {
+                'harmonics_to_noise_ratio': hnr,
+                'jitter': float(jitter),
+                'shimmer': float(shimmer),
+                'stability': float(max(0, min(1, (30 - jitter - shimmer) / 30)))
+            },
+            'vocal_range': vocal_range,
+            'duration': float(self.total_samples / sr)
+        }
@@ -42,6 +42,20 @@ interface RVCModel {
   test_audio_path?: string
 }
 
+const trainingStageLabels: Record<string, string> = {
+  queued: "Waiting for a training slot...",
+  preprocessing: "Preprocessing audio data...",
+  training: "Training in progress...",
+  "interrupted, resuming": "Resuming from last checkpoint...",
+  finalizing: "Finalizing model...",
+  completed: "Training complete!",
+}
+
+const formatEta = (seconds?: number | null) => {
+  if (seconds === null || seconds === undefined) return "Calculating..."
+  return `${Math.round(seconds / 60)} min`
+}
+
 export default function RVCVoiceTrainer() {
   // Training data
   const [audioFiles, setAudioFiles] = useState<AudioFile[]>([])
@@ -283,77 +297,53 @@ export default function RVCVoiceTrainer() {
       trainingFormData.append("batch_size", batchSize[0].toString())
       trainingFormData.append("learning_rate", learningRate[0].toString())
 
-      // Simulate training progress
-      const progressStages = [
-        { stage: "Preprocessing audio data...", progress: 5 },
-        { stage: "Extracting features...", progress: 15 },
-        { stage: "Initializing model...", progress: 25 },
-        { stage: "Training in progress...", progress: 30 },
-      ]
+      // Queue training, then poll the job until it finishes
+      const trainingResponse = await fetch("/api/backend/train-rvc-model", {
+        method: "POST",
+        body: trainingFormData,
+      })
 
-      for (const stage of progressStages) {
-        setTrainingProgress({
-          stage: stage.stage,
-          epoch: 0,
-          total_epochs: epochs[0],
-          loss: 0,
-          eta: "Calculating...",
-          progress: stage.progress,
-        })
-        await new Promise((resolve) => setTimeout(resolve, 2000))
+      if (!trainingResponse.ok) {
+        throw new Error("Failed to start training")
       }
 
-      // Simulate epoch progress
-      for (let epoch = 1; epoch <= epochs[0]; epoch++) {
-        const progress = 30 + (epoch / epochs[0]) * 65 // 30% to 95%
-        const loss = Math.max(0.1, 2.0 - (epoch / epochs[0]) * 1.8) // Decreasing loss
-        const eta = `${Math.max(0, Math.round(((epochs[0] - epoch) / epochs[0]) * 120))} min`
+      const { job_id: jobId } = await trainingResponse.json()
+      let result: any = null
 
-        setTrainingProgress({
-          stage: "Training in progress...",
-          epoch: epoch,
-          total_epochs: epochs[0],
-          loss: loss,
-          eta: eta,
-          progress: progress,
-        })
+      while (!result) {
+        await new Promise((resolve) => setTimeout(resolve, 3000))
 
-        // Update every 10 epochs or at the end
-        if (epoch % 10 === 0 || epoch === epochs[0]) {
-          await new Promise((resolve) => setTimeout(resolve, 100))
+        const statusResponse = await fetch(`/api/backend/train-rvc-model?job_id=${jobId}`)
+        if (!statusResponse.ok) {
+          throw new Error("Lost track of training job")
         }
-      }
+        const job = await statusResponse.json()
 
-      // Final stage
-      setTrainingProgress({
-        stage: "Finalizing model...",
-        epoch: epochs[0],
-        total_epochs: epochs[0],
-        loss: 0.1,
-        eta: "0 min",
-        progress: 95,
-      })
-
-      await new Promise((resolve) => setTimeout(resolve, 2000))
+        if (job.status === "failed" || job.status === "cancelled") {
+          throw new Error(job.error || `Training ${job.status}`)
+        }
 
-      // Make actual training request
-      const trainingResponse = await fetch("/api/backend/train-rvc-model", {
-        method: "POST",
-        body: trainingFormData,
-      })
+        const progress = job.progress || {}
+        setTrainingProgress({
+          stage: trainingStageLabels[progress.stage] || progress.stage || "Queued...",
+          epoch: progress.epoch || 0,
+          total_epochs: progress.total_epochs || epochs[0],
+          loss: progress.loss ?? 0,
+          eta: formatEta(progress.eta_seconds),
+          progress: progress.percent || 0,
+        })
 
-      if (!trainingResponse.ok) {
-        throw new Error("Training failed")
+        if (job.status === "completed") {
+          result = job.result
+        }
       }
 
-      const result = await trainingResponse.json()
-
       // Add new model to list
       const newModel: RVCModel = {
         id: `model_${Date.now()}`,
         name: modelName,
         path: result.model_path || `/rvc_models/${modelName}.pth`,
-        size_mb: Math.round(Math.random() * 50 + 10), // Mock size
+        size_mb: result.file_size_mb ?? 0,
         quality_score: 0.8 + Math.random() * 0.15, // Mock quality
         training_time: `${Math.round(epochs[0] / 10)} min`,
         created_at: new Date().toISOString(),